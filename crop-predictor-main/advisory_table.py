@@ -0,0 +1,264 @@
+# advisory_table.py
+"""
+Precomputed generate_reply() output for the (district, crop, season, month, lang)
+combinations in the dataset, served with one indexed SQLite lookup.
+
+    python advisory_table.py build                    # all keys, en / hi / mr
+    python advisory_table.py build --langs en,hi
+    python advisory_table.py info
+
+Build (offline): every distinct (district, crop, season) in the dataset, plus season
+"Unknown" (what a query that names no season resolves to), goes through the same
+steps 3-5 as a live query (voice_assistant.features_for_entities: fallback row,
+weather, features). The rows are then predicted and explained in batches, and each
+language's reply is rendered by voice_assistant.render_reply. The table is written
+to a temp file and renamed into place.
+
+Serve: generate_reply() builds the features (entities, fallback row and a weather
+dict lookup, all cheap) and asks lookup(features, lang) before the model, the
+explainer and the rule engine. A hit needs:
+- the same key, and the same digest of the full features dict (so a different
+  weather month or fallback row is a miss, never a wrong reply);
+- the same generation: sha1 of the served model's checksum plus the rule / phrase
+  sources (RULES_FILES). Retraining, a registry hot swap or a rules edit turns
+  every lookup into a miss until the table is rebuilt.
+
+Misses are computed live as before. Without a table file lookup() is a stat call.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+TABLE_PATH = os.environ.get("ADVISORY_TABLE_PATH", "advisory_table.sqlite")
+LANGS = ("en", "hi", "mr")
+RULES_FILES = ("templates.py", "localization.py", "explanations.py", "voice_assistant.py")
+BUILD_BATCH = 512
+SCHEMA_VERSION = 1
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ---------------- generation ----------------
+
+_rules_digest = None
+_model_digest = {}  # id(pipeline) -> (pipeline, checksum)
+
+
+def rules_digest():
+    global _rules_digest
+    if _rules_digest is None:
+        h = hashlib.sha1(str(SCHEMA_VERSION).encode())
+        for name in RULES_FILES:
+            with open(os.path.join(_HERE, name), "rb") as f:
+                h.update(f.read())
+        _rules_digest = h.hexdigest()
+    return _rules_digest
+
+
+def model_checksum():
+    """sha256 of the served model file (registry metadata, else MODEL_PATH); None without a model."""
+    import ml_connector
+    import model_registry
+
+    pipeline = ml_connector.get_model()
+    if pipeline is None:
+        return None
+    cached = _model_digest.get(id(pipeline))
+    if cached is not None and cached[0] is pipeline:
+        return cached[1]
+    info = ml_connector.model_info()
+    if info.get("version") and info.get("dir"):
+        checksum = model_registry.read_metadata(info["version"], os.path.dirname(info["dir"]))["sha256"]
+    else:
+        checksum = model_registry.file_sha256(ml_connector.MODEL_PATH)
+    _model_digest.clear()
+    _model_digest[id(pipeline)] = (pipeline, checksum)
+    return checksum
+
+
+def generation():
+    """Version of everything a stored reply depends on besides its features."""
+    model = model_checksum()
+    if model is None:
+        return None
+    return hashlib.sha1(f"{model}:{rules_digest()}".encode()).hexdigest()
+
+
+# ---------------- keys ----------------
+
+def _norm(value):
+    return str(value if value is not None else "").strip().lower()
+
+
+def table_key(features, lang):
+    return (_norm(features.get("District_Name")), _norm(features.get("Crop")), _norm(features.get("Season")),
+            _norm(features.get("Month")), lang)
+
+
+def features_digest(features):
+    """Digest of every input of the reply (the key columns alone don't pin weather / soil)."""
+    payload = {k: str(v) for k, v in features.items() if k != "Yield"}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+# ---------------- serving ----------------
+
+_local = threading.local()
+_gen_lock = threading.Lock()
+_table_generation = {}  # (path, mtime_ns) -> generation stored in that file
+
+
+def _connection(path):
+    """Read-only connection for this thread, reopened when the file is replaced."""
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, None
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.stamp != (path, stamp):
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        _local.conn, _local.stamp = conn, (path, stamp)
+    return conn, (path, stamp)
+
+
+def lookup(features, lang, path=None):
+    """Stored reply for features / lang, or None (no table, stale generation, or a miss)."""
+    path = path or TABLE_PATH
+    conn, stamp = _connection(path)
+    if conn is None:
+        return None
+    stored = _table_generation.get(stamp)
+    if stored is None:
+        with _gen_lock:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+            stored = _table_generation[stamp] = row[0] if row else ""
+    if stored != generation():
+        return None
+    row = conn.execute(
+        "SELECT digest, reply FROM advisories WHERE district = ? AND crop = ? AND season = ? AND month = ? AND lang = ?",
+        table_key(features, lang),
+    ).fetchone()
+    if row is None or row[0] != features_digest(features):
+        return None
+    return row[1]
+
+
+# ---------------- offline build ----------------
+
+def enumerate_entities(rows):
+    """Distinct (district, crop, season) in file order, plus (district, crop, "Unknown")."""
+    seen = {}
+    for r in rows:
+        district, crop = (r.get("District_Name") or "").strip(), (r.get("Crop") or "").strip()
+        if not district or not crop:
+            continue
+        for season in ((r.get("Season") or "").strip() or "Unknown", "Unknown"):
+            seen.setdefault((district, crop, season), None)
+    return list(seen)
+
+
+def _render_batch(entities, rows, langs):
+    """[(key, digest, reply)] for one batch of (district, crop, season)."""
+    import explanations
+    import ml_connector
+    from voice_assistant import features_for_entities, render_reply
+
+    features = [features_for_entities(d, c, s, rows) for d, c, s in entities]
+    yields = ml_connector.predict_yield_batch(features)
+    try:
+        explained = explanations.explain(features)
+    except Exception as e:
+        print(f"[advisory-table] Explanations skipped: {e}")
+        explained = [None] * len(features)
+    out = []
+    for f, y, explanation in zip(features, yields, explained):
+        digest = features_digest(f)
+        f = dict(f, Yield=y if y is not None else "N/A")
+        for lang in langs:
+            reason = ""
+            if f["Yield"] != "N/A" and explanation:
+                reason = explanations.reason_text(f, lang, explanation)
+            out.append((table_key(f, lang), digest, render_reply(f, lang, reason)))
+    return out
+
+
+def build(path=None, langs=LANGS, batch_size=BUILD_BATCH):
+    """Precompute every key of the current dataset into path. Returns the number of replies."""
+    import dataset_connector
+
+    path = path or TABLE_PATH
+    gen = generation()
+    if gen is None:
+        raise RuntimeError("No model loaded; nothing to precompute")
+    rows = dataset_connector.load_dataset()
+    entities = enumerate_entities(rows)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            "CREATE TABLE advisories (district TEXT, crop TEXT, season TEXT, month TEXT, lang TEXT, "
+            "digest TEXT, reply TEXT, PRIMARY KEY (district, crop, season, month, lang)) WITHOUT ROWID"
+        )
+        started, written = time.perf_counter(), 0
+        for i in range(0, len(entities), batch_size):
+            records = _render_batch(entities[i:i + batch_size], rows, langs)
+            # Different (district, crop, season) can resolve to one key; first one wins.
+            conn.executemany("INSERT OR IGNORE INTO advisories VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [key + (digest, reply) for key, digest, reply in records])
+            written += len(records)
+            print(f"[advisory-table] {min(i + batch_size, len(entities))}/{len(entities)} keys "
+                  f"({time.perf_counter() - started:.1f}s)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("generation", gen),
+            ("built_at", time.strftime("%Y-%m-%dT%H:%M:%S")),
+            ("dataset", os.path.abspath(dataset_connector.DATASET_PATH)),
+            ("langs", ",".join(langs)),
+        ])
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM advisories").fetchone()[0]
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    print(f"[advisory-table] Wrote {count} replies to {path} in {time.perf_counter() - started:.1f}s")
+    return count
+
+
+def info(path=None):
+    path = path or TABLE_PATH
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        meta["replies"] = conn.execute("SELECT COUNT(*) FROM advisories").fetchone()[0]
+    finally:
+        conn.close()
+    meta["current"] = meta.get("generation") == generation()
+    return meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Materialized advisory replies for common queries.")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--path", default=TABLE_PATH)
+    parser.add_argument("--langs", default=",".join(LANGS), help="Comma-separated languages to build")
+    parser.add_argument("--batch-size", type=int, default=BUILD_BATCH)
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        build(args.path, [l.strip() for l in args.langs.split(",") if l.strip()], args.batch_size)
+    else:
+        print(json.dumps(info(args.path), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
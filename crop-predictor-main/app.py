@@ -1,10 +1,43 @@
 # app.py
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
 from voice_assistant import generate_reply  # <-- make sure this exists
+from voice_assistant import build_reply_features, explain_reply_yield, iter_rule_sections, predict_reply_yield, resolve_lang
+from templates import yield_advice
+from blocking_pool import BlockingPool, PoolSaturated, PoolTimeout
+from inference_batcher import InferenceBatcher
+import ml_connector
+import model_registry
+import profiling
+import scenario_engine
+import tracing
 
 app = FastAPI()
 
+# generate_reply scans CSVs and runs sklearn, so it runs here instead of on the event loop.
+chat_pool = BlockingPool(name="chat")
+# Concurrent /chat calls share one vectorized predict (INFER_MAX_BATCH / INFER_MAX_DELAY_MS).
+inference_batcher = InferenceBatcher()
+
+
+class ChatRequest(BaseModel):
+    message: str = ""
+    lang: str = "en"
+
+
+class ChatResponse(BaseModel):
+    reply: str
+    queue_ms: float = 0.0    # time spent waiting for a free worker
+    service_ms: float = 0.0  # time generate_reply actually ran
+    profile: Optional[str] = None  # profile output file when profiling was requested
+
 # Allow only your frontend (http://localhost:8080)
 app.add_middleware(
     CORSMiddleware,
@@ -18,15 +51,190 @@ app.add_middleware(
 async def root():
     return {"message": "✅ Backend is running fine!"}
 
-@app.post("/chat")
-async def chat_endpoint(payload: dict):
-    user_message = payload.get("message", "")
-    lang = payload.get("lang", "en")
+def _profiled_reply(profile, lang, message):
+    # Runs inside the pool thread so the profiler sees generate_reply's own stack.
+    with profiling.profiled("chat", requested=profile) as prof:
+        reply = generate_reply("unknown", lang_code=lang, user_text=message)
+    return reply, prof["path"]
 
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(payload: ChatRequest, request: Request):
+    profile = profiling.is_requested(request.headers.get("x-profile") or request.query_params.get("profile"))
     try:
         # Here we call your NLP engine
-        reply = generate_reply("unknown", lang_code=lang, user_text=user_message)
+        (reply, profile_path), timings = await chat_pool.run(
+            _profiled_reply, profile, payload.lang, payload.message
+        )
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry.", headers={"Retry-After": "1"})
+    except PoolTimeout:
+        raise HTTPException(status_code=504, detail="Reply took too long, please retry.")
     except Exception as e:
-        reply = f"⚠️ Error in NLP: {str(e)}"
+        return ChatResponse(reply=f"⚠️ Error in NLP: {str(e)}")
+
+    return ChatResponse(reply=reply, profile=profile_path, **timings)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(payload: ChatRequest):
+    """
+    Server-Sent Events version of /chat. Emits one `section` event per advisory
+    section (rainfall, month, water_allocation, fertilizer, pest, storage) as soon as it
+    is rendered; the ML `yield` section is computed in parallel and sent last, then `done`.
+    """
+    async def events():
+        started = time.perf_counter()
+        # A comment line so headers and the first bytes leave immediately.
+        yield ": stream open\n\n"
+        try:
+            features, _ = await chat_pool.run(build_reply_features, payload.message)
+        except PoolSaturated:
+            yield _sse("error", {"message": "Server busy, please retry."})
+            return
+        except Exception as e:
+            yield _sse("error", {"message": f"⚠️ Error in NLP: {str(e)}"})
+            return
+
+        lang = resolve_lang(payload.lang)
+        yield_task = asyncio.ensure_future(chat_pool.run(predict_reply_yield, dict(features)))
+        # Attributions don't need the prediction, so they run alongside it.
+        reason_task = asyncio.ensure_future(chat_pool.run(explain_reply_yield, dict(features), lang))
+        try:
+            try:
+                for section, text in iter_rule_sections(features, lang):
+                    yield _sse("section", {"section": section, "text": text})
+            except Exception as e:
+                yield _sse("error", {"message": f"Sorry, I could not generate advisory: {e}"})
+
+            try:
+                predicted, _ = await yield_task
+            except Exception as e:
+                print(f"[ML-ERROR] Streamed yield prediction failed: {e}")
+                predicted = "N/A"
+            try:
+                reason, _ = await reason_task if predicted != "N/A" else ("", None)
+            except Exception as e:
+                print(f"[explain] Streamed explanation failed: {e}")
+                reason = ""
+            yield _sse("section", {
+                "section": "yield",
+                "text": yield_advice(features["District_Name"], features["Crop"], predicted, lang, reason),
+            })
+            yield _sse("done", {"total_ms": round((time.perf_counter() - started) * 1000, 2)})
+        finally:
+            for task in (yield_task, reason_task):
+                if not task.done():
+                    task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/stats/chat")
+async def chat_stats():
+    return {
+        "workers": chat_pool.workers,
+        "max_pending": chat_pool.max_pending,
+        "inflight": chat_pool.inflight,
+        **chat_pool.stats,
+    }
+
+
+@tracing.register_collector
+def _pool_and_batcher_samples():
+    yield "chat_pool_inflight", {}, chat_pool.inflight
+    for key, value in chat_pool.stats.items():
+        yield "chat_pool_calls_total", {"outcome": key}, value
+    snap = inference_batcher.snapshot()
+    yield "inference_batches_total", {}, snap["batches"]
+    yield "inference_rows_total", {}, snap["rows"]
+    yield "inference_batch_fill_ratio", {}, snap["avg_batch_fill"]
+    yield "inference_added_latency_ms_avg", {}, snap["avg_added_latency_ms"]
+    # fill_hist holds per-bucket counts in bucket order; Prometheus `le` buckets are cumulative.
+    cumulative = 0
+    for bound, count in snap["fill_hist"].items():
+        cumulative += count
+        yield "inference_batch_size_bucket", {"le": bound}, cumulative
+    yield "inference_batch_size_sum", {}, snap["rows"]
+    yield "inference_batch_size_count", {}, snap["batches"]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus-style text: per-stage latency histograms + pool/batcher counters."""
+    return PlainTextResponse(tracing.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats/batcher")
+async def batcher_stats():
+    return inference_batcher.snapshot()
+
+
+@app.get("/stats/model")
+async def model_stats():
+    return {**ml_connector.model_info(), "registry_current": model_registry.current_version()}
+
+
+@app.get("/stats/memory")
+async def memory_stats():
+    """This worker's memory; USS is what it costs on top of the pages shared by serve.py."""
+    from serve import memory_usage
+    return {"pid": os.getpid(), **memory_usage()}
+
+
+model_watcher = model_registry.ModelWatcher()
+
+
+@app.on_event("startup")
+async def start_batcher():
+    # Started per process (after any fork) so each worker owns its batching thread.
+    ml_connector.set_batcher(inference_batcher.start())
+    # Load (registry CURRENT or MODEL_PATH) before serving, then follow new publishes.
+    await asyncio.to_thread(ml_connector.get_model)
+    # serve.py sets MODEL_WATCH=0: its master loads new versions once and replaces the workers.
+    if os.environ.get("MODEL_WATCH", "1") != "0":
+        model_watcher.start(active=ml_connector.model_info()["version"])
+
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    model_watcher.stop()
+    ml_connector.set_batcher(None)
+    inference_batcher.stop()
+    chat_pool.shutdown()
+
+
+@app.post("/scenario")
+def scenario_endpoint(payload: dict):
+    """
+    What-if sweep. Payload:
+      {"base": {...features...},
+       "axes": [{"name": "Rainfall", "start": 100, "stop": 1500, "num": 100},
+                {"name": "Nitrogen", "values": [0, 50, 100]}],
+       "format": "json" | "npz"}
+    Declared sync so FastAPI runs it on its threadpool instead of the event loop.
+    """
+    axes = []
+    for axis in payload.get("axes", []):
+        if "values" in axis:
+            values = axis["values"]
+        else:
+            values = scenario_engine.linspace(axis.get("start", 0), axis.get("stop", 0), axis.get("num", 10))
+        axes.append((axis.get("name"), values))
+
+    try:
+        result = scenario_engine.run_scenario(payload.get("base", {}), axes)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return {"reply": reply}
+    if payload.get("format") == "npz":
+        return Response(content=scenario_engine.to_npz_bytes(result), media_type="application/octet-stream")
+    return scenario_engine.to_json(result)
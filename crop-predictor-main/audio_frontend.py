@@ -0,0 +1,138 @@
+# audio_frontend.py
+"""
+In-memory audio front-end for Whisper: decode -> mono -> 16 kHz float32.
+
+    audio = load_audio("query.wav")            # np.float32, 16 kHz, mono, [-1, 1]
+    model.transcribe(audio, fp16=False)
+
+whisper's own load_audio() spawns an ffmpeg process per file to decode and resample.
+Here WAV (and FLAC / OGG when soundfile is installed) is decoded in-process, either by
+soundfile or by the wave module + NumPy, and resampled with a polyphase windowed-sinc
+filter (scipy.signal.resample_poly when available, a NumPy FIR otherwise). Only
+formats neither decoder understands (mp3, m4a, ...) fall back to ffmpeg.
+"""
+import io
+import os
+import wave
+from math import gcd
+
+import numpy as np
+
+TARGET_RATE = 16000
+NATIVE_EXTENSIONS = (".wav", ".wave")
+SOUNDFILE_EXTENSIONS = (".wav", ".wave", ".flac", ".ogg", ".aiff", ".aif")
+
+
+def _soundfile():
+    try:
+        import soundfile
+        return soundfile
+    except Exception:
+        return None
+
+
+def needs_ffmpeg(path):
+    """True if path can't be decoded in-process (so the ffmpeg fallback is required)."""
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext in NATIVE_EXTENSIONS:
+        return False
+    return not (_soundfile() is not None and ext in SOUNDFILE_EXTENSIONS)
+
+
+def pcm_to_float(pcm):
+    """Integer PCM array (int16 / int32 / uint8) -> float32 in [-1, 1]."""
+    pcm = np.asarray(pcm)
+    if pcm.dtype == np.uint8:
+        return (pcm.astype(np.float32) - 128.0) / 128.0
+    if np.issubdtype(pcm.dtype, np.integer):
+        return pcm.astype(np.float32) / float(np.iinfo(pcm.dtype).max + 1)
+    return pcm.astype(np.float32)
+
+
+def _decode_wave(source):
+    """16/24/32-bit or 8-bit PCM WAV via the wave module. Returns (float32 [n, ch], rate)."""
+    with wave.open(source, "rb") as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 3:  # 24-bit: widen to int32 little-endian
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        pcm = (b[:, 0].astype(np.int32) << 8) | (b[:, 1].astype(np.int32) << 16) | (b[:, 2].astype(np.int32) << 24)
+    else:
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(width)
+        if dtype is None:
+            raise ValueError(f"unsupported WAV sample width: {width} bytes")
+        pcm = np.frombuffer(raw, dtype=dtype)
+    return pcm_to_float(pcm).reshape(-1, channels), rate
+
+
+def decode(source):
+    """
+    Decode a WAV path / bytes / file object. Returns (float32 array [n, channels], rate).
+    Uses soundfile when installed (also FLAC / OGG), the wave module otherwise.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    sf = _soundfile()
+    if sf is not None:
+        data, rate = sf.read(source, dtype="float32", always_2d=True)
+        return data, rate
+    return _decode_wave(source)
+
+
+def to_mono(audio):
+    audio = np.asarray(audio, dtype=np.float32)
+    return audio.mean(axis=1) if audio.ndim > 1 else audio
+
+
+def _lowpass_taps(cutoff, half_width=32, beta=8.0):
+    """Kaiser-windowed sinc low-pass; cutoff as a fraction of the (upsampled) Nyquist."""
+    n = np.arange(-half_width, half_width + 1)
+    taps = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), beta)
+    return taps / taps.sum()
+
+
+def resample(audio, rate, target=TARGET_RATE):
+    """Polyphase resampling of a mono float32 array from rate to target."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if rate == target or not len(audio):
+        return audio
+    g = gcd(int(rate), int(target))
+    up, down = target // g, int(rate) // g
+    try:
+        from scipy.signal import resample_poly
+        return resample_poly(audio, up, down).astype(np.float32)
+    except ImportError:
+        pass
+    # NumPy fallback: conceptually zero-stuff by `up`, low-pass at the lower Nyquist and keep
+    # every `down`-th sample; only the taps that hit real input samples are evaluated
+    # (about len(taps) / up per output), in blocks of outputs to bound memory.
+    taps = _lowpass_taps(1.0 / max(up, down), half_width=16 * max(up, down)) * up
+    half = len(taps) // 2
+    n_taps_in = 2 * half // up + 2
+    n_out = int(np.ceil(len(audio) * up / down))
+    out = np.empty(n_out, dtype=np.float32)
+    for start in range(0, n_out, 65536):
+        pos = np.arange(start, min(n_out, start + 65536)) * down   # positions on the upsampled grid
+        k = -((half - pos) // up)[:, None] + np.arange(n_taps_in)[None, :]  # ceil((pos - half) / up) + i
+        tap = pos[:, None] - k * up + half
+        valid = (tap >= 0) & (tap < len(taps)) & (k >= 0) & (k < len(audio))
+        vals = np.where(valid, audio[np.clip(k, 0, len(audio) - 1)] * taps[np.clip(tap, 0, len(taps) - 1)], 0.0)
+        out[start:start + len(pos)] = vals.sum(axis=1)
+    return out
+
+
+def load_audio(source, target=TARGET_RATE):
+    """
+    Path / bytes -> float32 mono at target Hz, ready for model.transcribe().
+    Falls back to whisper's ffmpeg loader only for formats decoded out of process.
+    """
+    if isinstance(source, (str, os.PathLike)) and needs_ffmpeg(source):
+        import whisper
+        return whisper.load_audio(str(source), sr=target)
+    audio, rate = decode(source)
+    return resample(to_mono(audio), rate, target)
+
+
+def from_pcm(pcm, rate, target=TARGET_RATE):
+    """In-memory int16 recording (e.g. sounddevice.rec output) -> float32 mono at target Hz."""
+    return resample(to_mono(pcm_to_float(pcm)), rate, target)
@@ -0,0 +1,242 @@
+# audio_stream.py
+"""
+Streaming voice input: PCM frames -> VAD-segmented utterances -> incremental transcripts.
+
+    frames = wav_frames("query.wav")          # or mic_frames() for a live microphone
+    for event in stream_transcribe(frames, StreamingTranscriber("tiny")):
+        ...  # {"type": "entities" | "partial" | "final", ...}
+
+- Frames (FRAME_MS of float32 mono audio at 16 kHz) go into a RingBuffer that keeps a
+  short pre-roll, so the first syllable before VAD triggers isn't cut off.
+- VADSegmenter is an energy detector with an adaptive noise floor: speech starts after
+  START_FRAMES loud frames, ends after END_SILENCE_MS of quiet (or MAX_UTTERANCE_S).
+- StreamingTranscriber keeps one Whisper model warm and transcribes numpy arrays
+  directly: no temp WAVs, no ffmpeg, no reload per utterance.
+- While an utterance is still being spoken, the audio so far is re-transcribed every
+  PARTIAL_INTERVAL_S; the first partial that names a district or crop emits an
+  "entities" event so the caller can start intent detection / data lookups early.
+
+wav_frames() feeds a file through exactly the same path as the microphone, so the whole
+pipeline runs (and can be tested) without audio hardware.
+"""
+import os
+import queue
+import time
+
+import numpy as np
+
+from audio_frontend import load_audio
+
+SAMPLE_RATE = 16000
+FRAME_MS = int(os.environ.get("VAD_FRAME_MS", "30"))
+START_FRAMES = 3
+END_SILENCE_MS = int(os.environ.get("VAD_END_SILENCE_MS", "600"))
+PRE_ROLL_MS = 300
+MAX_UTTERANCE_S = float(os.environ.get("VAD_MAX_UTTERANCE_S", "15"))
+MIN_ENERGY_DB = float(os.environ.get("VAD_MIN_ENERGY_DB", "-45"))
+SPEECH_OVER_NOISE_DB = 9.0
+PARTIAL_INTERVAL_S = float(os.environ.get("STREAM_PARTIAL_INTERVAL_S", "2.0"))
+
+
+class RingBuffer:
+    """Fixed-capacity float32 sample buffer; old samples are overwritten."""
+
+    def __init__(self, capacity):
+        self.buf = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.pos = 0
+        self.filled = 0
+
+    def write(self, samples):
+        samples = samples[-self.capacity:]
+        n = len(samples)
+        end = self.pos + n
+        if end <= self.capacity:
+            self.buf[self.pos:end] = samples
+        else:
+            split = self.capacity - self.pos
+            self.buf[self.pos:] = samples[:split]
+            self.buf[:n - split] = samples[split:]
+        self.pos = end % self.capacity
+        self.filled = min(self.capacity, self.filled + n)
+
+    def read(self):
+        """All buffered samples, oldest first."""
+        if self.filled < self.capacity:
+            return self.buf[:self.filled].copy()
+        return np.concatenate([self.buf[self.pos:], self.buf[:self.pos]])
+
+    def clear(self):
+        self.pos = 0
+        self.filled = 0
+
+
+def frame_db(frame):
+    rms = float(np.sqrt(np.mean(np.square(frame, dtype=np.float64)))) if len(frame) else 0.0
+    return 20.0 * np.log10(max(rms, 1e-10))
+
+
+class VADSegmenter:
+    """Feed fixed-size frames; get back finished utterances as float32 arrays."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.sample_rate = sample_rate
+        self.end_frames = max(1, END_SILENCE_MS // frame_ms)
+        self.max_frames = int(MAX_UTTERANCE_S * 1000 / frame_ms)
+        self.pre_roll = RingBuffer(int(sample_rate * PRE_ROLL_MS / 1000))
+        self.noise_db = MIN_ENERGY_DB - 10
+        self.in_speech = False
+        self.loud_run = 0
+        self.quiet_run = 0
+        self.frames = []
+
+    def is_speech(self, db):
+        return db > max(MIN_ENERGY_DB, self.noise_db + SPEECH_OVER_NOISE_DB)
+
+    def current(self):
+        """Audio of the utterance in progress (empty array if none)."""
+        return np.concatenate(self.frames) if self.frames else np.zeros(0, dtype=np.float32)
+
+    def feed(self, frame):
+        """Returns a finished utterance (np.ndarray) or None."""
+        db = frame_db(frame)
+        speech = self.is_speech(db)
+        if not speech:
+            # Track the noise floor: fall fast, rise slowly.
+            rate = 0.5 if db < self.noise_db else 0.02
+            self.noise_db += rate * (db - self.noise_db)
+
+        if not self.in_speech:
+            self.loud_run = self.loud_run + 1 if speech else 0
+            self.pre_roll.write(frame)
+            if self.loud_run >= START_FRAMES:
+                self.in_speech = True
+                self.quiet_run = 0
+                self.frames = [self.pre_roll.read()]
+                self.pre_roll.clear()
+            return None
+
+        self.frames.append(frame)
+        self.quiet_run = 0 if speech else self.quiet_run + 1
+        if self.quiet_run >= self.end_frames or len(self.frames) >= self.max_frames:
+            return self._finish()
+        return None
+
+    def flush(self):
+        """End of stream: return the utterance in progress, if any."""
+        return self._finish() if self.in_speech else None
+
+    def _finish(self):
+        audio = self.current()
+        self.frames = []
+        self.in_speech = False
+        self.loud_run = 0
+        self.quiet_run = 0
+        return audio
+
+
+# ---------------- frame sources ----------------
+
+def wav_frames(path, frame_ms=FRAME_MS, realtime=False):
+    """Yield float32 16 kHz mono frames from an audio file (realtime=True paces like a mic)."""
+    frame_len = int(SAMPLE_RATE * frame_ms / 1000)
+    audio = load_audio(path, SAMPLE_RATE)
+    for start in range(0, len(audio), frame_len):
+        frame = audio[start:start + frame_len]
+        if len(frame) < frame_len:
+            frame = np.pad(frame, (0, frame_len - len(frame)))
+        if realtime:
+            time.sleep(frame_ms / 1000)
+        yield frame
+
+
+def mic_frames(frame_ms=FRAME_MS, max_seconds=None):
+    """Yield float32 16 kHz mono frames from the default microphone (needs sounddevice)."""
+    import sounddevice as sd
+
+    frame_len = int(SAMPLE_RATE * frame_ms / 1000)
+    q = queue.Queue()
+
+    def callback(indata, frames, time_info, status):
+        q.put(indata[:, 0].copy())
+
+    started = time.monotonic()
+    with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype="float32",
+                        blocksize=frame_len, callback=callback):
+        while max_seconds is None or time.monotonic() - started < max_seconds:
+            yield q.get()
+
+
+# ---------------- transcription ----------------
+
+class StreamingTranscriber:
+    """Whisper kept warm across utterances; transcribes float32 16 kHz arrays in memory."""
+
+    def __init__(self, model_size="tiny", transcribe_fn=None, language=None):
+        self.model_size = model_size
+        self.language = language
+        self._transcribe_fn = transcribe_fn
+        self._model = None
+
+    def warm_up(self):
+        if self._transcribe_fn is None and self._model is None:
+            import whisper
+            print("[asr] Loading Whisper model:", self.model_size)
+            self._model = whisper.load_model(self.model_size)
+        return self
+
+    def transcribe(self, audio):
+        """(text, lang) for one float32 16 kHz mono array."""
+        if self._transcribe_fn is not None:
+            return self._transcribe_fn(audio)
+        self.warm_up()
+        result = self._model.transcribe(audio, fp16=False, language=self.language)
+        return result.get("text", "").strip(), result.get("language")
+
+
+def stream_transcribe(frames, transcriber, partial_interval_s=PARTIAL_INTERVAL_S, match_entities=None):
+    """
+    Consume frames; yield events:
+      {"type": "entities", "district", "crop", "text"}  first partial naming a district/crop
+      {"type": "partial", "text"}                        interim transcript of the utterance so far
+      {"type": "final", "text", "lang", "audio_s"}       one finished utterance
+    match_entities(text) -> {"district", "crop", ...}; defaults to the entity vocabulary.
+    """
+    if match_entities is None:
+        from entity_vocab import get_vocabulary
+        match_entities = lambda text: get_vocabulary().match(text, fuzzy=False)  # noqa: E731
+
+    vad = VADSegmenter()
+    frame_s = vad.frame_len / SAMPLE_RATE
+    since_partial = 0.0
+    entities_sent = False
+
+    def final(audio):
+        text, lang = transcriber.transcribe(audio)
+        return {"type": "final", "text": text, "lang": lang, "audio_s": round(len(audio) / SAMPLE_RATE, 2)}
+
+    for frame in frames:
+        utterance = vad.feed(frame)
+        if utterance is not None:
+            yield final(utterance)
+            since_partial = 0.0
+            entities_sent = False
+            continue
+
+        if vad.in_speech and partial_interval_s > 0:
+            since_partial += frame_s
+            if since_partial >= partial_interval_s:
+                since_partial = 0.0
+                text, _ = transcriber.transcribe(vad.current())
+                yield {"type": "partial", "text": text}
+                if not entities_sent:
+                    found = match_entities(text)
+                    if found.get("district") or found.get("crop"):
+                        entities_sent = True
+                        yield {"type": "entities", "district": found.get("district"),
+                               "crop": found.get("crop"), "text": text}
+
+    utterance = vad.flush()
+    if utterance is not None and len(utterance):
+        yield final(utterance)
@@ -0,0 +1,353 @@
+# benchmarks/bench_hot_paths.py
+"""
+Benchmarks for the query path, inference and training preprocessing.
+
+    python benchmarks/bench_hot_paths.py                       # 1k / 100k / 1M rows
+    python benchmarks/bench_hot_paths.py --sizes 1k,100k --only generate_reply,lookup_dataset
+    python benchmarks/bench_hot_paths.py --save-baseline       # record benchmarks/baseline.json
+    python benchmarks/bench_hot_paths.py --baseline benchmarks/baseline.json --threshold 0.25
+
+Synthetic combined.csv files are generated once per size into benchmarks/.data/.
+Every hot path is timed with cold caches (module caches reset before each run) and
+warm caches (after a priming call). Results (median / p95 seconds, throughput and
+tracemalloc peak memory) are written as JSON. With --baseline the run fails (exit 1)
+when a median time or peak memory is worse than baseline * (1 + threshold).
+
+Runs offline on CPU only. Benchmarks whose dependencies are missing are skipped.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from synthetic_data import cached_dataset  # noqa: E402
+
+DATA_DIR = os.path.join(HERE, ".data")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_SIZES = "1k,100k,1M"
+QUERIES = [
+    "what is the yield of maize in kolhapur",
+    "सातारा में गेहूं के लिए खाद",
+    "jodhpur bajra pest problem",
+    "कोल्हापूर मध्ये पाणी वाटप",
+    "how much rainfall in north delhi for rice",
+    "alternative crops for my farm",
+]
+
+BENCHES = []
+
+
+def bench(name, scales=True):
+    """
+    Register a benchmark. The decorated function gets (dataset_path, rows) and returns
+    (callable_to_time, ops_per_call). scales=False benches don't depend on dataset size
+    and only run at the first size.
+    """
+    def wrap(setup):
+        BENCHES.append({"name": name, "setup": setup, "scales": scales})
+        return setup
+    return wrap
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    mult = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * mult)
+
+
+def reset_caches():
+    """
+    Drop every module-level cache the query path keeps, for cold-cache runs, and the
+    artifacts derived from the benchmark dataset on disk (vocab.json, cube.npz), which
+    would otherwise make the next "cold" run load instead of build.
+    """
+    import dataset_connector
+    from collections import OrderedDict
+    dataset_connector._dataset_cache = []
+    for mod_name, attr, value in [
+        ("entity_vocab", "_vocab", lambda: None),
+        ("templates", "_templates_cache", lambda: None),
+        ("weather_provider", "_provider", lambda: None),
+        ("data_loader", "_cube", lambda: None),
+        ("data_loader", "_cube_source", lambda: None),
+        ("ml_connector", "_residual_cache", dict),
+        ("ml_connector", "_leaf_table_cache", dict),
+        ("explanations", "_explainers", OrderedDict),
+        ("advisory_table", "_model_digest", dict),
+        ("advisory_table", "_table_generation", dict),
+    ]:
+        mod = sys.modules.get(mod_name)
+        if mod is not None and hasattr(mod, attr):
+            setattr(mod, attr, value())
+    # Only files next to the synthetic datasets; never the real combined.csv's artifacts.
+    dataset = os.path.abspath(dataset_connector.DATASET_PATH)
+    if os.path.dirname(dataset) == os.path.abspath(DATA_DIR):
+        import data_loader
+        import entity_vocab
+        for derived in (entity_vocab.vocab_path(dataset), data_loader.cube_path(dataset)):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(derived)
+
+
+def point_dataset(path):
+    import dataset_connector
+    dataset_connector.DATASET_PATH = path
+
+
+# ---------------- hot paths ----------------
+
+@bench("load_dataset")
+def _load_dataset(path, rows):
+    import dataset_connector
+    point_dataset(path)
+    return dataset_connector.load_dataset, rows
+
+
+@bench("lookup_dataset")
+def _lookup_dataset(path, rows):
+    import dataset_connector
+    point_dataset(path)
+
+    def run():
+        dataset_connector.lookup_dataset("yield", district="Satara", crop="Rice")
+        # miss -> falls through every scan
+        dataset_connector.lookup_dataset("yield", district="Nowhere", crop="Nothing")
+    return run, 2
+
+
+@bench("generate_reply")
+def _generate_reply(path, rows):
+    import voice_assistant
+    point_dataset(path)
+
+    def run():
+        for q in QUERIES:
+            voice_assistant.generate_reply("unknown", lang_code="en", user_text=q)
+    return run, len(QUERIES)
+
+
+@bench("detect_intent", scales=False)
+def _detect_intent(path, rows):
+    import voice_assistant
+    queries = QUERIES * 200
+
+    def run():
+        for q in queries:
+            voice_assistant.detect_intent(q)
+    return run, len(queries)
+
+
+@bench("generate_filled_template")
+def _generate_filled_template(path, rows):
+    import templates
+
+    def run():
+        templates.generate_filled_template("yield", lang="en", district="Satara", crop="Rice", data_path=path)
+    return run, 1
+
+
+@bench("predict_yield", scales=False)
+def _predict_yield(path, rows):
+    import ml_connector
+    if ml_connector.BEST_MODEL_PIPELINE is None:
+        raise RuntimeError("model not loaded")
+    features = {
+        "District_Name": "Kolhapur", "Crop": "Maize", "Season": "Kharif", "Month": "July",
+        "Rainfall": 600, "Temperature": 27, "Nitrogen": 60, "Phosphorus": 30, "Potassium": 40,
+        "pH": 6.8, "Fertilizer": "Urea", "Soil_color": "Black",
+    }
+    return (lambda: ml_connector.predict_yield(features)), 1
+
+
+@bench("predict_yield_batch")
+def _predict_yield_batch(path, rows):
+    import csv
+    import ml_connector
+    if ml_connector.BEST_MODEL_PIPELINE is None:
+        raise RuntimeError("model not loaded")
+    n = min(rows, 20000)
+    with open(path, encoding="utf-8") as f:
+        batch = [r for _, r in zip(range(n), csv.DictReader(f))]
+    return (lambda: ml_connector.predict_yield_batch(batch)), len(batch)
+
+
+@bench("training_preprocess")
+def _training_preprocess(path, rows):
+    import crop_yield_prediction as cyp
+
+    def run():
+        headers, data = cyp.read_csv_as_dicts(path)
+        numeric_cols, categorical_cols = cyp.detect_column_types(headers, data, cyp.TARGET_COLUMN)
+        X_dicts, y = cyp.build_feature_matrix(headers, data, numeric_cols, categorical_cols, cyp.TARGET_COLUMN)
+        cyp.dicts_to_matrix(X_dicts, numeric_cols, categorical_cols)
+    return run, rows
+
+
+# ---------------- measurement ----------------
+
+@contextlib.contextmanager
+def quiet():
+    """The query path prints progress lines; keep them out of the benchmark output."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def measure(fn, cold, min_time, max_reps):
+    times = []
+    total = 0.0
+    while len(times) < max_reps and (total < min_time or len(times) < 3):
+        if cold:
+            reset_caches()
+        with quiet():
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+        times.append(elapsed)
+        total += elapsed
+        if elapsed > min_time * 5:
+            break  # one slow run is enough signal (1M-row cold loads)
+
+    if cold:
+        reset_caches()
+    tracemalloc.start()
+    try:
+        with quiet():
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run_benchmarks(sizes, only=None, min_time=0.5, max_reps=30):
+    results = []
+    for size_no, rows in enumerate(sizes):
+        path = cached_dataset(DATA_DIR, rows)
+        for b in BENCHES:
+            if only and b["name"] not in only:
+                continue
+            if not b["scales"] and size_no > 0:
+                continue
+            try:
+                reset_caches()
+                with quiet():
+                    fn, ops = b["setup"](path, rows)
+            except Exception as e:
+                print(f"[bench] skip {b['name']}: {e}")
+                continue
+            for cache in ("cold", "warm"):
+                if cache == "warm":
+                    with quiet():
+                        fn()  # prime
+                times, peak = measure(fn, cold=(cache == "cold"), min_time=min_time, max_reps=max_reps)
+                median = statistics.median(times)
+                p95 = sorted(times)[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))]
+                res = {
+                    "bench": b["name"],
+                    "rows": rows if b["scales"] else None,
+                    "cache": cache,
+                    "reps": len(times),
+                    "median_s": median,
+                    "mean_s": statistics.fmean(times),
+                    "p95_s": p95,
+                    "min_s": min(times),
+                    "ops_per_s": ops / median if median else None,
+                    "peak_mem_bytes": peak,
+                }
+                results.append(res)
+                print(f"[bench] {b['name']:<26} rows={str(res['rows']):>8} {cache:<4} "
+                      f"median={median * 1000:10.3f} ms  p95={p95 * 1000:10.3f} ms  "
+                      f"{res['ops_per_s'] or 0:12.1f} ops/s  peak={peak / 1e6:8.2f} MB")
+    return results
+
+
+def result_key(res):
+    return f"{res['bench']}@{res['rows']}/{res['cache']}"
+
+
+# Absolute slack per metric so sub-microsecond cache hits and tiny allocations
+# don't flag as regressions on timer/allocator noise.
+MIN_DELTA = {"median_s": 50e-6, "peak_mem_bytes": 64 * 1024}
+
+
+def compare(results, baseline, threshold):
+    """Return list of regression messages (empty if everything is within threshold)."""
+    base = {result_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for res in results:
+        old = base.get(result_key(res))
+        if not old:
+            continue
+        for metric, slack in MIN_DELTA.items():
+            before, after = old.get(metric), res.get(metric)
+            if before and after and after > before * (1 + threshold) and after - before > slack:
+                regressions.append(
+                    f"{result_key(res)} {metric}: {before:.6g} -> {after:.6g} (+{(after / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma list, e.g. 1k,100k,1M")
+    parser.add_argument("--only", help="Comma list of benchmark names")
+    parser.add_argument("--out", help="Where to write results JSON (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown fraction (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to spend per measurement")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # model / dataset paths in the app modules are relative
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    only = set(args.only.split(",")) if args.only else None
+
+    results = run_benchmarks(sizes, only=only, min_time=args.min_time)
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+
+    out = args.out or os.path.join(HERE, "results", datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[bench] Results written to {out}")
+
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[bench] Baseline saved to {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"[bench] {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for msg in regressions:
+                print("  -", msg)
+            return 1
+        print(f"[bench] No regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# benchmarks/check_import_time.py
+"""
+Startup budget for the CLI text path (what server.js spawns per query).
+
+    python benchmarks/check_import_time.py                  # default budget 250 ms
+    python benchmarks/check_import_time.py --budget-ms 150 --runs 7
+
+Each run imports voice_assistant in a fresh interpreter and measures the import
+alone (interpreter start-up excluded). Fails (exit 1) when the median is over
+budget, or when a heavy module (numpy, sklearn, joblib, torch, whisper, ...) is
+loaded at import time -- those must stay behind the first call that needs them.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+MODULE = "voice_assistant"
+HEAVY_MODULES = ["numpy", "sklearn", "scipy", "joblib", "torch", "whisper", "sounddevice", "pyttsx3", "ml_connector"]
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module=MODULE):
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", "250")))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default=MODULE)
+    args = parser.parse_args(argv)
+
+    samples = [measure(args.module) for _ in range(args.runs)]
+    times_ms = sorted(s["seconds"] * 1000 for s in samples)
+    median = statistics.median(times_ms)
+    heavy = sorted({m for s in samples for m in s["heavy"]})
+    print(f"[import] {args.module}: median {median:.1f} ms, min {times_ms[0]:.1f} ms, "
+          f"max {times_ms[-1]:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if heavy:
+        print(f"[import] Heavy modules loaded at import time: {', '.join(heavy)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"[import] Over budget by {median - args.budget_ms:.1f} ms")
+        failed = True
+    if not failed:
+        print("[import] OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
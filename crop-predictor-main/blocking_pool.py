@@ -0,0 +1,112 @@
+# blocking_pool.py
+"""
+Bounded worker pool for running blocking NLP/ML work off the asyncio event loop.
+
+- At most `workers` calls run at once, and at most `max_pending` more may wait.
+  Anything beyond that is rejected straight away (PoolSaturated) so a traffic spike
+  turns into fast 503s instead of an ever-growing queue.
+- Each call has a timeout (PoolTimeout). The worker thread can't be killed, so its
+  slot stays taken until the call really finishes; the bound stays honest.
+- Every call reports how long it waited in the queue vs. how long it actually ran.
+
+Threads (not processes) are used on purpose: the model, dataset caches and templates
+are already in memory in this process, and CSV parsing / numpy / sklearn spend most of
+their time outside the GIL or in short slices, so threads keep the loop responsive
+without copying anything.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already has workers + max_pending calls in flight."""
+
+
+class PoolTimeout(Exception):
+    """Raised when a call did not finish within the pool timeout."""
+
+
+class BlockingPool:
+    def __init__(self, workers=None, max_pending=None, timeout_s=None, name="blocking"):
+        self.workers = workers or int(os.environ.get("CHAT_WORKERS", str(min(16, (os.cpu_count() or 1) * 2))))
+        self.max_pending = max_pending if max_pending is not None else int(os.environ.get("CHAT_MAX_PENDING", "64"))
+        self.timeout_s = timeout_s or float(os.environ.get("CHAT_TIMEOUT_S", "20"))
+        self.name = name
+        self._executor = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.stats = {"submitted": 0, "completed": 0, "rejected": 0, "timed_out": 0, "failed": 0}
+
+    @property
+    def capacity(self):
+        return self.workers + self.max_pending
+
+    @property
+    def inflight(self):
+        return self._inflight
+
+    def _get_executor(self):
+        # Lazy so a pre-forking launcher doesn't hand the same threads to every child.
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._inflight -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the pool.
+        Returns (result, {"queue_ms": ..., "service_ms": ...}).
+        """
+        with self._lock:
+            if self._inflight >= self.capacity:
+                self.stats["rejected"] += 1
+                raise PoolSaturated(f"{self.name} pool is full ({self._inflight} in flight)")
+            self._inflight += 1
+            self.stats["submitted"] += 1
+
+        timings = {}
+        submitted = time.perf_counter()
+
+        def timed_call():
+            started = time.perf_counter()
+            timings["queue_ms"] = round((started - submitted) * 1000, 2)
+            tracing.observe(f"{self.name}.queue_wait", started - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finished = time.perf_counter()
+                timings["service_ms"] = round((finished - started) * 1000, 2)
+                tracing.observe(f"{self.name}.service", finished - started)
+
+        try:
+            future = self._get_executor().submit(timed_call)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise PoolTimeout(f"{self.name} call exceeded {self.timeout_s}s")
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        self.stats["completed"] += 1
+        return result, timings
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
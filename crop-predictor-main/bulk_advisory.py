@@ -0,0 +1,221 @@
+# bulk_advisory.py
+"""
+Bulk advisory reports: one advisory per (district, crop, season) in combined.csv.
+
+    python bulk_advisory.py --out reports/2025-07 --month July --format csv --workers 4
+
+- Keys are enumerated in one pass over the dataset; each key gets the mean of its
+  numeric columns and the most common fertilizer / soil colour.
+- Weather comes from weather_provider for the chosen month (dataset mean otherwise).
+- Keys are split into fixed shards. Each shard is processed in a worker process:
+  one batched model predict (ml_connector.predict_yield_batch) and the vectorized
+  rule engine (templates.advice_sections_batch), then written to its own
+  JSONL/CSV file via a temp file + rename.
+- --lang hi / mr renders the advisory text from the offline tables in localization.py.
+- Restartable: a manifest records the run parameters; rerunning the same command
+  skips shards whose output file already exists.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import dataset_connector
+import ml_connector
+import templates
+import weather_provider
+
+DEFAULT_SHARD_SIZE = 500
+MANIFEST_NAME = "manifest.json"
+KEY_COLUMNS = ["District_Name", "Crop", "Season"]
+NUMERIC_COLUMNS = ["Rainfall", "Temperature", "Nitrogen", "Phosphorus", "Potassium", "pH"]
+OUTPUT_COLUMNS = KEY_COLUMNS + ["Month"] + NUMERIC_COLUMNS + ["Fertilizer", "Soil_color", "Yield"] \
+    + templates.ADVICE_SECTIONS + ["advisory"]
+
+
+def enumerate_keys(rows):
+    """
+    One pass over the dataset rows -> sorted list of feature dicts, one per
+    distinct (District_Name, Crop, Season).
+    """
+    groups = {}
+    for r in rows:
+        key = tuple((r.get(c) or "").strip() for c in KEY_COLUMNS)
+        if not key[0] or not key[1]:
+            continue
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = {
+                "sums": [0.0] * len(NUMERIC_COLUMNS),
+                "counts": [0] * len(NUMERIC_COLUMNS),
+                "fertilizer": Counter(),
+                "soil": Counter(),
+            }
+        for i, col in enumerate(NUMERIC_COLUMNS):
+            try:
+                g["sums"][i] += float(r.get(col))
+                g["counts"][i] += 1
+            except (TypeError, ValueError):
+                pass
+        g["fertilizer"][(r.get("Fertilizer") or "Urea").strip()] += 1
+        g["soil"][(r.get("Soil_color") or r.get("Soil_Color") or "Black").strip()] += 1
+
+    keys = []
+    for key in sorted(groups):
+        g = groups[key]
+        features = dict(zip(KEY_COLUMNS, key))
+        for i, col in enumerate(NUMERIC_COLUMNS):
+            features[col] = round(g["sums"][i] / g["counts"][i], 2) if g["counts"][i] else None
+        features["Fertilizer"] = g["fertilizer"].most_common(1)[0][0]
+        features["Soil_color"] = g["soil"].most_common(1)[0][0]
+        keys.append(features)
+    return keys
+
+
+def _apply_weather(features, month):
+    out = dict(features, Month=month)
+    weather = weather_provider.get_provider().get_monthly(out["District_Name"], month)
+    if weather:
+        out.update(weather)
+    defaults = {"Rainfall": 200.0, "Temperature": 28.0, "Nitrogen": 50, "Phosphorus": 30, "Potassium": 20, "pH": 7}
+    for col, default in defaults.items():
+        if out.get(col) is None:
+            out[col] = default
+    return out
+
+
+def render_shard(keys, month, lang="en"):
+    """Batch predict + vectorized advice for one shard. Returns output records."""
+    features = [_apply_weather(k, month) for k in keys]
+    yields = ml_connector.predict_yield_batch(features)
+    advice = templates.advice_sections_batch([
+        {
+            "district": f["District_Name"], "crop": f["Crop"], "month": f["Month"],
+            "rainfall": float(f["Rainfall"]), "temperature": float(f["Temperature"]),
+            "soil": f["Soil_color"], "fertilizer": f["Fertilizer"],
+            "nitrogen": f["Nitrogen"], "phosphorus": f["Phosphorus"], "potassium": f["Potassium"],
+            "ph": f["pH"], "predicted_yield": "N/A" if y is None else y,
+        }
+        for f, y in zip(features, yields)
+    ], lang=lang)
+    records = []
+    for f, y, sections in zip(features, yields, advice):
+        rec = dict(f, Yield=y)
+        rec.update(sections)
+        rec["advisory"] = "\n".join(sections[name] for name in templates.ADVICE_SECTIONS)
+        records.append(rec)
+    return records
+
+
+def _shard_path(out_dir, shard_no, fmt):
+    return os.path.join(out_dir, f"advisory-{shard_no:05d}.{fmt}")
+
+
+def _write_records(path, records, fmt):
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=OUTPUT_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            for rec in records:
+                f.write(json.dumps({c: rec.get(c) for c in OUTPUT_COLUMNS}, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def run_shard(shard_no, keys, month, out_dir, fmt, lang="en"):
+    """Worker entry point: render and write one shard. Returns (shard_no, rows, seconds)."""
+    started = time.perf_counter()
+    records = render_shard(keys, month, lang)
+    _write_records(_shard_path(out_dir, shard_no, fmt), records, fmt)
+    return shard_no, len(records), time.perf_counter() - started
+
+
+def _dataset_fingerprint(path):
+    try:
+        st = os.stat(path)
+        return {"path": os.path.abspath(path), "size": st.st_size, "mtime": int(st.st_mtime)}
+    except OSError:
+        return {"path": os.path.abspath(path)}
+
+
+def _check_manifest(out_dir, manifest, force):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if os.path.exists(path) and not force:
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise SystemExit(
+                f"[bulk] {out_dir} holds a run with different parameters; use a new --out or --force."
+            )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def run_bulk(data_path, out_dir, month, fmt="jsonl", shard_size=DEFAULT_SHARD_SIZE, workers=None, force=False,
+             lang="en"):
+    os.makedirs(out_dir, exist_ok=True)
+    dataset_connector.DATASET_PATH = data_path
+    rows = dataset_connector.load_dataset()
+    if not rows:
+        raise SystemExit(f"[bulk] No rows loaded from {data_path}")
+
+    keys = enumerate_keys(rows)
+    shards = [keys[i:i + shard_size] for i in range(0, len(keys), shard_size)]
+    manifest = {
+        "dataset": _dataset_fingerprint(data_path),
+        "month": month,
+        "lang": lang,
+        "format": fmt,
+        "shard_size": shard_size,
+        "keys": len(keys),
+        "shards": len(shards),
+    }
+    _check_manifest(out_dir, manifest, force)
+
+    pending = [i for i in range(len(shards)) if force or not os.path.exists(_shard_path(out_dir, i, fmt))]
+    skipped = len(shards) - len(pending)
+    print(f"[bulk] {len(keys)} keys in {len(shards)} shards; {skipped} already done, {len(pending)} to run.")
+    if not pending:
+        return manifest
+
+    started = time.perf_counter()
+    done_rows = 0
+    total_rows = sum(len(shards[i]) for i in pending)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_shard, i, shards[i], month, out_dir, fmt, lang) for i in pending]
+        for n, fut in enumerate(as_completed(futures), 1):
+            shard_no, rows_written, seconds = fut.result()
+            done_rows += rows_written
+            elapsed = time.perf_counter() - started
+            rate = done_rows / elapsed if elapsed else 0.0
+            eta = (total_rows - done_rows) / rate if rate else 0.0
+            print(f"[bulk] shard {shard_no} done ({rows_written} rows, {seconds:.2f}s) | "
+                  f"{n}/{len(pending)} shards, {done_rows}/{total_rows} keys, {rate:.0f} keys/s, ETA {eta:.0f}s")
+    print(f"[bulk] Finished {total_rows} keys in {time.perf_counter() - started:.1f}s -> {out_dir}")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate advisories for every district x crop x season.")
+    parser.add_argument("--data", default=dataset_connector.DATASET_PATH)
+    parser.add_argument("--out", required=True, help="Output directory for shard files")
+    parser.add_argument("--month", default=time.strftime("%B"))
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--lang", choices=["en", "hi", "mr"], default="en", help="Advisory language")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--force", action="store_true", help="Recompute every shard")
+    args = parser.parse_args(argv)
+    run_bulk(args.data, args.out, args.month, fmt=args.format, shard_size=args.shard_size,
+             workers=args.workers, force=args.force, lang=args.lang)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
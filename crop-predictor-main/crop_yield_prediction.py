@@ -10,6 +10,7 @@ Adjust CSV_PATH and OUTPUT_MODEL_PATH as needed.
 """
 import os
 import csv
+import json
 import joblib
 import numpy as np
 import matplotlib.pyplot as plt
@@ -26,6 +27,8 @@ from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 # Set local path to your CSV (example: "Final_Dataset_with_Yield.csv")
 CSV_PATH = "combined.csv"
 OUTPUT_MODEL_PATH = "Model_Yield_Predict.joblib"
+# Held-out residual quantiles (0, 0.01, ..., 1) -> prediction intervals in ml_connector
+RESIDUALS_PATH = os.path.splitext(OUTPUT_MODEL_PATH)[0] + ".residuals.json"
 SAMPLE_FRACTION = 1.0     # use 1.0 for full dataset, <1.0 for sampling
 RANDOM_STATE = 42
 RF_N_ESTIMATORS = 200
@@ -281,6 +284,34 @@ def main():
 
     # Residuals histogram
     residuals = y_test - preds
+    with open(RESIDUALS_PATH, "w", encoding="utf-8") as f:
+        json.dump({"model": best_name, "n": int(len(residuals)),
+                   "quantiles": np.quantile(residuals, np.linspace(0, 1, 101)).round(4).tolist()}, f)
+    print("Saved residual quantiles to:", RESIDUALS_PATH)
+
+    # Precompute explanations for the most frequent (district, crop) queries
+    try:
+        import explanations
+        n = explanations.precompute(best_pipe, rows, path=os.path.splitext(OUTPUT_MODEL_PATH)[0] + ".explanations.json")
+        print(f"Precomputed explanations for {n} (district, crop) keys")
+    except Exception as e:
+        print("Could not precompute explanations:", e)
+
+    # Publish to the model registry; a running app.py picks it up without a restart
+    try:
+        import model_registry
+        best_res = rf_res if best_name == "RandomForest" else gbr_res
+        version = model_registry.publish(
+            best_pipe,
+            metadata={"model": best_name, "n_rows": len(rows),
+                      "metrics": {k: float(best_res[k]) for k in ("rmse", "mae", "r2")}},
+            artifacts={"residuals.json": RESIDUALS_PATH,
+                       "explanations.json": os.path.splitext(OUTPUT_MODEL_PATH)[0] + ".explanations.json"},
+            canary=rows[:16],
+        )
+        print(f"Published model {version} to {model_registry.REGISTRY_DIR}")
+    except Exception as e:
+        print("Could not publish to the model registry:", e)
     plt.figure(figsize=(8,5))
     plt.hist(residuals, bins=50)
     plt.xlabel("Residual (True - Predicted)")
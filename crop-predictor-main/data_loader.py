@@ -0,0 +1,260 @@
+# data_loader.py
+"""
+Pre-aggregated statistics over combined.csv, answered with dict lookups.
+
+    get_average("Kolhapur", "Rainfall")                       # mean over all Kolhapur rows
+    get_average("Kolhapur", "Yield", crop="Maize", season="Kharif")
+    get_latest_value("Kolhapur", "Soil_color")                 # last row in file order
+    get_stats("Kolhapur", crop="Maize")["Yield"]               # count/mean/min/max/latest/p10..p90
+
+The cube is keyed by (district, crop, month, season), lower-cased, where any part may
+be "*" (all values), so every one of the 16 roll-ups of a key is a cell of its own.
+It is built from one pass over the rows into NumPy columns; each roll-up is then a
+sort-based group-by, giving per numeric column: count, mean, min, max, latest and the
+p10/p25/p50/p75/p90 quantiles, plus the latest value of the categorical columns.
+The dataset has no date column, so "latest" means the last row in file order (new
+data is appended).
+
+The cube is saved next to the dataset (combined.cube.npz) with the dataset's sha1 and
+rebuilt only when the file changes (with the SQLite backend: when rows are appended,
+see sqlite_backend.SqliteRows.version). Lookups are a dict hit plus an array index.
+"""
+import itertools
+import os
+import threading
+
+import numpy as np
+
+import dataset_connector
+from entity_vocab import dataset_checksum
+
+CUBE_VERSION = 1
+ALL = "*"
+DIMENSIONS = ("District_Name", "Crop", "Month", "Season")
+NUMERIC_COLUMNS = ("Nitrogen", "Phosphorus", "Potassium", "pH", "Rainfall", "Temperature", "Yield")
+CATEGORICAL_COLUMNS = ("Soil_color", "Fertilizer", "Season", "Month")
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+STATS = ("count", "mean", "min", "max", "latest") + tuple(f"p{int(q * 100)}" for q in QUANTILES)
+
+# Every subset of DIMENSIONS to roll up over (True = keep the value, False = "*").
+_ROLLUPS = list(itertools.product((True, False), repeat=len(DIMENSIONS)))
+
+
+def cube_path(dataset_path):
+    return os.path.splitext(dataset_path)[0] + ".cube.npz"
+
+
+def cell_key(district=None, crop=None, month=None, season=None):
+    return "|".join(str(v).strip().lower() if v else ALL for v in (district, crop, month, season))
+
+
+class Cube:
+    """keys[i] -> numeric[i, column, stat] and labels[i, categorical column]."""
+
+    def __init__(self, keys, numeric, labels):
+        self.keys = list(keys)
+        self.numeric = numeric
+        self.labels = labels
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        self._num_col = {c: i for i, c in enumerate(NUMERIC_COLUMNS)}
+        self._cat_col = {c: i for i, c in enumerate(CATEGORICAL_COLUMNS)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def value(self, key, column, stat):
+        """One statistic, or None if the cell / column has no data."""
+        i = self.index.get(key)
+        if i is None:
+            return None
+        if column in self._num_col:
+            cell = self.numeric[i, self._num_col[column]]
+            if not cell[0]:
+                return None
+            v = cell[STATS.index(stat)]
+            return int(v) if stat == "count" else float(v)
+        if column in self._cat_col and stat == "latest":
+            return str(self.labels[i, self._cat_col[column]]) or None
+        return None
+
+    def stats(self, key):
+        """{column: {stat: value}} for one cell ({} if the cell doesn't exist)."""
+        i = self.index.get(key)
+        if i is None:
+            return {}
+        out = {}
+        for j, col in enumerate(NUMERIC_COLUMNS):
+            cell = self.numeric[i, j]
+            if cell[0]:
+                out[col] = {s: (int(v) if s == "count" else float(v)) for s, v in zip(STATS, cell)}
+        for j, col in enumerate(CATEGORICAL_COLUMNS):
+            label = str(self.labels[i, j])
+            if label:
+                out.setdefault(col, {})["latest"] = label
+        return out
+
+    def save(self, path, checksum):
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, version=CUBE_VERSION, checksum=checksum, keys=np.array(self.keys, dtype=str),
+                            numeric=self.numeric, labels=self.labels)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, checksum):
+        """The saved cube, or None if missing / stale / from another version."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != CUBE_VERSION or str(data["checksum"]) != checksum:
+                    return None
+                return cls(data["keys"].tolist(), data["numeric"], data["labels"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def _columns(rows):
+    """One pass over rows -> dimension codes, numeric matrix and label matrix."""
+    n = len(rows)
+    dims = [[] for _ in DIMENSIONS]
+    values = np.full((n, len(NUMERIC_COLUMNS)), np.nan)
+    labels = np.empty((n, len(CATEGORICAL_COLUMNS)), dtype=object)
+    for r, row in enumerate(rows):
+        for d, col in enumerate(DIMENSIONS):
+            dims[d].append(str(row.get(col, "") or "").strip().lower())
+        for c, col in enumerate(NUMERIC_COLUMNS):
+            try:
+                values[r, c] = float(row[col])
+            except (KeyError, TypeError, ValueError):
+                pass
+        for c, col in enumerate(CATEGORICAL_COLUMNS):
+            labels[r, c] = str(row.get(col) or "")
+    codes, uniques = [], []
+    for column in dims:
+        u, inv = np.unique(np.array(column, dtype=str), return_inverse=True)
+        uniques.append(list(u) + [ALL])  # code len(u) means "*"
+        codes.append(inv.astype(np.int64))
+    return codes, uniques, values, labels
+
+
+def _group_stats(group, n_groups, values):
+    """Per-group stats of one numeric column -> array [n_groups, len(STATS)] (count 0 = no data)."""
+    out = np.zeros((n_groups, len(STATS)))
+    rows = np.flatnonzero(~np.isnan(values))
+    if not len(rows):
+        return out
+    order = rows[np.lexsort((values[rows], group[rows]))]
+    g, v = group[order], values[order]
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    counts = np.diff(np.r_[starts, len(g)])
+    ends = starts + counts - 1
+    ids = g[starts]
+    out[ids, 0] = counts
+    out[ids, 1] = np.add.reduceat(v, starts) / counts
+    out[ids, 2] = v[starts]
+    out[ids, 3] = v[ends]
+    out[ids, 4] = values[np.maximum.reduceat(order, starts)]
+    for k, q in enumerate(QUANTILES):
+        offset = q * (counts - 1)
+        lo = starts + np.floor(offset).astype(np.int64)
+        hi = np.minimum(lo + 1, ends)
+        out[ids, 5 + k] = v[lo] + (v[hi] - v[lo]) * (offset - np.floor(offset))
+    return out
+
+
+def build_cube(rows):
+    """Cube over all roll-ups of (district, crop, month, season)."""
+    codes, uniques, values, labels = _columns(rows)
+    sizes = [len(u) for u in uniques]
+    all_keys, all_numeric, all_labels = [], [], []
+    for keep in _ROLLUPS:
+        combined = np.zeros(len(rows), dtype=np.int64)
+        for d, k in enumerate(keep):
+            combined = combined * sizes[d] + (codes[d] if k else sizes[d] - 1)
+        cells, group = np.unique(combined, return_inverse=True)
+        group = group.ravel()
+
+        for cell in cells.tolist():
+            parts = []
+            for size, u in zip(reversed(sizes), reversed(uniques)):
+                parts.append(u[cell % size])
+                cell //= size
+            all_keys.append("|".join(reversed(parts)))
+
+        numeric = np.stack([_group_stats(group, len(cells), values[:, c]) for c in range(values.shape[1])], axis=1)
+        cell_labels = np.full((len(cells), len(CATEGORICAL_COLUMNS)), "", dtype=object)
+        for c in range(len(CATEGORICAL_COLUMNS)):
+            has = np.flatnonzero(labels[:, c] != "")
+            last = np.full(len(cells), -1, dtype=np.int64)
+            np.maximum.at(last, group[has], has)
+            found = last >= 0
+            cell_labels[found, c] = labels[last[found], c]
+        all_numeric.append(numeric)
+        all_labels.append(cell_labels)
+
+    numeric = np.concatenate(all_numeric) if all_numeric else np.zeros((0, len(NUMERIC_COLUMNS), len(STATS)))
+    label_arr = np.concatenate(all_labels) if all_labels else np.zeros((0, len(CATEGORICAL_COLUMNS)), dtype=object)
+    return Cube(all_keys, numeric, label_arr.astype(str))
+
+
+def load_or_build(dataset_path=None, rows=None, version=None):
+    """Reuse <dataset>.cube.npz when it matches the dataset's checksum (or version, for
+    SQLite rows that grow by appends), else build and save."""
+    dataset_path = dataset_path or dataset_connector.DATASET_PATH
+    try:
+        checksum = version or dataset_checksum(dataset_path)
+    except OSError as e:
+        print(f"[cube] Could not read dataset {dataset_path}: {e}")
+        return Cube([], np.zeros((0, len(NUMERIC_COLUMNS), len(STATS))), np.zeros((0, len(CATEGORICAL_COLUMNS)), dtype=str))
+
+    path = cube_path(dataset_path)
+    cube = Cube.load(path, checksum)
+    if cube is not None:
+        return cube
+
+    if rows is None:
+        if dataset_path == dataset_connector.DATASET_PATH or version:
+            rows = dataset_connector.load_dataset()
+        else:
+            import csv
+            with open(dataset_path, encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+    cube = build_cube(rows)
+    try:
+        cube.save(path, checksum)
+    except OSError as e:
+        print(f"[cube] Could not save {path}: {e}")
+    return cube
+
+
+_cube = None
+_cube_source = None
+_lock = threading.Lock()
+
+
+def get_cube():
+    """The cube for dataset_connector.DATASET_PATH (loaded once; reloaded if the path
+    changes, or with the SQLite backend when rows have been appended)."""
+    global _cube, _cube_source
+    path = dataset_connector.DATASET_PATH
+    version = dataset_connector.dataset_version()
+    source = (path, version)
+    if _cube is None or _cube_source != source:
+        with _lock:
+            if _cube is None or _cube_source != source:
+                _cube = load_or_build(path, version=version)
+                _cube_source = source
+    return _cube
+
+
+def get_stats(district=None, crop=None, month=None, season=None):
+    """{column: stats} for the cell, or {} if no rows match."""
+    return get_cube().stats(cell_key(district, crop, month, season))
+
+
+def get_average(district, column, crop=None, month=None, season=None):
+    """Mean of a numeric column for the matching rows (None if there are none)."""
+    return get_cube().value(cell_key(district, crop, month, season), column, "mean")
+
+
+def get_latest_value(district, column, crop=None, month=None, season=None):
+    """Value of column in the last matching row (None if there are none)."""
+    return get_cube().value(cell_key(district, crop, month, season), column, "latest")
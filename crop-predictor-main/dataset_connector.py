@@ -1,87 +1,56 @@
 import csv
 import os
 
+import localization
+
 # Path to your dataset (Final_Dataset_2.csv in same folder)
 DATASET_PATH = os.path.join(os.path.dirname(__file__), "combined.csv")
 
 # Cache for loaded rows
 _dataset_cache = []
 
-# dataset_connector.py (add at bottom)
-
-# Simple dictionaries for translating placeholders
-TRANSLATIONS = {
-    "hi": {
-        "district": {
-            "Jodhpur": "जोधपुर",
-            "Kolhapur": "कोल्हापुर",
-            "Pune": "पुणे",
-        },
-        "crop": {
-            "Bajra": "बाजरा",
-            "Maize": "मक्का",
-        },
-        "soil": {
-            "Pale Yellow": "फीका पीला",
-            "Light Brown": "हल्का भूरा",
-            "Yellow Brown": "पीला-भूरा",
-            "Sandy Brown": "रेतीला भूरा",
-            "Dark Brown": "गहरा भूरा",
-        },
-    },
-    "mr": {
-        "district": {
-            "Jodhpur": "जोधपूर",
-            "Kolhapur": "कोल्हापूर",
-            "Pune": "पुणे",
-        },
-        "crop": {
-            "Bajra": "बाजरी",
-            "Maize": "मका",
-        },
-        "soil": {
-            "Pale Yellow": "फिकट पिवळा",
-            "Light Brown": "फिकट तपकिरी",
-            "Yellow Brown": "पिवळट तपकिरी",
-            "Sandy Brown": "वालुकामय तपकिरी",
-            "Dark Brown": "गडद तपकिरी",
-        },
-    },
-}
-
-def localize_row(row_dict, lang_code="en"):
-    """
-    Translate district/crop/soil fields if lang_code is hi/mr.
-    """
-    lang = "hi" if str(lang_code).startswith("hi") else "mr" if str(lang_code).startswith("mr") else "en"
-    if lang == "en":
-        return row_dict  # no change
-
-    translated = dict(row_dict)
-    for field in ["district", "crop", "soil"]:
-        original = row_dict.get(field, "")
-        mapping = TRANSLATIONS.get(lang, {}).get(field, {})
-        if original in mapping:
-            translated[field] = mapping[original]
-    return translated
-
 def load_dataset():
-    """Load the CSV once into memory."""
+    """Load the CSV once into memory (or open the SQLite / shared-memory copy,
+    see sqlite_backend.py and shared_dataset.py)."""
     global _dataset_cache
     if _dataset_cache:
         return _dataset_cache
 
-    try:
-        with open(DATASET_PATH, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            _dataset_cache = [row for row in reader]
-    except Exception as e:
-        print(f"[ERROR] Could not load dataset: {e}")
-        _dataset_cache = []
+    import shared_dataset
+    import sqlite_backend
+    shared = sqlite_backend.rows_for(DATASET_PATH) or shared_dataset.rows_for(DATASET_PATH)
+    if shared is not None:
+        _dataset_cache = shared
+    else:
+        try:
+            with open(DATASET_PATH, "r", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                _dataset_cache = [row for row in reader]
+        except Exception as e:
+            print(f"[ERROR] Could not load dataset: {e}")
+            _dataset_cache = []
+
+    if _dataset_cache:
+        # Entity vocabulary is built (or reloaded from disk) once per dataset version.
+        import entity_vocab
+        try:
+            entity_vocab.build_for_dataset(_dataset_cache, DATASET_PATH)
+        except Exception as e:
+            print(f"[vocab] Could not build entity vocabulary: {e}")
 
     return _dataset_cache
 
 
+def dataset_version():
+    """Version of rows that change in place (SQLite appends), else None: derived
+    artifacts (vocabulary, stats cube) then stay keyed on the CSV's sha1."""
+    import sqlite_backend
+    if not sqlite_backend.enabled():
+        return None
+    rows = load_dataset()
+    return rows.version() if hasattr(rows, "version") else None
+
+
 def lookup_dataset(intent, district=None, crop=None):
     """
     Look up dataset values for district & crop.
@@ -89,27 +58,38 @@ def lookup_dataset(intent, district=None, crop=None):
     """
     rows = load_dataset()
 
-    district = (district or "").strip().lower()
-    crop = (crop or "").strip().lower()
-
     # 1. Exact match: district + crop
-    for row in rows:
-        if (row.get("District_Name", "").strip().lower() == district and
-                row.get("Crop", "").strip().lower() == crop):
-            return normalize_row(row)
+    row = first_match(rows, District_Name=district, Crop=crop)
 
     # 2. Match by district only
-    for row in rows:
-        if row.get("District_Name", "").strip().lower() == district:
-            return normalize_row(row)
+    if row is None:
+        row = first_match(rows, District_Name=district)
 
     # 3. Match by crop only
-    for row in rows:
-        if row.get("Crop", "").strip().lower() == crop:
-            return normalize_row(row)
+    if row is None:
+        row = first_match(rows, Crop=crop)
+
+    if row is not None:
+        return normalize_row(row)
 
     # 4. Default → first row
     return normalize_row(rows[0]) if rows else {}
+
+
+def first_match(rows, **equals):
+    """First row whose columns equal the values (case-insensitive), or None.
+    SQLite rows answer with an indexed query, shared-memory rows from their
+    column codes, instead of a scan."""
+    if hasattr(rows, "first"):
+        return rows.first(**equals)
+    if hasattr(rows, "indices"):
+        idx = rows.indices(**equals)
+        return rows[int(idx[0])] if len(idx) else None
+    wanted = {col: (value or "").strip().lower() for col, value in equals.items()}
+    for row in rows:
+        if all((row.get(col) or "").strip().lower() == value for col, value in wanted.items()):
+            return row
+    return None
 def safe_value(val, default):
     if not val or str(val).strip().upper() in ("N/A", "NA", "UNKNOWN", "NULL", "NONE", "0"):
         return default
@@ -139,17 +119,30 @@ def normalize_row(row):
     else:
         season = "General"
 
-    # --- Yield estimate (simple demo formula) ---
-    yield_estimate = round((rainfall * 0.02) + (nitrogen + phosphorus + potassium) / 100, 2)
-    yield_text = f"{yield_estimate} quintals/acre" if yield_estimate > 0 else "Data not available"
+    # --- Yield + confidence from the model's prediction interval ---
+    prediction = None
+    try:
+        from ml_connector import predict_yield_with_interval
+        prediction = predict_yield_with_interval([dict(row, Season=row.get("Season") or season)])[0]
+    except Exception as e:
+        print(f"[ML-ERROR] Interval prediction failed: {e}")
 
-    # --- Confidence ---
-    if 100 <= nitrogen <= 200 and 10 <= phosphorus <= 30 and 150 <= potassium <= 300:
-        confidence = "High"
-    elif nitrogen and phosphorus and potassium:
-        confidence = "Medium"
+    if prediction:
+        yield_estimate = prediction["yield"]
+    else:
+        # Model unavailable: simple demo formula
+        yield_estimate = round((rainfall * 0.02) + (nitrogen + phosphorus + potassium) / 100, 2)
+    if prediction and prediction["confidence"] is not None:
+        confidence = f"{prediction['confidence']}"
     else:
-        confidence = "Low"
+        # No model or no calibrated interval: nutrient-range heuristic
+        if 100 <= nitrogen <= 200 and 10 <= phosphorus <= 30 and 150 <= potassium <= 300:
+            confidence = "High"
+        elif nitrogen and phosphorus and potassium:
+            confidence = "Medium"
+        else:
+            confidence = "Low"
+    yield_text = f"{yield_estimate} quintals/acre" if yield_estimate > 0 else "Data not available"
 
     return {
     "district": safe_value(row.get("District_Name"), "your district"),
@@ -171,52 +164,10 @@ def normalize_row(row):
 
 
 
-TRANSLATIONS = {
-    "soil": {
-        "Pale Yellow": {"hi": "फीका पीला", "mr": "फिकट पिवळा"},
-        "Light Brown": {"hi": "हल्का भूरा", "mr": "फिकट तपकिरी"},
-        "Yellow Brown": {"hi": "पीला भूरा", "mr": "पिवळसर तपकिरी"},
-        "Sandy Brown": {"hi": "रेतीला भूरा", "mr": "वालुकामय तपकिरी"},
-        "Dark Brown": {"hi": "गहरा भूरा", "mr": "गडद तपकिरी"},
-    },
-    "district": {
-        "Jodhpur": {"hi": "जोधपुर", "mr": "जोधपूर"},
-        "Kolhapur": {"hi": "कोल्हापुर", "mr": "कोल्हापूर"},
-        "Satara": {"hi": "सातारा", "mr": "सातारा"},
-    },
-    "crop": {
-        "Bajra": {"hi": "बाजरा", "mr": "बाजरी"},
-        "Maize": {"hi": "मक्का", "mr": "मका"},
-        "Jowar": {"hi": "ज्वार", "mr": "ज्वारी"},
-    },
-    "fertilizer": {
-        "DAP": {"hi": "डीएपी", "mr": "डीएपी"},
-        "Urea": {"hi": "यूरिया", "mr": "युरिया"},
-        "Compost": {"hi": "खाद", "mr": "खत"},
-        "MOP": {"hi": "एमओपी", "mr": "एमओपी"},
-        "FYM": {"hi": "गोबर खाद", "mr": "गोठ्यातील खत"},
-        "Vermicompost": {"hi": "वर्मी कम्पोस्ट", "mr": "वर्मी कम्पोस्ट"},
-    },
-}
+# Field-first view of the shared localization table: {field: {value: {"hi": ..., "mr": ...}}}.
+TRANSLATIONS = localization.NAMES
 
 def localize_row(row, lang="en"):
     """Return localized copy of row according to lang (en/hi/mr)."""
-    if lang not in ("hi", "mr"):
-        return row  # English = default
-    
-    new_row = row.copy()
-    # soil
-    if row.get("soil") in TRANSLATIONS["soil"]:
-        new_row["soil"] = TRANSLATIONS["soil"][row["soil"]].get(lang, row["soil"])
-    # district
-    if row.get("district") in TRANSLATIONS["district"]:
-        new_row["district"] = TRANSLATIONS["district"][row["district"]].get(lang, row["district"])
-    # crop
-    if row.get("crop") in TRANSLATIONS["crop"]:
-        new_row["crop"] = TRANSLATIONS["crop"][row["crop"]].get(lang, row["crop"])
-    # fertilizer
-    if row.get("fertilizer") in TRANSLATIONS["fertilizer"]:
-        new_row["fertilizer"] = TRANSLATIONS["fertilizer"][row["fertilizer"]].get(lang, row["fertilizer"])
-    
-    return new_row
-
+    lang = "hi" if str(lang).startswith("hi") else "mr" if str(lang).startswith("mr") else "en"
+    return localization.localize_row(row, lang)
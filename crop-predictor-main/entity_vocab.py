@@ -0,0 +1,282 @@
+# entity_vocab.py
+"""
+District / crop / season vocabulary for entity detection, built once per dataset.
+
+    vocab = entity_vocab.get_vocabulary()
+    vocab.match("कोल्हापूर मध्ये मका उत्पन्न")   # {"district": "Kolhapur", "crop": "Maize", "season": None}
+
+The vocabulary holds every canonical name in the dataset plus its aliases: the
+lowercase form, the Devanagari / transliterated aliases in the *_LOCALIZATION tables
+below and the hi/mr names in localization.NAMES. It is built when
+dataset_connector.load_dataset() reads the CSV and saved next to it
+(combined.vocab.json) keyed by the dataset's sha1, so later processes only re-hash
+the file instead of re-scanning every row. With the SQLite backend it is keyed on
+the table's version instead and rebuilt after rows are appended.
+
+Matching runs an Aho-Corasick automaton over the lowercased text: one pass, cost
+linear in the text length no matter how many thousand names the dataset has.
+Substring semantics are kept (Marathi glues postpositions onto names, e.g.
+"कोल्हापूरमध्ये"), but Latin-script aliases must start at a word boundary so "rice"
+doesn't fire inside "price". When several aliases of one kind match, the longest wins.
+Kinds with no exact hit fall back to fuzzy_match (misspellings, transliterations).
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+
+VOCAB_VERSION = 1
+
+DISTRICT_LOCALIZATION = {
+    "Jodhpur": ["jodhpur", "जोधपुर", "जोधपूर"],
+    "Kolhapur": ["kolhapur", "कोल्हापुर", "कोल्हापूर"],
+    "Satara":   ["satara", "सातारा", "सातरा"],
+    "North Delhi": ["north delhi", "उत्तर दिल्ली", "नॉर्थ दिल्ली"],
+
+}
+
+CROP_LOCALIZATION = {
+    "Bajra": ["bajra", "बाजरा", "बाजरी"],
+    "Maize": ["maize", "मक्का", "मका"],
+    "Jowar": ["jowar", "ज्वार", "ज्वारी"],
+    "Soybean": ["Soybean", "सोयाबीन", "सोयाबिन"],
+    "Wheat": ["Wheat", "गहू", "गेहूं"],
+    "Rice": ["rice", "चावल", "भात"],
+
+}
+SEASON_LOCALIZATION = {
+    "Kharif": ["kharif", "खरीफ", "खरीफ हंगाम"],
+    "Rabi": ["rabi", "रबी", "रब्बी हंगाम"],
+    "Zaid": ["zaid", "जायद", "जायड"]
+}
+
+KINDS = ("district", "crop", "season")
+_COLUMNS = {"district": "District_Name", "crop": "Crop", "season": "Season"}
+_TABLES = {"district": DISTRICT_LOCALIZATION, "crop": CROP_LOCALIZATION, "season": SEASON_LOCALIZATION}
+
+_vocab = None
+_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+
+
+def dataset_checksum(path):
+    """sha1 of the dataset file, read in 1 MB chunks."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def vocab_path(dataset_path):
+    return os.path.splitext(dataset_path)[0] + ".vocab.json"
+
+
+def _translation_aliases():
+    """(kind, canonical, alias) from the hi / mr names in localization.NAMES."""
+    import localization
+    return [
+        (kind, name, text)
+        for kind in KINDS
+        for name, by_lang in localization.NAMES.get(kind, {}).items()
+        for text in by_lang.values()
+    ]
+
+
+def _is_latin(alias):
+    return alias[:1].isascii()
+
+
+class _Automaton:
+    """Aho-Corasick over alias -> (kind, canonical)."""
+
+    def __init__(self, aliases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for alias, payload in aliases.items():
+            node = 0
+            for ch in alias:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append((len(alias), _is_latin(alias), payload))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def finditer(self, text):
+        """Yield (start, length, payload) for every alias occurrence in text."""
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, latin, payload in out[node]:
+                start = i - length + 1
+                if latin and start > 0 and text[start - 1].isalnum():
+                    continue
+                yield start, length, payload
+
+
+class Vocabulary:
+    def __init__(self, names, aliases, checksum=None):
+        self.names = names          # {kind: [canonical, ...]} in dataset order
+        self.aliases = aliases      # {alias_lower: [kind, canonical]}
+        self.checksum = checksum
+        self._automaton = _Automaton({a: tuple(p) for a, p in aliases.items()})
+        self._fuzzy = None
+
+    @classmethod
+    def build(cls, rows, checksum=None):
+        names = {kind: {} for kind in KINDS}  # lower -> first-seen spelling
+        for r in rows:
+            for kind, col in _COLUMNS.items():
+                value = (r.get(col) or "").strip()
+                if value:
+                    names[kind].setdefault(value.lower(), value)
+
+        extra = [(kind, eng, a) for kind, table in _TABLES.items() for eng, aliases in table.items() for a in aliases]
+        for kind, eng, _ in extra:
+            names[kind].setdefault(eng.lower(), eng)
+        # Translations only add aliases for names we already know; the localization table
+        # also covers output-only words (e.g. "Vegetables") that aren't entities.
+        extra += [t for t in _translation_aliases() if t[1].lower() in names[t[0]]]
+
+        aliases = {}
+        for kind in KINDS:
+            for low, canonical in names[kind].items():
+                aliases.setdefault(low, [kind, canonical])
+        for kind, eng, alias in extra:
+            canonical = names[kind][eng.lower()]
+            alias = alias.strip().lower()
+            if alias:
+                aliases.setdefault(alias, [kind, canonical])
+
+        return cls({kind: list(names[kind].values()) for kind in KINDS}, aliases, checksum)
+
+    def to_dict(self):
+        return {"version": VOCAB_VERSION, "checksum": self.checksum, "names": self.names, "aliases": self.aliases}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["names"], data["aliases"], data.get("checksum"))
+
+    @property
+    def fuzzy(self):
+        if self._fuzzy is None:
+            from fuzzy_match import FuzzyIndex
+            self._fuzzy = FuzzyIndex({a: tuple(p) for a, p in self.aliases.items()})
+        return self._fuzzy
+
+    def match_scored(self, text, fuzzy=True):
+        """
+        {"district", "crop", "season"} -> (canonical, confidence) or None.
+        Exact alias hits score 1.0 (longest alias wins); kinds with no exact hit get the
+        best fuzzy_match candidate above FUZZY_CUTOFF, if any.
+        """
+        found = {kind: None for kind in KINDS}
+        if not text:
+            return found
+        best = {}
+        for start, length, (kind, canonical) in self._automaton.finditer(text.lower()):
+            if kind not in best or length > best[kind][0]:
+                best[kind] = (length, canonical)
+        for kind, (_, canonical) in best.items():
+            found[kind] = (canonical, 1.0)
+
+        missing = [kind for kind in KINDS if found[kind] is None]
+        if fuzzy and missing:
+            for kind, hit in self.fuzzy.best_in_text(text, missing).items():
+                found[kind] = hit
+        return found
+
+    def match(self, text, fuzzy=True):
+        """{"district", "crop", "season"} -> canonical name or None."""
+        return {kind: hit[0] if hit else None for kind, hit in self.match_scored(text, fuzzy).items()}
+
+
+def _tables_signature():
+    """Changing an alias table must invalidate the on-disk cache too."""
+    payload = json.dumps([_TABLES, _translation_aliases()], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def build_for_dataset(rows, dataset_path):
+    """
+    Called by dataset_connector.load_dataset(): reuse combined.vocab.json if it was built
+    from the same file (and alias tables), otherwise build from rows and save it.
+    """
+    global _vocab
+    try:
+        # SQLite-backed rows grow without the CSV changing: key on the table's version.
+        base = rows.version() if hasattr(rows, "version") else dataset_checksum(dataset_path)
+        checksum = f"{base}-{_tables_signature()}"
+    except OSError:
+        checksum = None
+
+    path = vocab_path(dataset_path)
+    vocab = None
+    if checksum:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == VOCAB_VERSION and data.get("checksum") == checksum:
+                vocab = Vocabulary.from_dict(data)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    if vocab is None:
+        vocab = Vocabulary.build(rows, checksum)
+        if checksum:
+            tmp = path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(vocab.to_dict(), f, ensure_ascii=False)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"[vocab] Could not save {path}: {e}")
+
+    with _lock:
+        _vocab = vocab
+    return vocab
+
+
+def _appended_since_build():
+    """True if SQLite rows were appended after the current vocabulary was built."""
+    import dataset_connector
+    version = dataset_connector.dataset_version()
+    return version is not None and not (_vocab.checksum or "").startswith(version + "-")
+
+
+def get_vocabulary():
+    """The current vocabulary, loading the dataset (and so building it) on first use;
+    with the SQLite backend, rebuilt on first use after rows were appended."""
+    global _vocab
+    if _vocab is None:
+        import dataset_connector
+        rows = dataset_connector.load_dataset()
+        with _lock:
+            if _vocab is None:  # dataset failed to load: aliases from the tables only
+                _vocab = Vocabulary.build(rows)
+    elif _appended_since_build():
+        import dataset_connector
+        with _rebuild_lock:
+            if _appended_since_build():
+                build_for_dataset(dataset_connector.load_dataset(), dataset_connector.DATASET_PATH)
+    return _vocab
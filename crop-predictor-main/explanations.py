@@ -0,0 +1,313 @@
+# explanations.py
+"""
+Why is the predicted yield what it is? Per-row feature attributions for the tree model.
+
+    explain([features])[0]["attributions"]   # {"Nitrogen": -3.1, "Rainfall": 1.2, ...} quintals/acre
+    reason_text(features, lang="hi")         # "Low Nitrogen (20) reduced the predicted yield by 3.1 ..."
+
+Attributions follow the tree path ("Saabas") method: walking a row down a tree, each
+split moves the node value from parent to child, and that change is credited to the
+feature the parent split on. Summed over all trees (scaled by the learning rate for
+boosting, averaged for forests) plus the root/initial value this reproduces the model's
+prediction exactly. One-hot columns are credited back to the original column, so the
+result is keyed by ml_connector.FEATURE_ORDER.
+
+For speed, every tree's (node -> original feature) deltas are stacked once into one
+sparse [all_nodes, n_features] matrix D. For ensembles of modest size (the boosted
+model) D is further summed along every root-to-node path, so a batch costs one C-level
+tree.apply per tree and a gather of the leaf rows. Very large forests keep D sparse and
+use one decision_path call plus a single product P @ D (P = nodes each row visits).
+
+Results are cached per model by the canonical feature tuple (LRU, EXPLAIN_CACHE_SIZE).
+crop_yield_prediction.py precomputes the most frequent (district, crop) rows at
+model-build time into Model_Yield_Predict.explanations.json (explanations.json in a
+model_registry version), which seeds the cache.
+"""
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+import ml_connector
+
+CACHE_SIZE = int(os.environ.get("EXPLAIN_CACHE_SIZE", "4096"))
+EXPLANATIONS_PATH = os.path.splitext(ml_connector.MODEL_PATH)[0] + ".explanations.json"
+PRECOMPUTE_TOP_K = 50
+DENSE_TABLE_LIMIT = 4_000_000  # nodes x features; larger forests use sparse decision paths
+MIN_EFFECT = 0.5  # quintals/acre; smaller effects aren't worth a sentence
+# Not something a farmer can change, so never the "reason".
+NOT_ACTIONABLE = ("District_Name", "Crop")
+
+
+def _original_columns(preprocessor, n_out):
+    """Transformed column index -> index in FEATURE_ORDER."""
+    mapping = []
+    for name, transformer, cols in getattr(preprocessor, "transformers_", []):
+        if name == "remainder" or transformer == "drop":
+            continue
+        last = transformer.steps[-1][1] if hasattr(transformer, "steps") else transformer
+        widths = [len(c) for c in last.categories_] if hasattr(last, "categories_") else [1] * len(cols)
+        for col, width in zip(cols, widths):
+            mapping.extend([col] * width)
+    if len(mapping) != n_out:
+        raise ValueError(f"cannot map {n_out} model features back to the input columns")
+    return np.array(mapping)
+
+
+class TreeExplainer:
+    """Stacked path-attribution tables for one fitted pipeline (forest or boosting)."""
+
+    def __init__(self, pipeline):
+        from scipy import sparse
+
+        self.pipeline = pipeline
+        model = pipeline.steps[-1][1]
+        self.model = model
+        if isinstance(model.estimators_, list):                 # forest: average of trees
+            self.estimators = list(model.estimators_)
+            scale, init = 1.0 / len(self.estimators), 0.0
+        else:                                                   # boosting: init + lr * sum(stages)
+            self.estimators = list(model.estimators_[:, 0])
+            scale = model.learning_rate
+            init = float(model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0, 0])
+        to_orig = _original_columns(pipeline.steps[0][1], model.n_features_in_)
+        n_features = len(ml_connector.FEATURE_ORDER)
+
+        rows, cols, vals, parents = [], [], [], []
+        self.offsets = []
+        offset, root_total = 0, 0.0
+        for est in self.estimators:
+            tree = est.tree_
+            value = tree.value[:, 0, 0]
+            root_total += value[0]
+            parent = np.full(tree.node_count, -1)
+            for children in (tree.children_left, tree.children_right):
+                split = np.flatnonzero(children >= 0)
+                parent[children[split]] = split
+            nodes = np.flatnonzero(parent >= 0)
+            rows.append(nodes + offset)
+            cols.append(to_orig[tree.feature[parent[nodes]]])
+            vals.append((value[nodes] - value[parent[nodes]]) * scale)
+            parents.append(parent)
+            self.offsets.append(offset)
+            offset += tree.node_count
+        self.bias = float(init + root_total * scale)
+        self.deltas = sparse.csr_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(offset, n_features))
+
+        # Small ensembles (the usual boosted model): also keep each node's summed path
+        # attribution, so a row's explanation is just a gather at its leaves.
+        self.path_table = None
+        if offset * n_features <= DENSE_TABLE_LIMIT:
+            delta = self.deltas.toarray()
+            table = np.zeros_like(delta)
+            for parent, start in zip(parents, self.offsets):
+                level = np.array([0])
+                while len(level):
+                    children = np.flatnonzero(np.isin(parent, level))
+                    table[start + children] = table[start + parent[children]] + delta[start + children]
+                    level = children
+            self.path_table = table
+
+    def attributions(self, transformed):
+        """(n_rows, len(FEATURE_ORDER)) attributions; row sums + bias = predictions."""
+        from scipy import sparse
+        if self.path_table is not None:
+            x = np.ascontiguousarray(transformed, dtype=np.float32)
+            leaves = np.stack([est.tree_.apply(x) for est in self.estimators], axis=1) + np.array(self.offsets)
+            return self.path_table[leaves].sum(axis=1)
+        if isinstance(self.model.estimators_, list):
+            paths = self.model.decision_path(transformed)[0]
+        else:
+            paths = sparse.hstack([est.decision_path(transformed) for est in self.estimators], format="csr")
+        return np.asarray((paths @ self.deltas).todense())
+
+
+# One explainer (with its own LRU cache) per pipeline; two at most, so a model being
+# warmed up by model_registry doesn't evict the one still serving.
+_explainers = OrderedDict()
+_lock = threading.Lock()        # cache reads / writes
+_build_lock = threading.Lock()  # building an explainer (slow; must not block cache hits)
+
+
+def prepare(pipeline):
+    """Explainer for pipeline, built and seeded from its precomputed file on first use."""
+    explainer = _explainers.get(id(pipeline))
+    if explainer is not None and explainer.pipeline is pipeline:
+        return explainer
+    with _build_lock:
+        explainer = _explainers.get(id(pipeline))
+        if explainer is None or explainer.pipeline is not pipeline:
+            explainer = TreeExplainer(pipeline)
+            explainer.cache = OrderedDict()
+            _load_precomputed(explainer, ml_connector.artifact_path("explanations.json", pipeline))
+            with _lock:
+                _explainers[id(pipeline)] = explainer
+                while len(_explainers) > 2:
+                    _explainers.popitem(last=False)
+    return explainer
+
+
+def get_explainer():
+    """Explainer for the model ml_connector is serving (follows hot swaps), or None."""
+    pipeline = ml_connector.get_model()
+    if pipeline is None:
+        return None
+    return prepare(pipeline)
+
+
+def canonical_key(features):
+    """Hashable, order-stable feature tuple (numbers rounded so 20 and "20.0" match)."""
+    return tuple(
+        (None if np.isnan(v) else round(v, 4)) if isinstance(v, float) else v
+        for v in ml_connector._feature_row(features)
+    )
+
+
+def _remember(explainer, key, explanation):
+    cache = explainer.cache
+    cache[key] = explanation
+    cache.move_to_end(key)
+    while len(cache) > CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def explain(feature_dicts):
+    """
+    One explanation per feature dict: {"prediction", "bias", "attributions": {column: value}}
+    (None if the model or explainer is unavailable). Cached rows skip the model entirely.
+    """
+    explainer = get_explainer()
+    if explainer is None or not feature_dicts:
+        return [None] * len(feature_dicts)
+
+    keys = [canonical_key(f) for f in feature_dicts]
+    out = [None] * len(keys)
+    misses = {}
+    with _lock:
+        for i, key in enumerate(keys):
+            hit = explainer.cache.get(key)
+            if hit is not None:
+                explainer.cache.move_to_end(key)
+                out[i] = hit
+            else:
+                misses.setdefault(key, []).append(i)
+    if not misses:
+        return out
+
+    todo = [feature_dicts[idx[0]] for idx in misses.values()]
+    transformed, _ = ml_connector.transform_matrix(ml_connector.build_feature_matrix(todo), explainer.pipeline)
+    attrs = explainer.attributions(transformed)
+    with _lock:
+        for (key, idx), row in zip(misses.items(), attrs):
+            explanation = {
+                "prediction": round(float(explainer.bias + row.sum()), 2),
+                "bias": round(explainer.bias, 2),
+                "attributions": {c: round(float(v), 3) for c, v in zip(ml_connector.FEATURE_ORDER, row)},
+            }
+            _remember(explainer, key, explanation)
+            for i in idx:
+                out[i] = explanation
+    return out
+
+
+# ---------------- model-build-time precompute ----------------
+
+def representative_rows(rows, top_k=PRECOMPUTE_TOP_K):
+    """First row of each of the top_k most frequent (district, crop) keys, the row
+    voice_assistant.build_reply_features falls back to for that query."""
+    counts = Counter((r.get("District_Name"), r.get("Crop")) for r in rows)
+    wanted = {key for key, _ in counts.most_common(top_k)}
+    picked = {}
+    for r in rows:
+        key = (r.get("District_Name"), r.get("Crop"))
+        if key in wanted and key not in picked:
+            picked[key] = r
+    return list(picked.values())
+
+
+def precompute(pipeline, rows, path=EXPLANATIONS_PATH, top_k=PRECOMPUTE_TOP_K):
+    """Explain the representative rows with `pipeline` and save them for the serving cache."""
+    reps = representative_rows(rows, top_k)
+    if not reps:
+        return 0
+    explainer = TreeExplainer(pipeline)
+    transformed, _ = ml_connector.transform_matrix(ml_connector.build_feature_matrix(reps), pipeline)
+    attrs = explainer.attributions(transformed)
+    entries = [
+        {"key": list(canonical_key(r)),
+         "explanation": {"prediction": round(float(explainer.bias + a.sum()), 2),
+                         "bias": round(explainer.bias, 2),
+                         "attributions": {c: round(float(v), 3) for c, v in zip(ml_connector.FEATURE_ORDER, a)}}}
+        for r, a in zip(reps, attrs)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"bias": round(explainer.bias, 4), "entries": entries}, f, ensure_ascii=False)
+    return len(entries)
+
+
+def _load_precomputed(explainer, path=EXPLANATIONS_PATH):
+    """Seed explainer's cache; skipped if the file was made for another model (different bias)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if round(explainer.bias, 4) != data.get("bias"):
+        return 0
+    for entry in data.get("entries", []):
+        _remember(explainer, tuple(entry["key"]), entry["explanation"])
+    return len(data.get("entries", []))
+
+
+# ---------------- advisory sentence ----------------
+
+def main_factor(features, explanation):
+    """(column, effect) of the actionable feature with the largest effect, or None."""
+    candidates = [(c, v) for c, v in explanation["attributions"].items()
+                  if c not in NOT_ACTIONABLE and abs(v) >= MIN_EFFECT]
+    if not candidates:
+        return None
+    # Farmers mostly ask why yield is low: prefer the biggest negative effect.
+    negative = [cv for cv in candidates if cv[1] < 0]
+    return min(negative, key=lambda cv: cv[1]) if negative else max(candidates, key=lambda cv: cv[1])
+
+
+def _typical(column):
+    """Training median of a numeric column (from the pipeline's imputer), or None."""
+    try:
+        pre = ml_connector.get_model().steps[0][1]
+        for name, transformer, cols in pre.transformers_:
+            imputer = transformer.steps[0][1] if hasattr(transformer, "steps") else None
+            idx = ml_connector.FEATURE_ORDER.index(column)
+            if idx in cols and imputer is not None and hasattr(imputer, "statistics_"):
+                return float(imputer.statistics_[list(cols).index(idx)])
+    except Exception:
+        pass
+    return None
+
+
+def reason_text(features, lang="en", explanation=None):
+    """One sentence naming the main driver of the prediction, or "" if nothing stands out."""
+    from templates import advice_phrases
+
+    if explanation is None:
+        explanation = explain([features])[0]
+    if not explanation:
+        return ""
+    factor = main_factor(features, explanation)
+    if factor is None:
+        return ""
+    column, effect = factor
+    phrases = advice_phrases(lang)["yield_reason"]
+    name = phrases["features"].get(column, column)
+    value = features.get(column)
+    typical = _typical(column) if column in ml_connector.NUMERIC_COLS else None
+    try:
+        level = None if typical is None else ("low" if float(value) < typical else "high")
+    except (TypeError, ValueError):
+        level = None
+    factor_text = phrases[level or "value"].format(feature=name, value=value)
+    return phrases["down" if effect < 0 else "up"].format(factor=factor_text, amount=round(abs(effect), 1))
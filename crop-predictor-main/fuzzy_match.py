@@ -0,0 +1,112 @@
+# fuzzy_match.py
+"""
+Fuzzy lookup of district / crop / season names for misspelled or transliterated input.
+
+Whisper often hands us "kolapur", "jodpur" or "सतारा" instead of the spelling in the
+dataset. FuzzyIndex keeps a character trigram index over every alias in the entity
+vocabulary (Latin and Devanagari alike):
+
+- candidates for a term are the aliases sharing trigrams with it, counted from the
+  posting lists, so only a handful of names are ever compared (not all of them);
+- those few are scored by normalised edit distance, 1 - lev(a, b) / max(len):
+  1.0 = identical, "kolapur" vs "kolhapur" = 0.875;
+- matches under FUZZY_CUTOFF (env, default 0.82) are dropped so callers fall back
+  instead of guessing. Short words ("price" vs "rice" = 0.8) stay under the default.
+
+In a sentence, every run of 1..3 words is tried as a term, skipping runs shorter than
+MIN_TERM_LEN characters.
+"""
+import os
+import re
+from collections import Counter, defaultdict
+
+FUZZY_CUTOFF = float(os.environ.get("FUZZY_CUTOFF", "0.82"))
+NGRAM = 3
+MIN_TERM_LEN = 4
+MAX_SPAN_WORDS = 3
+MAX_CANDIDATES = 8
+
+# Whitespace and punctuation (incl. the Devanagari danda). Not \W: it would split
+# Devanagari words at their vowel signs.
+_SPLIT = re.compile(r"[\s,.;:!?।॥()\"'\-/]+")
+
+
+def ngrams(term, n=NGRAM):
+    padded = f" {term} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def similarity(a, b):
+    """1 - levenshtein(a, b) / max(len(a), len(b))."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return 1.0 - prev[-1] / len(a)
+
+
+def split_terms(text, max_words=MAX_SPAN_WORDS):
+    """Every 1..max_words word run in text (lowercased), longest runs first."""
+    words = [w for w in _SPLIT.split(text.lower()) if w]
+    terms = []
+    for size in range(min(max_words, len(words)), 0, -1):
+        for i in range(len(words) - size + 1):
+            term = " ".join(words[i:i + size])
+            if len(term) >= MIN_TERM_LEN:
+                terms.append(term)
+    return terms
+
+
+class FuzzyIndex:
+    def __init__(self, aliases):
+        """aliases: {alias_lower: (kind, canonical)} (the entity vocabulary's alias map)."""
+        self.aliases = list(aliases.items())
+        self.postings = defaultdict(list)
+        self.max_words = 1
+        for idx, (alias, _) in enumerate(self.aliases):
+            for gram in ngrams(alias):
+                self.postings[gram].append(idx)
+            self.max_words = max(self.max_words, alias.count(" ") + 1)
+
+    def lookup(self, term, kinds=None, cutoff=None, limit=3):
+        """[(canonical, kind, alias, score)] best first, score >= cutoff."""
+        cutoff = FUZZY_CUTOFF if cutoff is None else cutoff
+        grams = ngrams(term)
+        shared = Counter()
+        for gram in grams:
+            for idx in self.postings.get(gram, ()):
+                shared[idx] += 1
+
+        if kinds:
+            shared = Counter({idx: c for idx, c in shared.items() if self.aliases[idx][1][0] in kinds})
+
+        results = []
+        for idx, _ in shared.most_common(MAX_CANDIDATES):
+            alias, (kind, canonical) = self.aliases[idx]
+            # Edit distance is at least the length difference: skip hopeless pairs cheaply.
+            if 1.0 - abs(len(alias) - len(term)) / max(len(alias), len(term)) < cutoff:
+                continue
+            score = similarity(term, alias)
+            if score >= cutoff:
+                results.append((canonical, kind, alias, round(score, 3)))
+        results.sort(key=lambda r: (-r[3], -len(r[2])))
+        return results[:limit]
+
+    def best_in_text(self, text, kinds, cutoff=None):
+        """{kind: (canonical, score)} for the best fuzzy hit of each requested kind in text."""
+        best = {}
+        for term in split_terms(text, self.max_words):
+            for canonical, kind, alias, score in self.lookup(term, kinds, cutoff):
+                if kind not in best or score > best[kind][1]:
+                    best[kind] = (canonical, score)
+        return best
@@ -0,0 +1,147 @@
+# inference_batcher.py
+"""
+Micro-batching for single-row yield predictions.
+
+Under load /chat issues many concurrent one-row predictions, each paying the full
+sklearn pipeline overhead. InferenceBatcher collects requests for up to `max_batch`
+rows or `max_delay_ms` (whichever comes first), runs ONE vectorized predict through
+ml_connector.predict_yield_batch, and resolves every caller's future.
+
+Callers are the blocking-pool worker threads, so the API is a plain blocking call:
+
+    batcher = InferenceBatcher(max_batch=32, max_delay_ms=5).start()
+    ml_connector.set_batcher(batcher)
+    ml_connector.get_yield_prediction(features)   # now batched
+
+Metrics: batch count, rows, batch fill histogram and the latency the batching window
+added (time from submit to the batch starting), plus predict time per batch.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import ml_connector
+
+MAX_BATCH = int(os.environ.get("INFER_MAX_BATCH", "32"))
+MAX_DELAY_MS = float(os.environ.get("INFER_MAX_DELAY_MS", "5"))
+
+# Upper bounds (rows) for the batch fill histogram.
+FILL_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class InferenceBatcher:
+    def __init__(self, max_batch=MAX_BATCH, max_delay_ms=MAX_DELAY_MS, predict_fn=None):
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay_s = max(0.0, float(max_delay_ms)) / 1000.0
+        self.predict_fn = predict_fn or ml_connector.predict_yield_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "batches": 0,
+            "rows": 0,
+            "errors": 0,
+            "fill_hist": {b: 0 for b in FILL_BUCKETS + ("+Inf",)},
+            "added_latency_ms_sum": 0.0,
+            "added_latency_ms_max": 0.0,
+            "predict_ms_sum": 0.0,
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._queue.put(None)
+
+    def submit(self, features):
+        """Queue one feature dict; returns a concurrent.futures.Future for its yield."""
+        fut = Future()
+        if self._stopped.is_set():
+            fut.set_exception(RuntimeError("Inference batcher is stopped"))
+            return fut
+        self._queue.put((features, fut, time.perf_counter()))
+        return fut
+
+    def predict(self, features, timeout=None):
+        """Blocking single-row predict through the batcher."""
+        return self.submit(features).result(timeout=timeout)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_delay_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect(first)
+            started = time.perf_counter()
+            try:
+                results = self.predict_fn([features for features, _, _ in batch])
+            except Exception as e:
+                results = None
+                error = e
+            predict_ms = (time.perf_counter() - started) * 1000
+
+            for i, (_, fut, _) in enumerate(batch):
+                if results is None:
+                    fut.set_exception(error)
+                else:
+                    fut.set_result(results[i])
+            self._record(batch, started, predict_ms, failed=results is None)
+
+        # Fail anything still queued so callers don't hang on shutdown.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("Inference batcher is stopped"))
+
+    def _record(self, batch, started, predict_ms, failed):
+        waits = [(started - submitted) * 1000 for _, _, submitted in batch]
+        bucket = next((b for b in FILL_BUCKETS if len(batch) <= b), "+Inf")
+        with self._metrics_lock:
+            m = self.metrics
+            m["batches"] += 1
+            m["rows"] += len(batch)
+            m["errors"] += 1 if failed else 0
+            m["fill_hist"][bucket] += 1
+            m["added_latency_ms_sum"] += sum(waits)
+            m["added_latency_ms_max"] = max(m["added_latency_ms_max"], max(waits))
+            m["predict_ms_sum"] += predict_ms
+
+    def snapshot(self):
+        """Copy of the metrics plus derived averages."""
+        with self._metrics_lock:
+            m = dict(self.metrics)
+            m["fill_hist"] = {str(k): v for k, v in self.metrics["fill_hist"].items()}
+        batches = m["batches"] or 1
+        rows = m["rows"] or 1
+        m["max_batch"] = self.max_batch
+        m["max_delay_ms"] = self.max_delay_s * 1000
+        m["avg_batch_fill"] = round(m["rows"] / batches / self.max_batch, 3) if m["batches"] else 0.0
+        m["avg_added_latency_ms"] = round(m["added_latency_ms_sum"] / rows, 3) if m["rows"] else 0.0
+        m["avg_predict_ms"] = round(m["predict_ms_sum"] / batches, 3) if m["batches"] else 0.0
+        m["queued"] = self._queue.qsize()
+        return m
@@ -0,0 +1,265 @@
+# localization.py
+"""
+One offline localization table for everything the advisory shows in hi / mr.
+
+- NAMES: {field: {canonical English value: {"hi": ..., "mr": ...}}} for districts,
+  crops, seasons, months, soil colours and fertilizers. Compiled at import into a flat
+  {(field, value_lower, lang): text} dict, so localizing a value is one dict lookup.
+- localize_value / localize_row: one value, or every known field of a row in a single
+  pass (works on raw dataset rows and on normalize_row() dicts alike).
+- localize_column: a whole column at once for bulk output (unique values are looked
+  up once, then broadcast back).
+- ADVICE_PHRASES / INTENT_PHRASES: hi / mr versions of the advisory sentences in
+  templates.py, same keys and placeholders as the English tables there.
+
+Unknown values fall back to the English text; nothing here calls a translation API.
+"""
+LANGS = ("en", "hi", "mr")
+
+NAMES = {
+    "district": {
+        "Jodhpur": {"hi": "जोधपुर", "mr": "जोधपूर"},
+        "Kolhapur": {"hi": "कोल्हापुर", "mr": "कोल्हापूर"},
+        "Satara": {"hi": "सातारा", "mr": "सातारा"},
+        "Pune": {"hi": "पुणे", "mr": "पुणे"},
+        "Nagpur": {"hi": "नागपुर", "mr": "नागपूर"},
+        "North Delhi": {"hi": "उत्तर दिल्ली", "mr": "उत्तर दिल्ली"},
+    },
+    "crop": {
+        "Bajra": {"hi": "बाजरा", "mr": "बाजरी"},
+        "Maize": {"hi": "मक्का", "mr": "मका"},
+        "Jowar": {"hi": "ज्वार", "mr": "ज्वारी"},
+        "Wheat": {"hi": "गेहूं", "mr": "गहू"},
+        "Rice": {"hi": "चावल", "mr": "भात"},
+        "Soybean": {"hi": "सोयाबीन", "mr": "सोयाबीन"},
+        "Sugarcane": {"hi": "गन्ना", "mr": "ऊस"},
+        "Cotton": {"hi": "कपास", "mr": "कापूस"},
+        "Gram": {"hi": "चना", "mr": "हरभरा"},
+        "Mustard": {"hi": "सरसों", "mr": "मोहरी"},
+        "Pulses": {"hi": "दालें", "mr": "कडधान्ये"},
+        "Vegetables": {"hi": "सब्जियां", "mr": "भाजीपाला"},
+        "Short-cycle Vegetables": {"hi": "कम अवधि की सब्जियां", "mr": "कमी कालावधीचा भाजीपाला"},
+    },
+    "season": {
+        "Kharif": {"hi": "खरीफ", "mr": "खरीप"},
+        "Rabi": {"hi": "रबी", "mr": "रब्बी"},
+        "Zaid": {"hi": "जायद", "mr": "उन्हाळी"},
+    },
+    "month": {
+        "January": {"hi": "जनवरी", "mr": "जानेवारी"},
+        "February": {"hi": "फ़रवरी", "mr": "फेब्रुवारी"},
+        "March": {"hi": "मार्च", "mr": "मार्च"},
+        "April": {"hi": "अप्रैल", "mr": "एप्रिल"},
+        "May": {"hi": "मई", "mr": "मे"},
+        "June": {"hi": "जून", "mr": "जून"},
+        "July": {"hi": "जुलाई", "mr": "जुलै"},
+        "August": {"hi": "अगस्त", "mr": "ऑगस्ट"},
+        "September": {"hi": "सितंबर", "mr": "सप्टेंबर"},
+        "October": {"hi": "अक्टूबर", "mr": "ऑक्टोबर"},
+        "November": {"hi": "नवंबर", "mr": "नोव्हेंबर"},
+        "December": {"hi": "दिसंबर", "mr": "डिसेंबर"},
+    },
+    "soil": {
+        "Pale Yellow": {"hi": "फीका पीला", "mr": "फिकट पिवळा"},
+        "Light Brown": {"hi": "हल्का भूरा", "mr": "फिकट तपकिरी"},
+        "Yellow Brown": {"hi": "पीला भूरा", "mr": "पिवळसर तपकिरी"},
+        "Sandy Brown": {"hi": "रेतीला भूरा", "mr": "वालुकामय तपकिरी"},
+        "Dark Brown": {"hi": "गहरा भूरा", "mr": "गडद तपकिरी"},
+        "Black": {"hi": "काली", "mr": "काळी"},
+        "Red": {"hi": "लाल", "mr": "लाल"},
+    },
+    "fertilizer": {
+        "DAP": {"hi": "डीएपी", "mr": "डीएपी"},
+        "Urea": {"hi": "यूरिया", "mr": "युरिया"},
+        "Compost": {"hi": "खाद", "mr": "खत"},
+        "MOP": {"hi": "एमओपी", "mr": "एमओपी"},
+        "SSP": {"hi": "एसएसपी", "mr": "एसएसपी"},
+        "FYM": {"hi": "गोबर खाद", "mr": "गोठ्यातील खत"},
+        "Vermicompost": {"hi": "वर्मी कम्पोस्ट", "mr": "वर्मी कम्पोस्ट"},
+    },
+}
+
+# Row keys (raw CSV columns and normalize_row() placeholders) -> NAMES field.
+FIELD_KEYS = {
+    "District_Name": "district", "district": "district",
+    "Crop": "crop", "crop": "crop",
+    "Season": "season", "season": "season",
+    "Month": "month", "month": "month",
+    "Soil_color": "soil", "Soil_Color": "soil", "soil": "soil",
+    "Fertilizer": "fertilizer", "fertilizer": "fertilizer",
+}
+
+
+def _compile(names):
+    table = {}
+    for field, values in names.items():
+        for canonical, by_lang in values.items():
+            for lang, text in by_lang.items():
+                table[(field, canonical.lower(), lang)] = text
+    return table
+
+
+_TABLE = _compile(NAMES)
+
+
+def localize_value(field, value, lang):
+    """value in lang (hi/mr), or value unchanged when en / unknown."""
+    if lang not in ("hi", "mr") or value is None:
+        return value
+    return _TABLE.get((field, str(value).strip().lower(), lang), value)
+
+
+def localize_row(row, lang="en"):
+    """Copy of row with every localizable field translated (row itself for en)."""
+    if lang not in ("hi", "mr"):
+        return row
+    out = {}
+    for key, value in row.items():
+        field = FIELD_KEYS.get(key)
+        if field is not None and value is not None:
+            value = _TABLE.get((field, str(value).strip().lower(), lang), value)
+        out[key] = value
+    return out
+
+
+def localize_column(field, values, lang):
+    """Localize a whole column (list / array of values). Returns a list."""
+    values = list(values)
+    if lang not in ("hi", "mr"):
+        return values
+    mapping = {v: localize_value(field, v, lang) for v in set(values)}
+    return [mapping[v] for v in values]
+
+
+ADVICE_PHRASES = {
+    "hi": {
+        "rainfall": {
+            "very_high": "{district} में बहुत अधिक वर्षा ({rainfall} मिमी)। पानी पसंद करने वाली फसलें (चावल, गन्ना) चुनें। "
+                         "अतिरिक्त पानी तालाबों/चेक-डैम में जमा करें।",
+            "high": "{district} में वर्षा अधिक है ({rainfall} मिमी)। {crop} के लिए जल निकासी सुनिश्चित करें और सोयाबीन या चावल उगाएं।",
+            "low": "{district} में वर्षा बहुत कम है ({rainfall} मिमी)। बाजरा, ज्वार, दालें जैसी सूखा-सहनशील फसलें उगाएं। "
+                   "अधिक पानी वाली फसलों से बचें।",
+            "moderate": "{district} में वर्षा मध्यम है ({rainfall} मिमी)। गेहूं, मक्का, सोयाबीन जैसी संतुलित फसलें उपयुक्त हैं।",
+        },
+        "month": {
+            "pre_monsoon": "अभी {month} (मानसून से पहले) है, लंबी अवधि की फसलों से बचें। "
+                           "मानसून आने तक भिंडी, पालक, मूंग जैसी कम अवधि की फसलें लें।",
+            "monsoon": "अभी {month} (मानसून) है, अभी {crop}, सोयाबीन, मक्का जैसी खरीफ फसलें बोएं।",
+            "rabi": "{month} में गेहूं, चना, सरसों जैसी रबी फसलें शुरू करें।",
+            "other": "{month} में फसल मार्गदर्शन के लिए स्थानीय कृषि कार्यालय से संपर्क करें।",
+        },
+        "water_allocation": "कुशल सिंचाई: {total_water} इकाई पानी इस तरह बांटें → {allocation}। "
+                            "इससे बिना बर्बादी के कई फसलें ली जा सकती हैं।",
+        "fertilizer": "मिट्टी={soil}, pH={ph}। उर्वरक सलाह: {fert_advice}।",
+        "fertilizer_items": {
+            "n": "यूरिया डालें (N स्रोत)",
+            "p": "एसएसपी डालें (P स्रोत)",
+            "k": "एमओपी डालें (K स्रोत)",
+            "balanced": "{fertilizer} की संतुलित मात्रा बनाए रखें",
+        },
+        "pest": {
+            "fungal": "अधिक नमी + गर्मी → फफूंद का खतरा। {district} में ट्राइकोडर्मा से बीज उपचार करें।",
+            "stem_borer": "{district} में गर्म मौसम → {crop} में तना छेदक का खतरा। नीम आधारित अर्क का छिड़काव करें।",
+            "monitor": "{district} में {crop} की हर सप्ताह कीटों के लिए जांच करें; फेरोमोन ट्रैप का उपयोग करें।",
+        },
+        "yield": "दिए गए इनपुट के साथ {district} में {crop} की अनुमानित उपज {predicted_yield} क्विंटल/एकड़ है।",
+        "yield_reason": {
+            "down": "{factor} के कारण अनुमानित उपज {amount} क्विंटल/एकड़ कम हुई।",
+            "up": "{factor} के कारण अनुमानित उपज {amount} क्विंटल/एकड़ बढ़ी।",
+            "low": "कम {feature} ({value})",
+            "high": "अधिक {feature} ({value})",
+            "value": "{feature} = {value}",
+            "features": {"Nitrogen": "नाइट्रोजन", "Phosphorus": "फॉस्फोरस", "Potassium": "पोटैशियम",
+                         "Rainfall": "वर्षा", "Temperature": "तापमान", "Fertilizer": "उर्वरक",
+                         "Soil_color": "मिट्टी", "Season": "मौसम", "Month": "महीना"},
+        },
+        "storage": {
+            "harvesting": "अतिरिक्त: वर्षा जल संचयन (खेत तालाब, चेक-डैम) में निवेश करें।",
+            "borewell": "अतिरिक्त: पानी बचाने के लिए बोरवेल और ड्रिप सिंचाई का उपयोग करें।",
+            "wells": "अतिरिक्त: साल भर पानी के लिए कुओं और टंकियों का रखरखाव करें।",
+        },
+    },
+    "mr": {
+        "rainfall": {
+            "very_high": "{district} मध्ये खूप जास्त पाऊस ({rainfall} मिमी). पाणी आवडणारी पिके (भात, ऊस) घ्या. "
+                         "जास्तीचे पाणी शेततळी/बंधाऱ्यांमध्ये साठवा.",
+            "high": "{district} मध्ये पाऊस जास्त आहे ({rainfall} मिमी). {crop} साठी पाण्याचा निचरा होईल याची खात्री करा "
+                    "आणि सोयाबीन किंवा भात घ्या.",
+            "low": "{district} मध्ये पाऊस खूप कमी आहे ({rainfall} मिमी). बाजरी, ज्वारी, कडधान्ये यांसारखी दुष्काळ सहन करणारी "
+                   "पिके घ्या. जास्त पाणी लागणारी पिके टाळा.",
+            "moderate": "{district} मध्ये पाऊस मध्यम आहे ({rainfall} मिमी). गहू, मका, सोयाबीन यांसारखी संतुलित पिके योग्य आहेत.",
+        },
+        "month": {
+            "pre_monsoon": "सध्या {month} (मान्सूनपूर्व) आहे, दीर्घ कालावधीची पिके टाळा. "
+                           "मान्सून येईपर्यंत भेंडी, पालक, मूग यांसारखी कमी कालावधीची पिके घ्या.",
+            "monsoon": "सध्या {month} (मान्सून) आहे, आता {crop}, सोयाबीन, मका यांसारखी खरीप पिके पेरा.",
+            "rabi": "{month} मध्ये गहू, हरभरा, मोहरी यांसारखी रब्बी पिके सुरू करा.",
+            "other": "{month} मध्ये पीक मार्गदर्शनासाठी स्थानिक कृषी कार्यालयाचा सल्ला घ्या.",
+        },
+        "water_allocation": "कार्यक्षम सिंचन: {total_water} एकक पाणी असे वाटा → {allocation}. "
+                            "यामुळे पाणी वाया न घालवता अनेक पिके घेता येतात.",
+        "fertilizer": "माती={soil}, pH={ph}. खत सल्ला: {fert_advice}.",
+        "fertilizer_items": {
+            "n": "युरिया द्या (N स्रोत)",
+            "p": "एसएसपी द्या (P स्रोत)",
+            "k": "एमओपी द्या (K स्रोत)",
+            "balanced": "{fertilizer} चा संतुलित डोस ठेवा",
+        },
+        "pest": {
+            "fungal": "जास्त आर्द्रता + उष्णता → बुरशीचा धोका. {district} मध्ये ट्रायकोडर्माने बीजप्रक्रिया करा.",
+            "stem_borer": "{district} मध्ये उष्ण हवामान → {crop} मध्ये खोडकिडीचा धोका. निंबोळी अर्काची फवारणी करा.",
+            "monitor": "{district} मध्ये {crop} ची दर आठवड्याला कीड तपासणी करा; फेरोमोन सापळे वापरा.",
+        },
+        "yield": "दिलेल्या माहितीनुसार {district} मध्ये {crop} चे अंदाजित उत्पन्न {predicted_yield} क्विंटल/एकर आहे.",
+        "yield_reason": {
+            "down": "{factor} मुळे अंदाजित उत्पन्न {amount} क्विंटल/एकर कमी झाले.",
+            "up": "{factor} मुळे अंदाजित उत्पन्न {amount} क्विंटल/एकर वाढले.",
+            "low": "कमी {feature} ({value})",
+            "high": "जास्त {feature} ({value})",
+            "value": "{feature} = {value}",
+            "features": {"Nitrogen": "नायट्रोजन", "Phosphorus": "फॉस्फरस", "Potassium": "पोटॅशियम",
+                         "Rainfall": "पाऊस", "Temperature": "तापमान", "Fertilizer": "खत",
+                         "Soil_color": "माती", "Season": "हंगाम", "Month": "महिना"},
+        },
+        "storage": {
+            "harvesting": "अतिरिक्त: पावसाचे पाणी साठवण्यात (शेततळी, बंधारे) गुंतवणूक करा.",
+            "borewell": "अतिरिक्त: पाणी वाचवण्यासाठी बोअरवेल आणि ठिबक सिंचन वापरा.",
+            "wells": "अतिरिक्त: वर्षभर पाण्यासाठी विहिरी आणि टाक्यांची देखभाल करा.",
+        },
+    },
+}
+
+INTENT_PHRASES = {
+    "hi": {
+        "water_high_rain": "{district} में वर्षा ({rainfall} मिमी) अधिक है, इसलिए **वर्षा जल संरक्षण बहुत जरूरी है**। "
+                           "हम **चेक-डैम या खेत तालाब में निवेश** और सूखे मौसम के लिए पानी बचाने हेतु **ड्रिप सिंचाई** की "
+                           "सलाह देते हैं। पानी बांटते समय सबसे अधिक पानी वाली फसल को पहले रखें, फिर बचा 50% कम पानी वाली "
+                           "फसलों को दें।",
+        "water_low_rain": "{district} में कम वर्षा ({rainfall} मिमी) के कारण पानी की आपूर्ति सुनिश्चित करना सबसे जरूरी है। "
+                          "**बोरवेल या सामुदायिक कुओं में तुरंत निवेश करें**। {crop} के लिए हर बूंद का उपयोग हो, इसके लिए "
+                          "**सूक्ष्म सिंचाई (ड्रिप/स्प्रिंकलर)** पर ध्यान दें।",
+        "water_default": "{district} में मिट्टी की नमी बनाए रखें। खासकर {month} में पानी रोकने के लिए मल्चिंग और मेड़बंदी करें।",
+        "short_cycle": "**ध्यान दें, {district} के किसान:** {month} में भारी वर्षा ({rainfall} मिमी) से {crop} (लंबी अवधि) "
+                       "की फसल को नुकसान का खतरा है। **रणनीति बदलने की सलाह है।** इसके बजाय **{alternate_crop}** जैसी "
+                       "**कम अवधि की फसल** (70-90 दिन) उगाएं ताकि भारी मानसून या सूखे से पहले कटाई हो सके।",
+        "rabi_drought": "{district} में रबी मौसम ({month} से) में वर्षा कम ({rainfall} मिमी) है। अधिक लाभ के लिए अधिक पानी "
+                        "वाली फसलों के बजाय **सरसों या चना** जैसी **सूखा-सहनशील फसलें** उगाएं।",
+    },
+    "mr": {
+        "water_high_rain": "{district} मध्ये पाऊस ({rainfall} मिमी) जास्त असल्याने **पावसाच्या पाण्याचे संवर्धन अत्यंत "
+                           "महत्त्वाचे आहे**. **बंधारे किंवा शेततळ्यांमध्ये गुंतवणूक** आणि कोरड्या हंगामासाठी पाणी वाचवण्यासाठी "
+                           "**ठिबक सिंचन** वापरण्याचा आमचा सल्ला आहे. पाणी वाटताना सर्वाधिक पाणी लागणारे पीक आधी घ्या, "
+                           "उरलेले 50% कमी पाणी लागणाऱ्या पिकांना द्या.",
+        "water_low_rain": "{district} मध्ये कमी पावसामुळे ({rainfall} मिमी) पाणीपुरवठा सुनिश्चित करणे सर्वात महत्त्वाचे आहे. "
+                          "**बोअरवेल किंवा सामुदायिक विहिरींमध्ये त्वरित गुंतवणूक करा**. {crop} साठी प्रत्येक थेंब वापरला "
+                          "जावा म्हणून **सूक्ष्म सिंचन (ठिबक/तुषार)** वर भर द्या.",
+        "water_default": "{district} मध्ये जमिनीतील ओलावा टिकवा. विशेषतः {month} मध्ये पाणी टिकवण्यासाठी आच्छादन आणि "
+                         "बांधबंदिस्ती करा.",
+        "short_cycle": "**लक्ष द्या, {district} मधील शेतकरी:** {month} मधील मुसळधार पावसामुळे ({rainfall} मिमी) {crop} "
+                       "(दीर्घ कालावधी) पिकाचे नुकसान होण्याचा धोका आहे. **धोरण बदलण्याचा सल्ला आहे.** त्याऐवजी "
+                       "**{alternate_crop}** सारखे **कमी कालावधीचे पीक** (70-90 दिवस) घ्या म्हणजे मोठ्या पावसाआधी किंवा "
+                       "कोरड्या काळाआधी काढणी होईल.",
+        "rabi_drought": "{district} मध्ये रब्बी हंगामात ({month} पासून) पाऊस कमी ({rainfall} मिमी) आहे. जास्त नफ्यासाठी जास्त "
+                        "पाणी लागणाऱ्या पिकांऐवजी **मोहरी किंवा हरभरा** यांसारखी **दुष्काळ सहन करणारी पिके** घ्या.",
+    },
+}
@@ -1,7 +1,8 @@
-import joblib
 import os
+import threading
 import numpy as np
 from datetime import datetime
+import weather_provider
 
 MODEL_PATH = "Model_Yield_Predict.joblib"
 
@@ -13,21 +14,106 @@ FEATURE_ORDER = [
 NUMERIC_COLS = ["Nitrogen", "Phosphorus", "Potassium", "pH", "Rainfall", "Temperature"]
 
 
-# Load the model once
-try:
+# Load the model once, on first use: joblib + sklearn cost about a second to import,
+# and callers that only need weather or the feature layout shouldn't pay for it.
+# The served model is one (pipeline, info) tuple so a hot swap (model_registry) replaces
+# pipeline, version and artifact dir together; callers take one reference per request.
+_active = (None, {})
+_model_loaded = False
+_model_lock = threading.Lock()
+_artifact_dirs = {}  # id(pipeline) -> (pipeline, dir of its residuals / explanations files)
+
+
+def _load_initial():
+    """The registry's current version if there is one, else MODEL_PATH."""
+    import model_registry
+    version = model_registry.current_version()
+    if version:
+        try:
+            pipeline, _ = model_registry.load_version(version)
+            model_dir = os.path.join(model_registry.REGISTRY_DIR, version)
+            register_model_dir(pipeline, model_dir)
+            return pipeline, {"version": version, "dir": model_dir}
+        except Exception as e:
+            print(f"Error loading registry model {version}: {e}; falling back to {MODEL_PATH}")
     if not os.path.exists(MODEL_PATH):
         raise FileNotFoundError(f"ML model file not found: {MODEL_PATH}")
+    import joblib
     # Load the entire pipeline
-    BEST_MODEL_PIPELINE = joblib.load(MODEL_PATH)
-except Exception as e:
-    print(f"Error loading ML model: {e}")
-    BEST_MODEL_PIPELINE = None
+    return joblib.load(MODEL_PATH), {"version": None, "dir": None}
+
+
+def get_model():
+    """The fitted pipeline (loaded on first call), or None if it can't be loaded."""
+    global _active, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                try:
+                    _active = _load_initial()
+                except Exception as e:
+                    print(f"Error loading ML model: {e}")
+                    _active = (None, {})
+                _model_loaded = True
+    return _active[0]
+
+
+def model_info():
+    """{"version", "dir"} of the model being served (version None = MODEL_PATH)."""
+    get_model()
+    return dict(_active[1])
+
+
+def register_model_dir(pipeline, model_dir):
+    """Where pipeline's side files live (set before warm-up, so caches use the right ones)."""
+    _artifact_dirs[id(pipeline)] = (pipeline, model_dir)
+
+
+def artifact_path(name, pipeline=None):
+    """Path of a side file ("residuals.json", ...) for pipeline (default: the served one)."""
+    pipeline = pipeline if pipeline is not None else get_model()
+    entry = _artifact_dirs.get(id(pipeline))
+    if entry is not None and entry[0] is pipeline and entry[1]:
+        return os.path.join(entry[1], name)
+    return os.path.splitext(MODEL_PATH)[0] + "." + name
+
+
+def swap_model(pipeline, version=None, model_dir=None):
+    """Atomically serve a new pipeline; requests already running keep the old one."""
+    global _active, _model_loaded
+    if model_dir:
+        register_model_dir(pipeline, model_dir)
+    with _model_lock:
+        previous = _active[0]
+        _active = (pipeline, {"version": version, "dir": model_dir})
+        _model_loaded = True
+    for key, (p, _) in list(_artifact_dirs.items()):
+        if p is not pipeline and p is not previous:
+            _artifact_dirs.pop(key, None)
+    return previous
+
+
+def __getattr__(name):
+    # ml_connector.BEST_MODEL_PIPELINE keeps working, but loads lazily.
+    if name == "BEST_MODEL_PIPELINE":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_dynamic_rainfall_and_temp(district, month):
     """
-    MOCK FUNCTION: Provides default/mock dynamic weather data.
+    Weather for a district/month from the configured weather_provider
+    (local daily store by default). Falls back to the old defaults when the
+    provider has no data for the district.
     """
+    try:
+        weather = weather_provider.get_provider().get_monthly(district, month)
+    except Exception as e:
+        print(f"[weather] Provider lookup failed for {district}/{month}: {e}")
+        weather = None
+    if weather:
+        return weather
+
     print(f"MOCK: Getting dynamic weather for {district} in {month}. Using defaults (Rain=200.0, Temp=28.0).")
     return {
         "Rainfall": 200.0,
@@ -35,15 +121,8 @@ def get_dynamic_rainfall_and_temp(district, month):
     }
 
 
-def predict_yield(features):
-    """
-    The core function that prepares the data and calls the ML model.
-    """
-    if BEST_MODEL_PIPELINE is None:
-        print("Model is not loaded. Cannot predict.")
-        return None
-
-    # 1. Extract values in the correct order and handle data types
+def _feature_row(features):
+    """Extract one row of values in FEATURE_ORDER, coercing numeric columns to float."""
     feature_values = []
     for col in FEATURE_ORDER:
         # Get the single value (e.g., 'Satara') or a default
@@ -62,12 +141,111 @@ def predict_yield(features):
         else:
             # Categorical features must be strings/objects
             feature_values.append(str(value))
+    return feature_values
+
+
+def build_feature_matrix(feature_dicts):
+    """
+    Stack many feature dicts into one (n_rows, len(FEATURE_ORDER)) object array
+    that can be passed to the pipeline in a single predict call.
+    """
+    return np.array([_feature_row(f) for f in feature_dicts], dtype=object).reshape(-1, len(FEATURE_ORDER))
+
+
+def _transform_block(transformer, block):
+    """
+    Transform one ColumnTransformer block, encoding each distinct input row only once.
+    Grids and bulk runs repeat the same categorical values on every row, so the
+    one-hot encoder usually sees a handful of unique rows instead of thousands.
+    """
+    index_of = {}
+    inverse = np.empty(len(block), dtype=np.intp)
+    for i, row in enumerate(map(tuple, block)):
+        inverse[i] = index_of.setdefault(row, len(index_of))
+    if len(index_of) == len(block):
+        return transformer.transform(block)
+    uniques = np.array(list(index_of), dtype=block.dtype).reshape(len(index_of), block.shape[1])
+    encoded = transformer.transform(uniques)
+    if hasattr(encoded, "toarray"):
+        encoded = encoded.toarray()
+    return np.asarray(encoded)[inverse]
+
+
+def transform_matrix(input_array, pipeline=None):
+    """
+    Apply the pipeline's preprocessing to a feature matrix built by build_feature_matrix.
+    Returns (transformed_matrix, final_estimator).
+    """
+    pipeline = pipeline if pipeline is not None else get_model()
+    steps = getattr(pipeline, "steps", None)
+    if not steps:
+        return input_array, pipeline
+    model = steps[-1][1]
+    preprocessor = dict(steps).get("preprocessor")
+    fitted = getattr(preprocessor, "transformers_", None)
+    if len(steps) != 2 or not fitted:
+        return pipeline[:-1].transform(input_array), model
+
+    try:
+        blocks = []
+        for name, transformer, cols in fitted:
+            if isinstance(transformer, str):
+                if transformer == "passthrough":
+                    blocks.append(input_array[:, cols].astype(float))
+                continue
+            blocks.append(_transform_block(transformer, input_array[:, cols]))
+        blocks = [b.toarray() if hasattr(b, "toarray") else np.asarray(b, dtype=float) for b in blocks]
+        return np.hstack(blocks), model
+    except Exception:
+        # Column specs by name, sparse-only encoders, etc. -> let sklearn do it.
+        return pipeline[:-1].transform(input_array), model
+
+
+def predict_matrix(input_array, pipeline=None):
+    """
+    Run the pipeline (default: the served model) on an already-built feature matrix.
+    Returns a float ndarray of predictions (NaN everywhere if the model is unavailable).
+    """
+    pipeline = pipeline if pipeline is not None else get_model()
+    if pipeline is None:
+        print("Model is not loaded. Cannot predict.")
+        return np.full(len(input_array), np.nan)
+    try:
+        transformed, model = transform_matrix(input_array, pipeline)
+        return np.asarray(model.predict(transformed), dtype=float)
+    except Exception as e:
+        print(f"Error during model prediction: {e}")
+        return np.full(len(input_array), np.nan)
+
+
+def predict_yield_batch(feature_dicts):
+    """
+    Vectorized version of predict_yield: one pipeline call for all rows.
+    Returns a list with a rounded yield (or None) per input dict.
+    """
+    if not feature_dicts:
+        return []
+    preds = predict_matrix(build_feature_matrix(feature_dicts))
+    return [None if np.isnan(p) else round(float(p), 2) for p in preds]
+
+
+def predict_yield(features):
+    """
+    The core function that prepares the data and calls the ML model.
+    """
+    pipeline = get_model()
+    if pipeline is None:
+        print("Model is not loaded. Cannot predict.")
+        return None
+
+    # 1. Extract values in the correct order and handle data types
+    feature_values = _feature_row(features)
 
     # 2. Reshape the single sample into a 2D array: (1 row, N columns)
     input_array = np.array([feature_values], dtype=object)
 
     try:
-        prediction = BEST_MODEL_PIPELINE.predict(input_array)
+        prediction = pipeline.predict(input_array)
         
         # Prediction result is an array, return the scalar value
         return round(prediction[0], 2)
@@ -76,11 +254,150 @@ def predict_yield(features):
         print(f"Error during model prediction: {e}")
         return None
 
+# ---------------- prediction intervals ----------------
+
+INTERVAL_QUANTILES = (0.1, 0.9)
+# Held-out residual quantiles written by crop_yield_prediction.py (used for boosted models):
+# Model_Yield_Predict.residuals.json, or residuals.json in a registry version dir.
+RESIDUALS_FILE = "residuals.json"
+CALIBRATION_ROWS = 2000
+_GRID = np.linspace(0.0, 1.0, 101)
+
+# Keyed by id(model); at most two entries (the served model and one being warmed up).
+_leaf_table_cache = {}
+_residual_cache = {}
+
+
+def _cache_put(cache, model, value):
+    cache[id(model)] = (model, value)
+    while len(cache) > 2:
+        cache.pop(next(iter(cache)))
+
+
+def _is_forest(model):
+    # Forests keep a list of independent trees; boosting keeps an (n_stages, 1) array.
+    return isinstance(getattr(model, "estimators_", None), list)
+
+
+def _leaf_table(model):
+    """[n_trees, max_nodes] node values, built once per model, so per-tree predictions are one gather."""
+    cached = _leaf_table_cache.get(id(model))
+    if cached is not None and cached[0] is model:
+        return cached[1]
+    trees = [est.tree_ for est in model.estimators_]
+    table = np.zeros((len(trees), max(t.node_count for t in trees)))
+    for i, tree in enumerate(trees):
+        table[i, :tree.node_count] = tree.value[:, 0, 0]
+    _cache_put(_leaf_table_cache, model, table)
+    return table
+
+
+def per_tree_predictions(model, transformed):
+    """(n_rows, n_trees) predictions of every tree in a fitted forest, in one vectorized pass."""
+    leaves = model.apply(transformed)          # (n_rows, n_trees) leaf ids
+    table = _leaf_table(model)
+    return table[np.arange(table.shape[0])[None, :], leaves]
+
+
+def _residual_quantiles(pipeline):
+    """Residual (true - predicted) quantiles on _GRID for models without per-tree spread."""
+    cached = _residual_cache.get(id(pipeline))
+    if cached is not None and cached[0] is pipeline:
+        return cached[1]
+    grid = None
+    path = artifact_path(RESIDUALS_FILE, pipeline)
+    try:
+        import json
+        with open(path, encoding="utf-8") as f:
+            grid = np.asarray(json.load(f)["quantiles"], dtype=float)
+    except (OSError, ValueError, KeyError):
+        pass
+    if grid is None or len(grid) != len(_GRID):
+        # No held-out calibration saved with the model: estimate from dataset rows (in-sample,
+        # so somewhat optimistic) rather than report no interval at all.
+        from dataset_connector import load_dataset
+        # Evenly strided over the whole file: the head alone is a few states / years.
+        rows = load_dataset()
+        rows = [r for r in rows[::max(1, len(rows) // CALIBRATION_ROWS)] if r.get("Yield")]
+        if not rows:
+            return None
+        truth = np.array([float(r["Yield"]) for r in rows])
+        transformed, model = transform_matrix(build_feature_matrix(rows), pipeline)
+        grid = np.quantile(truth - model.predict(transformed), _GRID)
+        print(f"[interval] No {path}; calibrated on {len(rows)} dataset rows")
+    _cache_put(_residual_cache, pipeline, grid)
+    return grid
+
+
+def interval_confidence(point, lower, upper):
+    """0-100: how much of the point estimate the interval's half-width leaves certain."""
+    if not point:
+        return 0
+    return int(round(100 * min(1.0, max(0.0, 1.0 - (upper - lower) / (2 * abs(point))))))
+
+
+def predict_yield_with_interval(feature_dicts, lower=INTERVAL_QUANTILES[0], upper=INTERVAL_QUANTILES[1],
+                                pipeline=None):
+    """
+    Batch yield predictions with a [lower, upper] quantile interval.
+    Returns one dict per input: {"yield", "lower", "upper", "spread", "confidence"} (None on failure).
+    lower / upper / spread / confidence are None when no interval can be estimated (boosted
+    model without residuals.json or dataset rows to calibrate on).
+
+    Forests: the quantiles of the per-tree predictions (apply + leaf-value table, no Python
+    loop over trees). Boosted models have no independent trees, so the interval is the
+    point estimate plus held-out residual quantiles.
+    """
+    if not feature_dicts:
+        return []
+    pipeline = pipeline if pipeline is not None else get_model()
+    if pipeline is None:
+        print("Model is not loaded. Cannot predict.")
+        return [None] * len(feature_dicts)
+    try:
+        transformed, model = transform_matrix(build_feature_matrix(feature_dicts), pipeline)
+        if _is_forest(model):
+            trees = per_tree_predictions(model, transformed)
+            point = trees.mean(axis=1)
+            lo, hi = np.quantile(trees, [lower, upper], axis=1)
+        else:
+            point = np.asarray(model.predict(transformed), dtype=float)
+            grid = _residual_quantiles(pipeline)
+            if grid is None:
+                # No calibration: report the point estimate only, never a zero-width interval.
+                return [{"yield": round(float(p), 2), "lower": None, "upper": None, "spread": None,
+                         "confidence": None} for p in point]
+            lo = point + np.interp(lower, _GRID, grid)
+            hi = point + np.interp(upper, _GRID, grid)
+    except Exception as e:
+        print(f"Error during interval prediction: {e}")
+        return [None] * len(feature_dicts)
+    lo = np.maximum(lo, 0.0)  # residual offsets can push a low yield below zero
+
+    return [
+        {"yield": round(float(p), 2), "lower": round(float(l), 2), "upper": round(float(h), 2),
+         "spread": round(float(h - l), 2), "confidence": interval_confidence(p, l, h)}
+        for p, l, h in zip(point, lo, hi)
+    ]
+
+# Optional InferenceBatcher (see inference_batcher.py); None = predict inline.
+_batcher = None
+BATCH_TIMEOUT_S = 10.0
+
+
+def set_batcher(batcher):
+    """Route get_yield_prediction through a started InferenceBatcher (or None to disable)."""
+    global _batcher
+    _batcher = batcher
+
+
 # --- FIX: ADDED WRAPPER FUNCTION ---
 def get_yield_prediction(features):
     """
     Wrapper function to be compatible with voice_assistant.py.
-    Calls the actual prediction logic.
+    Calls the actual prediction logic, micro-batched when a batcher is installed.
     """
+    if _batcher is not None:
+        return _batcher.predict(features, timeout=BATCH_TIMEOUT_S)
     return predict_yield(features)
 # ----------------------------------
\ No newline at end of file
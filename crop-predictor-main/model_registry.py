@@ -0,0 +1,228 @@
+# model_registry.py
+"""
+Versioned local model registry plus a hot-swap watcher for the serving side.
+
+    model_registry/
+        CURRENT                 "v0003"  (replaced atomically)
+        v0003/
+            model.joblib
+            metadata.json       sha256, metrics, model name, created_at, canary batch
+            residuals.json      optional artifacts written next to the model
+            explanations.json
+
+Publishing (crop_yield_prediction.py):
+
+    publish(best_pipe, metadata={...}, artifacts={"residuals.json": path}, canary=rows[:16])
+
+A version is written into a temp dir, renamed into place, and only then made current,
+so readers never see a half-written model.
+
+Serving (app.py): ModelWatcher polls CURRENT. When it changes, the new version is loaded
+and its checksum verified in a background thread, warmed with the canary batch (the
+predictions recorded at publish time must be reproduced), and then installed with
+ml_connector.swap_model(). In-flight requests keep the pipeline reference they already
+took, so they finish on the old model; new requests get the new one. A version that
+fails to load or to reproduce its canary is logged and skipped; the old model keeps serving.
+"""
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", "model_registry")
+WATCH_INTERVAL_S = float(os.environ.get("MODEL_WATCH_INTERVAL_S", "5"))
+MODEL_FILE = "model.joblib"
+METADATA_FILE = "metadata.json"
+CANARY_TOLERANCE = 1e-6
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    """Name of the current version ("v0003"), or None for an empty / missing registry."""
+    try:
+        with open(os.path.join(registry_dir, "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(d for d in os.listdir(registry_dir) if d.startswith("v") and d[1:].isdigit())
+
+
+def _next_version(registry_dir):
+    versions = list_versions(registry_dir)
+    return "v%04d" % (int(versions[-1][1:]) + 1 if versions else 1)
+
+
+def set_current(version, registry_dir=REGISTRY_DIR):
+    """Point CURRENT at version (also how to roll back)."""
+    if not os.path.isfile(os.path.join(registry_dir, version, MODEL_FILE)):
+        raise FileNotFoundError(f"No model for version {version} in {registry_dir}")
+    tmp = os.path.join(registry_dir, f"CURRENT.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(registry_dir, "CURRENT"))
+
+
+def publish(pipeline, metadata=None, artifacts=None, canary=None, registry_dir=REGISTRY_DIR, make_current=True):
+    """
+    Save pipeline as a new version. artifacts: {file name: existing path} copied alongside.
+    canary: a few feature dicts; their predictions are recorded for the serving-side check.
+    Returns the version name.
+    """
+    import joblib
+    import ml_connector
+
+    os.makedirs(registry_dir, exist_ok=True)
+    staging = os.path.join(registry_dir, f".staging-{os.getpid()}-{int(time.time() * 1000)}")
+    os.makedirs(staging)
+    try:
+        model_path = os.path.join(staging, MODEL_FILE)
+        joblib.dump(pipeline, model_path)
+        for name, src in (artifacts or {}).items():
+            if src and os.path.exists(src):
+                shutil.copyfile(src, os.path.join(staging, name))
+
+        meta = dict(metadata or {})
+        meta["sha256"] = file_sha256(model_path)
+        meta["created_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+        meta["feature_order"] = ml_connector.FEATURE_ORDER
+        if canary:
+            rows = [{col: r.get(col) for col in ml_connector.FEATURE_ORDER} for r in canary]
+            preds = ml_connector.predict_matrix(ml_connector.build_feature_matrix(rows), pipeline)
+            meta["canary"] = {"rows": rows, "predictions": [float(p) for p in preds]}
+        with open(os.path.join(staging, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False, default=str)
+
+        # Retry on a concurrent publish taking the same number.
+        for _ in range(10):
+            version = _next_version(registry_dir)
+            try:
+                os.rename(staging, os.path.join(registry_dir, version))
+                break
+            except OSError:
+                continue
+        else:
+            raise RuntimeError(f"Could not allocate a version in {registry_dir}")
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if make_current:
+        set_current(version, registry_dir)
+    return version
+
+
+def read_metadata(version, registry_dir=REGISTRY_DIR):
+    with open(os.path.join(registry_dir, version, METADATA_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_version(version, registry_dir=REGISTRY_DIR):
+    """(pipeline, metadata) for version; raises ValueError on a checksum mismatch."""
+    import joblib
+
+    version_dir = os.path.join(registry_dir, version)
+    meta = read_metadata(version, registry_dir)
+    model_path = os.path.join(version_dir, MODEL_FILE)
+    if meta.get("sha256") and file_sha256(model_path) != meta["sha256"]:
+        raise ValueError(f"Checksum mismatch for {model_path}")
+    return joblib.load(model_path), meta
+
+
+def warm_up(pipeline, meta):
+    """
+    Run the canary batch through the new pipeline (first-call costs are paid here, not
+    by a request) and check it reproduces the predictions recorded at publish time.
+    """
+    import numpy as np
+    import ml_connector
+
+    canary = meta.get("canary") or {}
+    rows = canary.get("rows") or [{}]
+    preds = ml_connector.predict_matrix(ml_connector.build_feature_matrix(rows), pipeline)
+    expected = canary.get("predictions")
+    if expected is not None and not np.allclose(preds, expected, atol=CANARY_TOLERANCE, equal_nan=True):
+        raise ValueError("canary predictions differ from the ones recorded at publish time")
+    if not np.all(np.isfinite(preds)) and expected is None:
+        raise ValueError("canary predictions are not finite")
+    # Caches keyed by the pipeline (interval tables, explainer) are built before the swap too.
+    ml_connector.predict_yield_with_interval(rows, pipeline=pipeline)
+    try:
+        import explanations
+        explanations.prepare(pipeline)
+    except Exception as e:
+        print(f"[registry] Explainer warm-up skipped: {e}")
+
+
+def activate(version, registry_dir=REGISTRY_DIR):
+    """Load, verify, warm and swap in version. Returns True if it is now serving."""
+    import ml_connector
+
+    started = time.perf_counter()
+    try:
+        pipeline, meta = load_version(version, registry_dir)
+        ml_connector.register_model_dir(pipeline, os.path.join(registry_dir, version))
+        warm_up(pipeline, meta)
+    except Exception as e:
+        print(f"[registry] Not activating {version}: {e}")
+        return False
+    ml_connector.swap_model(pipeline, version=version, model_dir=os.path.join(registry_dir, version))
+    print(f"[registry] Now serving {version} (loaded + warmed in {time.perf_counter() - started:.2f}s)")
+    return True
+
+
+class ModelWatcher:
+    """Background thread: swap in whatever CURRENT points at."""
+
+    def __init__(self, registry_dir=REGISTRY_DIR, interval_s=WATCH_INTERVAL_S):
+        self.registry_dir = registry_dir
+        self.interval_s = interval_s
+        self.active = None
+        self.failed = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check_once(self):
+        version = current_version(self.registry_dir)
+        if version and version != self.active and version not in self.failed:
+            if activate(version, self.registry_dir):
+                self.active = version
+            else:
+                self.failed.add(version)
+        return self.active
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.check_once()
+            except Exception as e:
+                print(f"[registry] Watcher error: {e}")
+
+    def start(self, active=None):
+        """active: version already being served (skip reloading it)."""
+        self.active = active
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,146 @@
+# profiling.py
+"""
+Opt-in, per-request profiling of generate_reply.
+
+    with profiling.profiled("chat", requested=True) as prof:
+        reply = generate_reply(...)
+    prof["path"]  # output file, or None if profiling was skipped
+
+Enabled per call (HTTP header `X-Profile: 1`, query `?profile=1`, CLI `--profile`)
+or for every call with AGRO_PROFILE=1. Two modes (AGRO_PROFILE_MODE):
+
+- "sample" (default): a helper thread snapshots the profiled thread's stack every
+  AGRO_PROFILE_INTERVAL_MS via sys._current_frames() and writes collapsed stacks
+  ("mod:func;mod:func count" lines, flamegraph.pl / speedscope compatible).
+  Overhead is one stack walk per interval, independent of how much Python runs.
+- "cprofile": deterministic cProfile for that thread only, written as .pstats.
+
+Rate limited per process: at most one profile at a time and at most one every
+AGRO_PROFILE_MIN_INTERVAL_S seconds, so turning it on can't slow neighbours down.
+"""
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_DIR = os.environ.get("AGRO_PROFILE_DIR", "profiles")
+PROFILE_ALWAYS = os.environ.get("AGRO_PROFILE") == "1"
+PROFILE_MODE = os.environ.get("AGRO_PROFILE_MODE", "sample")
+SAMPLE_INTERVAL_S = float(os.environ.get("AGRO_PROFILE_INTERVAL_MS", "1")) / 1000.0
+MIN_INTERVAL_S = float(os.environ.get("AGRO_PROFILE_MIN_INTERVAL_S", "10"))
+
+
+class _RateLimiter:
+    def __init__(self, min_interval_s):
+        self.min_interval_s = min_interval_s
+        self._lock = threading.Lock()
+        self._active = False
+        self._last = float("-inf")
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._active or now - self._last < self.min_interval_s:
+                return False
+            self._active = True
+            self._last = now
+            return True
+
+    def release(self):
+        with self._lock:
+            self._active = False
+
+
+_limiter = _RateLimiter(MIN_INTERVAL_S)
+stats = {"profiled": 0, "skipped_rate_limit": 0}
+
+
+def is_requested(flag):
+    """True for header/query/CLI values like '1', 'true', 'yes'."""
+    return str(flag or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+class _StackSampler(threading.Thread):
+    """Samples one target thread's Python stack at a fixed interval."""
+
+    def __init__(self, target_ident, interval_s):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.target_ident = target_ident
+        self.interval_s = interval_s
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval_s):
+            frame = sys._current_frames().get(self.target_ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _output_path(label, ext):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", label)[:40] or "profile"
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(PROFILE_DIR, f"{stamp}-{os.getpid()}-{safe}.{ext}")
+
+
+@contextmanager
+def profiled(label, requested=False, mode=None):
+    """
+    Profile the with-block if requested (or AGRO_PROFILE=1) and the rate limiter allows.
+    Yields a dict; after the block its "path" holds the written file (None if skipped).
+    """
+    info = {"path": None, "mode": None}
+    if not (requested or PROFILE_ALWAYS):
+        yield info
+        return
+    if not _limiter.acquire():
+        stats["skipped_rate_limit"] += 1
+        yield info
+        return
+
+    mode = mode or PROFILE_MODE
+    info["mode"] = mode
+    try:
+        if mode == "cprofile":
+            prof = cProfile.Profile()
+            prof.enable()
+            try:
+                yield info
+            finally:
+                prof.disable()
+                info["path"] = _output_path(label, "pstats")
+                prof.dump_stats(info["path"])
+        else:
+            sampler = _StackSampler(threading.get_ident(), SAMPLE_INTERVAL_S)
+            sampler.start()
+            try:
+                yield info
+            finally:
+                sampler.stop()
+                info["path"] = _output_path(label, "collapsed")
+                with open(info["path"], "w", encoding="utf-8") as f:
+                    for stack, count in sampler.samples.most_common():
+                        f.write(f"{stack} {count}\n")
+        stats["profiled"] += 1
+    finally:
+        _limiter.release()
@@ -1,11 +1,21 @@
 # reply_generator.py
 import random
 from templates import TEMPLATES
-from data_loader import get_latest_value, get_average
+from data_loader import get_latest_value, get_average, get_stats
+
+
+class _Placeholders(dict):
+    """Template values; placeholders this intent has no data for render as N/A."""
+    def __missing__(self, key):
+        return "N/A"
+
 
 def generate_reply(intent, lang, district="Nagpur", crop="Wheat"):
     """
     Generate a reply based on intent, language, dataset, and templates.
+    Values come from the data_loader statistics cube (district + crop rows,
+    falling back to all rows of the district); yield and confidence from the
+    model's prediction interval.
     """
     if intent not in TEMPLATES:
         return "❌ Unknown intent."
@@ -16,25 +26,58 @@ def generate_reply(intent, lang, district="Nagpur", crop="Wheat"):
     template = random.choice(TEMPLATES[intent][lang])
 
     # Collect dataset values
-    rainfall = get_average(district, "PrecipitationSumInches") or "N/A"
-    soil = get_latest_value(district, "SoilType") or "Loamy"
-    fertilizer = "Urea"  # Placeholder → could map from dataset later
-    pest = "Aphids"      # Placeholder
-    season = "Kharif"    # Placeholder
-    yield_pred = random.randint(15, 30)  # Dummy prediction
-    confidence = round(random.uniform(0.7, 0.95), 2)
+    if not get_stats(district, crop):
+        crop_filter = None  # no rows for this crop here: use the district as a whole
+    else:
+        crop_filter = crop
 
-    # Replace placeholders in the template
-    reply = template.format(
+    def average(column, digits=1):
+        value = get_average(district, column, crop=crop_filter)
+        return round(value, digits) if value is not None else None
+
+    soil = get_latest_value(district, "Soil_color", crop=crop_filter) or "Loamy"
+    fertilizer = get_latest_value(district, "Fertilizer", crop=crop_filter) or "Urea"
+    season = get_latest_value(district, "Season", crop=crop_filter) or "Kharif"
+    month = get_latest_value(district, "Month", crop=crop_filter) or "N/A"
+
+    # Model prediction with interval for typical conditions of this district / crop
+    features = {col: get_average(district, col, crop=crop_filter)
+                for col in ("Nitrogen", "Phosphorus", "Potassium", "pH", "Rainfall", "Temperature")}
+    features.update(District_Name=district, Crop=crop, Season=season, Month=month,
+                    Fertilizer=fertilizer, Soil_color=soil)
+    try:
+        from ml_connector import predict_yield_with_interval
+        prediction = predict_yield_with_interval([features])[0]
+    except Exception as e:
+        print(f"[ML-ERROR] Interval prediction failed: {e}")
+        prediction = None
+
+    yield_pred = prediction["yield"] if prediction else average("Yield", 2)
+    if prediction and prediction["confidence"] is not None:
+        confidence = prediction["confidence"]
+    else:
+        # No model (historical mean) or no calibrated interval: confidence from the spread of past yields
+        yield_stats = get_stats(district, crop_filter).get("Yield", {})
+        confidence = "N/A"
+        if yield_stats.get("p50"):
+            spread = (yield_stats["p75"] - yield_stats["p25"]) / yield_stats["p50"]
+            confidence = int(round(100 * max(0.0, min(1.0, 1.0 - spread))))
+
+    values = _Placeholders(
         crop=crop,
         district=district,
-        rainfall=rainfall,
+        rainfall=average("Rainfall") or "N/A",
+        temperature=average("Temperature") or "N/A",
+        nitrogen=average("Nitrogen", 0) or "N/A",
+        ph=average("pH") or "N/A",
         soil=soil,
         fertilizer=fertilizer,
-        pest=pest,
         season=season,
-  
-        confidence=confidence
+        month=month,
+        pest="Aphids",  # Placeholder: the dataset has no pest column
+        confidence=confidence,
     )
+    values["yield"] = yield_pred if yield_pred is not None else "N/A"
 
-    return reply
+    # Replace placeholders in the template
+    return template.format_map(values)
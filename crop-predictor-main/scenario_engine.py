@@ -0,0 +1,178 @@
+# scenario_engine.py
+"""
+What-if scenario sweeps over the yield model.
+
+Expands a base feature dict plus one or more parameter axes (e.g. Rainfall x Nitrogen)
+into ONE feature matrix, evaluates it in chunks on a worker pool and returns a dense
+grid of predictions shaped like the axes.
+
+Example:
+    grid = run_scenario(
+        {"District_Name": "Kolhapur", "Crop": "Maize", "Season": "Kharif", "Month": "July",
+         "Temperature": 28, "Phosphorus": 30, "Potassium": 20, "pH": 6.8,
+         "Fertilizer": "Urea", "Soil_color": "Black"},
+        [("Rainfall", linspace(100, 1500, 100)), ("Nitrogen", linspace(0, 200, 100))],
+    )
+    grid["yields"].shape  # (100, 100)
+"""
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import ml_connector
+
+# Rows per predict() call. Large enough to amortise the sklearn call overhead,
+# small enough that several chunks run at once on the pool.
+CHUNK_ROWS = int(os.environ.get("SCENARIO_CHUNK_ROWS", "2500"))
+MAX_WORKERS = int(os.environ.get("SCENARIO_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_GRID_ROWS = int(os.environ.get("SCENARIO_MAX_ROWS", "250000"))
+
+_pool = None
+
+
+def _get_pool():
+    # Created lazily so forked serving workers each get their own threads.
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="scenario")
+    return _pool
+
+
+def linspace(start, stop, num):
+    """Convenience wrapper so callers don't need numpy to describe an axis."""
+    return np.linspace(float(start), float(stop), int(num))
+
+
+def expand_grid(base_features, axes):
+    """
+    Build the full feature matrix for a cartesian sweep.
+    base_features: dict of fixed inputs (same keys as ml_connector.FEATURE_ORDER)
+    axes: list of (column, values) pairs, outermost axis first
+    Returns (matrix, shape) where matrix has prod(shape) rows in C order.
+    """
+    if not axes:
+        raise ValueError("At least one axis is required for a scenario sweep.")
+
+    shape = []
+    columns = []
+    for col, values in axes:
+        if col not in ml_connector.FEATURE_ORDER:
+            raise KeyError(f"Unknown feature for scenario axis: {col}")
+        if col in columns:
+            raise ValueError(f"Axis given twice: {col}")
+        columns.append(col)
+        shape.append(len(values))
+    shape = tuple(shape)
+    n_rows = int(np.prod(shape))
+    if n_rows == 0:
+        raise ValueError("Scenario axes must not be empty.")
+    if n_rows > MAX_GRID_ROWS:
+        raise ValueError(f"Scenario grid has {n_rows} rows; limit is {MAX_GRID_ROWS}.")
+
+    base_row = np.array(ml_connector.build_feature_matrix([base_features])[0], dtype=object)
+    matrix = np.tile(base_row, (n_rows, 1))
+
+    # Each axis value is repeated/tiled with the same index trick np.meshgrid uses,
+    # but written straight into the object matrix column.
+    for axis_no, (col, values) in enumerate(axes):
+        col_idx = ml_connector.FEATURE_ORDER.index(col)
+        if col in ml_connector.NUMERIC_COLS:
+            values = np.asarray(values, dtype=float).astype(object)
+        else:
+            values = np.asarray([str(v) for v in values], dtype=object)
+        repeat = int(np.prod(shape[axis_no + 1:]))
+        tile = int(np.prod(shape[:axis_no]))
+        matrix[:, col_idx] = np.tile(np.repeat(values, repeat), tile)
+
+    return matrix, shape
+
+
+def evaluate_matrix(matrix, chunk_rows=CHUNK_ROWS):
+    """Predict every row of matrix, chunked across the worker pool. Returns float ndarray."""
+    n_rows = len(matrix)
+    if n_rows <= chunk_rows:
+        return ml_connector.predict_matrix(matrix)
+    bounds = [(i, min(i + chunk_rows, n_rows)) for i in range(0, n_rows, chunk_rows)]
+    pool = _get_pool()
+    futures = [pool.submit(ml_connector.predict_matrix, matrix[a:b]) for a, b in bounds]
+    out = np.empty(n_rows, dtype=float)
+    for (a, b), fut in zip(bounds, futures):
+        out[a:b] = fut.result()
+    return out
+
+
+def run_scenario(base_features, axes, chunk_rows=CHUNK_ROWS):
+    """
+    Evaluate a what-if grid.
+    Returns dict with:
+      axes     -> list of (column, ndarray of axis values)
+      yields   -> float32 ndarray shaped like the axes (NaN where prediction failed)
+      elapsed_ms
+    """
+    started = time.perf_counter()
+    matrix, shape = expand_grid(base_features, axes)
+    preds = evaluate_matrix(matrix, chunk_rows=chunk_rows)
+    return {
+        "axes": [(col, np.asarray(values)) for col, values in axes],
+        "yields": preds.astype(np.float32).reshape(shape),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def to_npz_bytes(result):
+    """
+    Pack a run_scenario result into a compact .npz payload (float32 grid + axis arrays).
+    Load on the client with numpy.load(io.BytesIO(payload)).
+    """
+    arrays = {"yields": result["yields"]}
+    for i, (col, values) in enumerate(result["axes"]):
+        arrays[f"axis{i}_{col}"] = np.asarray(values)
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    return buf.getvalue()
+
+
+def to_json(result):
+    """JSON-friendly view of a run_scenario result (NaN -> None)."""
+    yields = result["yields"].astype(object)
+    yields[np.isnan(result["yields"])] = None
+    return {
+        "axes": [{"name": col, "values": np.asarray(values).tolist()} for col, values in result["axes"]],
+        "shape": list(result["yields"].shape),
+        "yields": yields.tolist(),
+        "elapsed_ms": result["elapsed_ms"],
+    }
+
+
+# ------------- small CLI helper -------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Yield response surface over Rainfall x Nitrogen.")
+    parser.add_argument("--district", default="Kolhapur")
+    parser.add_argument("--crop", default="Maize")
+    parser.add_argument("--season", default="Kharif")
+    parser.add_argument("--month", default="July")
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--out", type=str, help="Write the grid as .npz to this path")
+    args = parser.parse_args()
+
+    base = {
+        "District_Name": args.district, "Crop": args.crop, "Season": args.season, "Month": args.month,
+        "Temperature": 28.0, "Phosphorus": 30, "Potassium": 20, "pH": 7,
+        "Fertilizer": "Urea", "Soil_color": "Black",
+    }
+    result = run_scenario(base, [
+        ("Rainfall", linspace(100, 1500, args.steps)),
+        ("Nitrogen", linspace(0, 200, args.steps)),
+    ])
+    grid = result["yields"]
+    print(f"[scenario] {grid.shape} grid in {result['elapsed_ms']} ms "
+          f"(min={np.nanmin(grid):.2f}, max={np.nanmax(grid):.2f})")
+    if args.out:
+        with open(args.out, "wb") as f:
+            f.write(to_npz_bytes(result))
+        print("[scenario] Saved grid to:", args.out)
@@ -0,0 +1,311 @@
+# serve.py
+"""
+Pre-forking launcher for app.py: one worker per core, read-only state loaded once.
+
+    python serve.py                         # SERVE_WORKERS (default: cpu count) on :8000
+    python serve.py --workers 4 --port 8000 --report-s 60
+
+`uvicorn app:app --workers N` imports app.py in every worker, so each one loads the
+joblib model, parses combined.csv and builds the vocabulary, cube and templates on
+its own. Here the master process does all of that once (preload()), then forks the
+workers; the pages holding the model arrays, dataset rows and indexes stay shared
+copy-on-write between them.
+
+Keeping those pages shared:
+- GC is disabled while preloading and everything is moved to the permanent
+  generation with gc.freeze() right before forking, so a collection in a worker
+  doesn't write to the GC headers of the preloaded objects (and copy their pages).
+  Workers re-enable GC for their own objects.
+- No threads are started before the fork: the batcher and the chat pool start in
+  each worker (app.py startup hook / on first use).
+- The listening socket is bound once in the master and inherited by the workers.
+
+Refcounts still change when a worker reads a preloaded object, so the pages of
+small Python objects that are touched per request (dataset row dicts) become private
+over time; large NumPy buffers (trees, cube, leaf tables) are never written and stay
+shared. The master logs per-worker USS (private memory, what each extra worker
+really costs), PSS and RSS from /proc every --report-s seconds; /stats/memory in a
+worker reports its own.
+
+With --shared-dataset the dataset columns are also moved into shared memory
+(shared_dataset.py) for the launcher's lifetime, so per-row dicts aren't even
+created; the segments are unlinked when the master exits.
+
+The master restarts workers that die. Workers don't run app.py's model watcher
+(MODEL_WATCH=0); the master polls the registry instead, and when CURRENT moves (or on
+SIGHUP) loads the new model once, freezes it and replaces the workers one at a time,
+so they fork with the new model already shared. SIGTERM / SIGINT stop everything.
+"""
+import argparse
+import contextlib
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+HOST = os.environ.get("SERVE_HOST", "0.0.0.0")
+PORT = int(os.environ.get("SERVE_PORT", "8000"))
+WORKERS = int(os.environ.get("SERVE_WORKERS", "0")) or os.cpu_count() or 1
+REPORT_S = float(os.environ.get("SERVE_REPORT_S", "60"))
+WATCH_S = float(os.environ.get("MODEL_WATCH_INTERVAL_S", "5"))
+WARM_QUERY = "wheat yield in Nagpur"
+
+_MEMORY_FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty")
+
+
+def memory_usage(pid=None):
+    """{"uss_mb", "pss_mb", "rss_mb", "shared_mb"} for a process (Linux /proc), or {}."""
+    pid = pid or os.getpid()
+    totals = dict.fromkeys(_MEMORY_FIELDS, 0)
+    # smaps_rollup is one pre-summed block; older kernels only have per-mapping smaps.
+    for name in ("smaps_rollup", "smaps"):
+        try:
+            with open(f"/proc/{pid}/{name}", encoding="ascii", errors="replace") as f:
+                for line in f:
+                    key, _, rest = line.partition(":")
+                    if key in totals:
+                        totals[key] += int(rest.split()[0])  # kB
+            break
+        except (OSError, ValueError, IndexError):
+            continue
+    else:
+        return {}
+    return {
+        "uss_mb": round((totals["Private_Clean"] + totals["Private_Dirty"]) / 1024, 1),
+        "pss_mb": round(totals["Pss"] / 1024, 1),
+        "rss_mb": round(totals["Rss"] / 1024, 1),
+        "shared_mb": round((totals["Shared_Clean"] + totals["Shared_Dirty"]) / 1024, 1),
+    }
+
+
+def preload():
+    """Import app and build every read-only store it would otherwise build per worker."""
+    import threading
+
+    started = time.perf_counter()
+    import app as app_module
+    import dataset_connector
+    import data_loader
+    import ml_connector
+    import templates
+    from entity_vocab import get_vocabulary
+    from voice_assistant import generate_reply
+
+    ml_connector.get_model()
+    dataset_connector.load_dataset()
+    get_vocabulary()
+    data_loader.get_cube()
+    templates.load_generated_templates()
+    try:
+        import explanations
+        explanations.get_explainer()
+    except Exception as e:
+        print(f"[serve] Explainer preload skipped: {e}")
+    # One full reply fills the remaining lazy caches (weather store, interval tables, ...).
+    try:
+        generate_reply("unknown", lang_code="en", user_text=WARM_QUERY)
+    except Exception as e:
+        print(f"[serve] Warm-up reply failed: {e}")
+
+    extra = [t.name for t in threading.enumerate() if t is not threading.main_thread()]
+    if extra:
+        print(f"[serve] Warning: threads running before fork (not inherited by workers): {', '.join(extra)}")
+    print(f"[serve] Preloaded in {time.perf_counter() - started:.2f}s")
+    return app_module.app
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock, log_level):
+    """Child process body; never returns."""
+    import random
+    import uvicorn
+
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, signal.SIG_DFL)
+    gc.enable()
+    random.seed()  # templates are picked with random.choice; don't repeat the master's sequence
+    code = 0
+    try:
+        config = uvicorn.Config(app, lifespan="on", log_level=log_level)
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException as e:
+        print(f"[serve] Worker {os.getpid()} crashed: {e!r}")
+        code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(code)
+
+
+class Master:
+    def __init__(self, app, sock, workers, log_level="info", report_s=REPORT_S):
+        self.app = app
+        self.sock = sock
+        self.n_workers = workers
+        self.log_level = log_level
+        self.report_s = report_s
+        self.workers = set()
+        self.stopping = False
+        self.reload_requested = False
+        self.failed_versions = set()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(self.app, self.sock, self.log_level)
+        self.workers.add(pid)
+        return pid
+
+    def _signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self.reload_requested = True
+        else:
+            self.stopping = True
+
+    def reap(self):
+        """Collect exited workers; returns [(pid, status)]."""
+        gone = []
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid in self.workers:
+                self.workers.discard(pid)
+                gone.append((pid, status))
+        return gone
+
+    def report(self):
+        master = memory_usage(os.getpid())
+        print(f"[serve] master {os.getpid()}: {master}")
+        for pid in sorted(self.workers):
+            print(f"[serve] worker {pid}: {memory_usage(pid)}")
+
+    def reload(self):
+        """Swap in the registry's CURRENT model here, then replace workers one at a time."""
+        import ml_connector
+        import model_registry
+
+        self.reload_requested = False
+        version = model_registry.current_version()
+        if version and version != ml_connector.model_info()["version"]:
+            if not model_registry.activate(version):
+                self.failed_versions.add(version)
+                print("[serve] Reload aborted; workers keep the current model")
+                return
+            gc.collect()
+            gc.freeze()
+        for pid in list(self.workers):
+            if self.stopping:
+                return
+            if pid not in self.workers:
+                continue  # died (and was respawned) during an earlier step
+            new_pid = self.spawn()
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            while pid in self.workers and not self.stopping:
+                # Other workers can die meanwhile; respawn them as run() does.
+                for gone, status in self.reap():
+                    if gone != pid and not self.stopping:
+                        print(f"[serve] Worker {gone} exited (status {status}); restarting")
+                        self.spawn()
+                time.sleep(0.1)
+            print(f"[serve] Replaced worker {pid} with {new_pid}")
+
+    def model_changed(self):
+        """True when the registry's CURRENT is a new version that hasn't failed to load."""
+        import ml_connector
+        import model_registry
+
+        version = model_registry.current_version()
+        return bool(version) and version != ml_connector.model_info()["version"] \
+            and version not in self.failed_versions
+
+    def stop(self, timeout_s=30):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.workers.discard(pid)
+        deadline = time.monotonic() + timeout_s
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGKILL)
+        self.reap()
+
+    def run(self):
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, self._signal)
+        for _ in range(self.n_workers):
+            self.spawn()
+        print(f"[serve] {self.n_workers} workers on {self.sock.getsockname()}")
+        next_report = time.monotonic() + (self.report_s or float("inf"))
+        next_watch = time.monotonic() + WATCH_S
+        try:
+            while not self.stopping:
+                for pid, status in self.reap():
+                    if not self.stopping:
+                        print(f"[serve] Worker {pid} exited (status {status}); restarting")
+                        self.spawn()
+                if time.monotonic() >= next_watch:
+                    try:
+                        self.reload_requested |= self.model_changed()
+                    except Exception as e:
+                        print(f"[serve] Registry check failed: {e}")
+                    next_watch = time.monotonic() + WATCH_S
+                if self.reload_requested:
+                    self.reload()
+                if time.monotonic() >= next_report:
+                    self.report()
+                    next_report = time.monotonic() + self.report_s
+                time.sleep(0.2)
+        finally:
+            self.stopping = True
+            self.stop()
+            self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--report-s", type=float, default=REPORT_S, help="memory report interval (0 = off)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--shared-dataset", action="store_true",
+                        help="keep the dataset columns in shared memory (shared_dataset.py) while serving")
+    args = parser.parse_args(argv)
+    # The master follows the registry; workers must not each load a private copy.
+    os.environ["MODEL_WATCH"] = "0"
+
+    with contextlib.ExitStack() as stack:
+        if args.shared_dataset:
+            import dataset_connector
+            import shared_dataset
+            stack.enter_context(shared_dataset.owned(dataset_connector.DATASET_PATH))
+        # Preloaded objects must never be scanned (= written) by a collection in a worker.
+        gc.disable()
+        app = preload()
+        sock = bind_socket(args.host, args.port)
+        gc.collect()
+        gc.freeze()
+        Master(app, sock, max(1, args.workers), args.log_level, args.report_s).run()
+
+
+if __name__ == "__main__":
+    main()
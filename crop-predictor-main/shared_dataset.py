@@ -0,0 +1,379 @@
+# shared_dataset.py
+"""
+The dataset as columns in POSIX shared memory, attached zero-copy by any process.
+
+    python shared_dataset.py create --data combined.csv       # prints the manifest path
+    export AGRO_SHARED_DATASET=combined.shm.json              # workers / reports attach to it
+    python shared_dataset.py info
+    python shared_dataset.py unlink
+
+Per process, a list of row dicts costs hundreds of bytes per row, and forked workers
+end up copying it page by page as refcounts change. Here every column lives in one of
+two shared segments instead:
+
+- numeric columns (every value round-trips through float) as float64, NaN = empty
+- all other columns as int32 codes into a label list kept in the manifest
+
+The manifest (a small JSON file) records the segment names, shapes, column layout
+and the dataset's size / mtime, so a stale segment is ignored. Segments are plain
+/dev/shm objects: no server, they outlive the creating process, and only unlink()
+(or `shared_dataset.py unlink`) removes them. serve.py --shared-dataset creates one
+for its lifetime (owned()).
+
+dataset_connector.load_dataset(), templates.load_dataset() and template_generator
+return a SharedRows view when AGRO_SHARED_DATASET points at a manifest for the same
+file. It behaves like the list of row dicts (len, index, slice, iterate), building
+each dict on access, and answers equality filters from the codes (indices()).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MANIFEST_ENV = "AGRO_SHARED_DATASET"
+MANIFEST_VERSION = 1
+ITER_CHUNK = 4096
+
+
+def manifest_path(dataset_path):
+    return os.path.splitext(dataset_path)[0] + ".shm.json"
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _format(x):
+    """Inverse of float() for the values kept as numeric ("20", "6.5"); NaN -> ""."""
+    if x != x:
+        return ""
+    if x.is_integer() and abs(x) < 1e15:
+        return str(int(x))
+    return repr(x)
+
+
+def _is_numeric(values):
+    seen = False
+    for v in values:
+        if v == "":
+            continue
+        try:
+            if _format(float(v)) != v:
+                return False
+        except ValueError:
+            return False
+        seen = True
+    return seen
+
+
+# Before 3.13 every SharedMemory is registered with the resource tracker, which unlinks
+# it when *this* process exits -- wrong for segments meant to outlive their creator.
+_HAS_TRACK_PARAM = sys.version_info >= (3, 13)
+
+
+def _open_segment(name, create=False, size=0):
+    """SharedMemory that this process's resource tracker won't unlink at exit."""
+    if _HAS_TRACK_PARAM:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _unlink_segment(shm):
+    if not _HAS_TRACK_PARAM:
+        # unlink() unregisters again; register first so the tracker's books balance.
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+class SharedDataset:
+    """Column arrays backed by shared memory, plus the manifest describing them."""
+
+    def __init__(self, manifest, segments, path=None):
+        self.manifest = manifest
+        self.path = path
+        self._segments = segments
+        self.columns = [c["name"] for c in manifest["columns"]]
+        self.n_rows = manifest["n_rows"]
+        self.numeric = self._view("numeric", np.float64)
+        self.codes = self._view("codes", np.int32)
+        self._layout = {c["name"]: c for c in manifest["columns"]}
+        self._labels = {c["name"]: np.array(c["labels"], dtype=object)
+                        for c in manifest["columns"] if c["kind"] == "categorical"}
+
+    def _view(self, key, dtype):
+        seg = self.manifest["segments"][key]
+        shape = tuple(seg["shape"])
+        if not shape[0] or not shape[1]:
+            return np.zeros(shape, dtype=dtype)
+        arr = np.ndarray(shape, dtype=dtype, buffer=self._segments[key].buf)
+        arr.flags.writeable = False
+        return arr
+
+    # ---------------- lifecycle ----------------
+
+    @classmethod
+    def create(cls, rows, columns=None, dataset_path=None, path=None, name=None):
+        """Copy rows (dicts of strings) into new segments and write the manifest to path."""
+        columns = list(columns or (rows[0].keys() if rows else []))
+        prefix = name or f"agro_{os.getpid()}_{int(time.time() * 1000) % 10**9}"
+        layout, numeric_cols, cat_cols = [], [], []
+        for col in columns:
+            values = [(r.get(col) or "") for r in rows]
+            if _is_numeric(values):
+                layout.append({"name": col, "kind": "numeric", "index": len(numeric_cols)})
+                numeric_cols.append([float(v) if v != "" else np.nan for v in values])
+            else:
+                labels, codes = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+                layout.append({"name": col, "kind": "categorical", "index": len(cat_cols),
+                               "labels": labels.tolist()})
+                cat_cols.append(codes.astype(np.int32))
+
+        blocks = {
+            "numeric": np.array(numeric_cols, dtype=np.float64).reshape(len(numeric_cols), len(rows)),
+            "codes": np.array(cat_cols, dtype=np.int32).reshape(len(cat_cols), len(rows)),
+        }
+        segments, seg_meta = {}, {}
+        try:
+            for key, block in blocks.items():
+                seg_name = f"{prefix}_{key}"
+                shm = _open_segment(seg_name, create=True, size=max(block.nbytes, 1))
+                segments[key] = shm
+                np.ndarray(block.shape, dtype=block.dtype, buffer=shm.buf)[...] = block
+                seg_meta[key] = {"name": seg_name, "shape": list(block.shape), "dtype": block.dtype.str}
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "n_rows": len(rows),
+                "columns": layout,
+                "segments": seg_meta,
+                "dataset": _file_stamp(dataset_path) if dataset_path else None,
+                "created_by": os.getpid(),
+            }
+            if path:
+                tmp = path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, ensure_ascii=False)
+                os.replace(tmp, path)
+        except Exception:
+            for shm in segments.values():
+                shm.close()
+                _unlink_segment(shm)
+            raise
+        return cls(manifest, segments, path)
+
+    @classmethod
+    def attach(cls, path):
+        """Map the segments described by the manifest at path (read-only views)."""
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"{path}: unsupported manifest version {manifest.get('version')}")
+        segments = {}
+        try:
+            for key, seg in manifest["segments"].items():
+                segments[key] = _open_segment(seg["name"])
+        except Exception:
+            for shm in segments.values():
+                shm.close()
+            raise
+        return cls(manifest, segments, path)
+
+    def is_current(self, dataset_path):
+        """True if the segments were built from dataset_path as it is now."""
+        stamp = self.manifest.get("dataset")
+        try:
+            return bool(stamp) and stamp == _file_stamp(dataset_path)
+        except OSError:
+            return False
+
+    def close(self):
+        """Detach this process (views become invalid); the segments stay."""
+        self.numeric = self.codes = None
+        for shm in self._segments.values():
+            try:
+                shm.close()
+            except BufferError:
+                pass  # a SharedRows view still holds the buffer; freed with it
+
+    def unlink(self):
+        """Remove the segments and the manifest (processes attached keep their mapping)."""
+        for shm in self._segments.values():
+            try:
+                _unlink_segment(shm)
+            except FileNotFoundError:
+                pass
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------- access ----------------
+
+    def column_values(self, name, start=0, stop=None):
+        """Values of one column as strings, exactly as in the CSV."""
+        c = self._layout[name]
+        if c["kind"] == "numeric":
+            return [_format(x) for x in self.numeric[c["index"], start:stop].tolist()]
+        return self._labels[name][self.codes[c["index"], start:stop]].tolist()
+
+    def indices(self, **equals):
+        """Row numbers where every column equals the value (case-insensitive, stripped)."""
+        mask = np.ones(self.n_rows, dtype=bool)
+        for name, value in equals.items():
+            c = self._layout.get(name)
+            if c is None:
+                return np.zeros(0, dtype=np.int64)
+            target = str(value if value is not None else "").strip().lower()
+            if c["kind"] == "numeric":
+                mask &= np.array([v.lower() == target for v in self.column_values(name)])
+            else:
+                wanted = [i for i, label in enumerate(self._labels[name]) if label.strip().lower() == target]
+                mask &= np.isin(self.codes[c["index"]], wanted)
+        return np.flatnonzero(mask)
+
+    def rows(self, normalize_keys=False):
+        return SharedRows(self, normalize_keys)
+
+
+class SharedRows:
+    """Read-only list-of-dicts view of a SharedDataset (dicts are built per access)."""
+
+    def __init__(self, dataset, normalize_keys=False):
+        self.dataset = dataset
+        self.normalize_keys = normalize_keys
+        # templates.load_dataset() style: "District_Name" -> "district_name", values stripped
+        self.keys = [c.strip().lower().replace(" ", "_") if normalize_keys else c for c in dataset.columns]
+
+    def __len__(self):
+        return self.dataset.n_rows
+
+    def _chunk(self, start, stop):
+        cols = [self.dataset.column_values(c, start, stop) for c in self.dataset.columns]
+        if self.normalize_keys:
+            cols = [[v.strip() for v in values] for values in cols]
+        return [dict(zip(self.keys, values)) for values in zip(*cols)]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, stop, step)]
+            return self._chunk(start, stop)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("row index out of range")
+        return self._chunk(i, i + 1)[0]
+
+    def __iter__(self):
+        for start in range(0, len(self), ITER_CHUNK):
+            yield from self._chunk(start, start + ITER_CHUNK)
+
+    def indices(self, **equals):
+        """Like SharedDataset.indices(); keys may be given in this view's key style."""
+        names = dict(zip(self.keys, self.dataset.columns))
+        return self.dataset.indices(**{names.get(k, k): v for k, v in equals.items()})
+
+
+# ---------------- process-wide attachment ----------------
+
+_attached = {}
+
+
+def rows_for(dataset_path, normalize_keys=False):
+    """SharedRows for dataset_path if AGRO_SHARED_DATASET points at a current manifest for it, else None."""
+    path = os.environ.get(MANIFEST_ENV)
+    if not path:
+        return None
+    dataset = _attached.get(path)
+    if dataset is None:
+        try:
+            dataset = SharedDataset.attach(path)
+        except Exception as e:
+            print(f"[shm] Could not attach {path}: {e}")
+            return None
+        _attached[path] = dataset
+    if not dataset.is_current(dataset_path):
+        return None
+    return dataset.rows(normalize_keys)
+
+
+def _read_csv(dataset_path):
+    with open(dataset_path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+        return rows, [c for c in (reader.fieldnames or []) if c is not None]
+
+
+def create_for(dataset_path, path=None):
+    """Create segments + manifest for a CSV file. Returns the owning SharedDataset."""
+    rows, columns = _read_csv(dataset_path)
+    return SharedDataset.create(rows, columns, dataset_path=dataset_path, path=path or manifest_path(dataset_path))
+
+
+@contextmanager
+def owned(dataset_path, path=None):
+    """Create the segments, point AGRO_SHARED_DATASET (inherited by child processes) at
+    them for the duration of the block, then unlink them."""
+    dataset = create_for(dataset_path, path)
+    previous = os.environ.get(MANIFEST_ENV)
+    os.environ[MANIFEST_ENV] = dataset.path
+    try:
+        yield dataset
+    finally:
+        if previous is None:
+            os.environ.pop(MANIFEST_ENV, None)
+        else:
+            os.environ[MANIFEST_ENV] = previous
+        _attached.pop(dataset.path, None)
+        dataset.unlink()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared-memory copy of the dataset columns.")
+    parser.add_argument("command", choices=["create", "info", "unlink"])
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "combined.csv"))
+    parser.add_argument("--manifest", help="Manifest path (default: <data>.shm.json or $AGRO_SHARED_DATASET)")
+    args = parser.parse_args(argv)
+    path = args.manifest or os.environ.get(MANIFEST_ENV) or manifest_path(args.data)
+
+    if args.command == "create":
+        if os.path.exists(path):
+            try:
+                SharedDataset.attach(path).unlink()  # replace the previous generation
+            except Exception:
+                pass
+        started = time.perf_counter()
+        dataset = create_for(args.data, path)
+        size = dataset.numeric.nbytes + dataset.codes.nbytes
+        print(f"[shm] {dataset.n_rows} rows, {len(dataset.columns)} columns, {size / 1e6:.1f} MB "
+              f"in {time.perf_counter() - started:.2f}s")
+        print(f"export {MANIFEST_ENV}={os.path.abspath(path)}")
+    elif args.command == "info":
+        dataset = SharedDataset.attach(path)
+        kinds = {c["name"]: c["kind"] for c in dataset.manifest["columns"]}
+        print(json.dumps({"manifest": path, "rows": dataset.n_rows, "current": dataset.is_current(args.data),
+                          "segments": dataset.manifest["segments"], "columns": kinds}, indent=2))
+    else:
+        SharedDataset.attach(path).unlink()
+        print(f"[shm] Removed segments of {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+# sqlite_backend.py
+"""
+Optional SQLite store for the dataset: indexed lookups, append-only ingestion, no
+full load into memory.
+
+    python sqlite_backend.py import --data combined.csv     # -> combined.sqlite
+    python sqlite_backend.py append --rows new_rows.csv     # add rows, no reload
+    python sqlite_backend.py sync --data combined.csv       # import rows appended to the CSV
+    AGRO_DATASET_BACKEND=sqlite python app.py ...
+
+The CSV is streamed into one typed table (numeric columns REAL, the rest TEXT)
+in file order; row_no keeps that order, so "first matching row" means the same as
+before. Numbers come back as canonical strings ("7.0" in the CSV reads as "7").
+Lower-cased, trimmed copies of District_Name, Crop, Season and Month are indexed,
+so (district, crop), district, crop, season and month filters are index lookups.
+The database is in WAL mode: any number of readers keep reading while rows are
+appended. The entity vocabulary and the stats cube follow appends and re-imports:
+they are keyed on SqliteRows.version() and rebuilt on first use after it changes.
+
+With AGRO_DATASET_BACKEND=sqlite, dataset_connector.load_dataset() and
+templates.load_dataset() return a SqliteRows view instead of a list: len / index /
+slice / iterate work as on the list (rows are fetched in chunks), and
+indices() / first() run the filters in SQL. dataset_connector.lookup_dataset()
+(via first_match) and templates.find_best_row() use those. Every thread gets its
+own connection (re-opened after a fork), and the queries are fixed SQL strings,
+so sqlite3's per-connection statement cache keeps them prepared.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+BACKEND = os.environ.get("AGRO_DATASET_BACKEND", "csv")
+DB_PATH = os.environ.get("AGRO_SQLITE_PATH")  # default: next to the CSV, <dataset>.sqlite
+KEY_COLUMNS = {"District_Name": "district_key", "Crop": "crop_key", "Season": "season_key", "Month": "month_key"}
+INDEXES = {
+    "idx_district_crop": ("district_key", "crop_key"),
+    "idx_crop": ("crop_key",),
+    "idx_season": ("season_key",),
+    "idx_month": ("month_key",),
+}
+TYPE_SAMPLE_ROWS = 1000
+INSERT_BATCH = 5000
+FETCH_CHUNK = 4096
+STATEMENT_CACHE = 256
+
+
+def enabled():
+    return BACKEND == "sqlite"
+
+
+def db_path_for(dataset_path):
+    return DB_PATH or os.path.splitext(dataset_path)[0] + ".sqlite"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _key(value):
+    return str(value if value is not None else "").strip().lower()
+
+
+def _text(value):
+    """Stored value -> the string the CSV had (numbers without a needless ".0")."""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _numeric_columns(columns, sample):
+    numeric = []
+    for col in columns:
+        values = [(r.get(col) or "").strip() for r in sample]
+        values = [v for v in values if v]
+        try:
+            if values and all(float(v) == float(v) for v in values):
+                numeric.append(col)
+        except ValueError:
+            pass
+    return numeric
+
+
+# ---------------- connections ----------------
+
+_local = threading.local()
+
+
+def connect(path, readonly=True):
+    """This thread's connection to path (one per thread and process)."""
+    conns = getattr(_local, "conns", None)
+    if conns is None or _local.pid != os.getpid():
+        conns = _local.conns = {}
+        _local.pid = os.getpid()
+    key = (path, readonly)
+    conn = conns.get(key)
+    if conn is None:
+        uri = f"file:{path}?mode=ro" if readonly else f"file:{path}"
+        conn = sqlite3.connect(uri, uri=True, cached_statements=STATEMENT_CACHE)
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conns[key] = conn
+    return conn
+
+
+def _meta(conn):
+    return {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+
+
+# ---------------- ingestion ----------------
+
+def _create(conn, columns, numeric):
+    defs = ["row_no INTEGER PRIMARY KEY"]
+    defs += [f"{_quote(c)} {'REAL' if c in numeric else 'TEXT'}" for c in columns]
+    defs += [f"{k} TEXT" for k in KEY_COLUMNS.values()]
+    conn.execute(f"CREATE TABLE dataset ({', '.join(defs)})")
+    conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+        ("columns", json.dumps(columns)), ("numeric", json.dumps(numeric)), ("rows", "0"), ("csv_rows", "0")])
+    conn.commit()
+
+
+def _insert(conn, columns, rows, from_csv=False):
+    """Append rows (dicts) in one transaction; returns how many were added.
+    from_csv: the rows are the next lines of the source CSV (advances csv_rows too)."""
+    placeholders = ", ".join("?" * (len(columns) + len(KEY_COLUMNS)))
+    names = ", ".join([_quote(c) for c in columns] + list(KEY_COLUMNS.values()))
+    sql = f"INSERT INTO dataset ({names}) VALUES ({placeholders})"
+    added = 0
+    batch = []
+    with conn:
+        for r in rows:
+            values = [(r.get(c) or "").strip() or None for c in columns]
+            batch.append(values + [_key(r.get(c)) for c in KEY_COLUMNS])
+            if len(batch) >= INSERT_BATCH:
+                conn.executemany(sql, batch)
+                added += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(sql, batch)
+            added += len(batch)
+        counters = ("rows", "csv_rows") if from_csv else ("rows",)
+        for key in counters:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                         (key, json.dumps(int(row[0] if row else 0) + added)))
+    return added
+
+
+def import_csv(csv_path, db_path=None):
+    """(Re)build the database from a CSV, streaming it. Returns the row count."""
+    db_path = db_path or db_path_for(csv_path)
+    tmp = f"{db_path}.{os.getpid()}.tmp"
+    for leftover in (tmp, tmp + "-wal", tmp + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        columns = [c for c in (reader.fieldnames or []) if c is not None]
+        sample = []
+        for r in reader:
+            sample.append(r)
+            if len(sample) >= TYPE_SAMPLE_ROWS:
+                break
+        conn = sqlite3.connect(tmp)
+        try:
+            conn.execute("PRAGMA synchronous = OFF")  # a private temp file until the rename
+            _create(conn, columns, _numeric_columns(columns, sample))
+            n = _insert(conn, columns, sample, from_csv=True) + _insert(conn, columns, reader, from_csv=True)
+            with conn:
+                for name, cols in INDEXES.items():
+                    conn.execute(f"CREATE INDEX {name} ON dataset ({', '.join(cols)})")
+                conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                    ("source", json.dumps(os.path.abspath(csv_path))),
+                    # A re-import of an edited CSV can keep the row count; this tells them apart.
+                    ("import_id", json.dumps(_file_sha1(csv_path)[:12])),
+                ])
+        finally:
+            conn.close()
+    os.replace(tmp, db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")  # persistent: readers never block on appends
+    finally:
+        conn.close()
+    return n
+
+
+def append_rows(rows, db_path):
+    """Append rows (dicts keyed like the CSV header) without touching existing ones."""
+    conn = connect(db_path, readonly=False)
+    return _insert(conn, _meta(conn)["columns"], rows)
+
+
+def sync_csv(csv_path, db_path=None):
+    """Append the rows the CSV gained since the last import / sync (append-only CSVs)."""
+    db_path = db_path or db_path_for(csv_path)
+    if not os.path.exists(db_path):
+        return import_csv(csv_path, db_path)
+    conn = connect(db_path, readonly=False)
+    meta = _meta(conn)
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if [c for c in (reader.fieldnames or []) if c is not None] != meta["columns"]:
+            raise ValueError(f"{csv_path} header differs from {db_path}; re-import instead")
+        # Only lines already taken from the CSV are skipped; `append` rows aren't in it.
+        for _ in range(meta.get("csv_rows", meta["rows"])):
+            if next(reader, None) is None:
+                raise ValueError(f"{csv_path} has fewer rows than {db_path}; re-import instead")
+        return _insert(conn, meta["columns"], reader, from_csv=True)
+
+
+# ---------------- reads ----------------
+
+class SqliteRows:
+    """List-of-dicts view of the dataset table; filters run as indexed queries."""
+
+    def __init__(self, path, normalize_keys=False):
+        self.path = path
+        self.normalize_keys = normalize_keys
+        meta = _meta(connect(path))
+        self.columns = meta["columns"]
+        # templates.load_dataset() style: "District_Name" -> "district_name", values stripped
+        self.keys = [c.strip().lower().replace(" ", "_") if normalize_keys else c for c in self.columns]
+        self._by_key = dict(zip(self.keys, self.columns))
+        self._select = f"SELECT {', '.join(_quote(c) for c in self.columns)} FROM dataset"
+
+    def _conn(self):
+        return connect(self.path)
+
+    def _dict(self, values):
+        return dict(zip(self.keys, (_text(v) for v in values)))
+
+    def __len__(self):
+        # The maintained counter; COUNT(*) would scan the whole table on every call.
+        return json.loads(self._conn().execute("SELECT value FROM meta WHERE key = 'rows'").fetchone()[0])
+
+    def version(self):
+        """Changes with every import and append ("sqlite:<import id>:<rows>:<last row_no>");
+        all O(1) reads. The vocabulary and the stats cube are keyed on it instead of the CSV's sha1."""
+        conn = self._conn()
+        meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('import_id', 'rows')"))
+        last = conn.execute("SELECT MAX(row_no) FROM dataset").fetchone()[0] or 0
+        import_id = json.loads(meta["import_id"]) if "import_id" in meta else ""
+        return f"sqlite:{import_id}:{json.loads(meta['rows'])}:{last}"
+
+    def __bool__(self):
+        return self._conn().execute("SELECT 1 FROM dataset LIMIT 1").fetchone() is not None
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            cur = self._conn().execute(f"{self._select} WHERE row_no > ? AND row_no <= ? ORDER BY row_no",
+                                       (start, stop))
+            rows = [self._dict(v) for v in cur]
+            return rows[::step] if step != 1 else rows
+        if i < 0:
+            i += len(self)
+        row = self._conn().execute(f"{self._select} WHERE row_no = ?", (i + 1,)).fetchone()
+        if row is None:
+            raise IndexError("row index out of range")
+        return self._dict(row)
+
+    def __iter__(self):
+        cur = self._conn().execute(f"{self._select} ORDER BY row_no")
+        while True:
+            chunk = cur.fetchmany(FETCH_CHUNK)
+            if not chunk:
+                return
+            for values in chunk:
+                yield self._dict(values)
+
+    def _where(self, equals):
+        clauses, params = [], []
+        for name, value in sorted(equals.items()):
+            col = self._by_key.get(name, name)
+            if col in KEY_COLUMNS:
+                clauses.append(f"{KEY_COLUMNS[col]} = ?")
+            elif col in self.columns:
+                clauses.append(f"lower(trim({_quote(col)})) = ?")
+            else:
+                clauses.append("0")
+            params.append(_key(value))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def indices(self, **equals):
+        """Positions (file order) of the rows where every column equals the value (case-insensitive)."""
+        where, params = self._where(equals)
+        return [r[0] - 1 for r in self._conn().execute(f"SELECT row_no FROM dataset{where} ORDER BY row_no", params)]
+
+    def first(self, **equals):
+        """First matching row, or None."""
+        where, params = self._where(equals)
+        row = self._conn().execute(f"{self._select}{where} ORDER BY row_no LIMIT 1", params).fetchone()
+        return self._dict(row) if row is not None else None
+
+
+_warned = set()
+
+
+def rows_for(dataset_path, normalize_keys=False):
+    """SqliteRows for dataset_path when the sqlite backend is on and its database exists, else None."""
+    if not enabled():
+        return None
+    path = db_path_for(dataset_path)
+    if not os.path.exists(path):
+        if path not in _warned:
+            _warned.add(path)
+            print(f"[sqlite] {path} not found; run `python sqlite_backend.py import` (using the CSV for now)")
+        return None
+    return SqliteRows(path, normalize_keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite dataset backend.")
+    parser.add_argument("command", choices=["import", "append", "sync", "info"])
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "combined.csv"))
+    parser.add_argument("--db", help="Database path (default: <data>.sqlite or $AGRO_SQLITE_PATH)")
+    parser.add_argument("--rows", help="CSV with new rows (append)")
+    args = parser.parse_args(argv)
+    db_path = args.db or db_path_for(args.data)
+
+    started = time.perf_counter()
+    if args.command == "import":
+        n = import_csv(args.data, db_path)
+        print(f"[sqlite] Imported {n} rows into {db_path} in {time.perf_counter() - started:.1f}s")
+    elif args.command == "append":
+        if not args.rows:
+            parser.error("append needs --rows")
+        with open(args.rows, encoding="utf-8", newline="") as f:
+            n = append_rows(csv.DictReader(f), db_path)
+        print(f"[sqlite] Appended {n} rows to {db_path}")
+    elif args.command == "sync":
+        n = sync_csv(args.data, db_path)
+        print(f"[sqlite] Added {n} new rows from {args.data} to {db_path}")
+    else:
+        conn = connect(db_path)
+        meta = _meta(conn)
+        meta["table_rows"] = conn.execute("SELECT COUNT(*) FROM dataset").fetchone()[0]
+        meta["indexes"] = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+        print(json.dumps(meta, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -113,23 +113,90 @@ const AgriculturalChatBot = ({ onStartPrediction }: AgriculturalChatBotProps) =>
     setMessages(prev => [...prev, newMessage]);
   };
 
+  const updateBotMessage = (id: string, text: string) => {
+    setMessages(prev => prev.map(m => (m.id === id ? { ...m, text } : m)));
+  };
+
+// Streams advisory sections from /chat/stream (Server-Sent Events) so the first
+// paragraph shows up before the ML yield is ready. Falls back to /chat only if
+// nothing was shown yet; a stream that breaks midway keeps its partial reply.
 const simulateBotResponse = async (userMessage: string) => {
   setIsTyping(true);
 
+  const botId = Date.now().toString();
+  const sections: string[] = [];
+  let started = false;
+
   try {
-    const response = await fetch("http://localhost:8000/chat", {
+    const response = await fetch("http://localhost:8000/chat/stream", {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
       body: JSON.stringify({ message: userMessage, lang: "en" }),
     });
+    if (!response.ok || !response.body) {
+      throw new Error(`stream unavailable (${response.status})`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf("\n\n");
+      while (boundary !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf("\n\n");
 
-    const data = await response.json();
-    const botReply = data.reply || "Sorry, I couldn't process your query.";
-    addBotMessage(botReply);
+        const event = block.match(/^event: (.*)$/m)?.[1];
+        const data = block.match(/^data: (.*)$/m)?.[1];
+        if (!event || !data) continue;
 
-  } catch (error) {
-    console.error("API error:", error);
-    addBotMessage("⚠️ Backend is not reachable. Please try again later.");
+        const payload = JSON.parse(data);
+        if (event === "section" || event === "error") {
+          sections.push(payload.text ?? payload.message);
+          if (!started) {
+            started = true;
+            setIsTyping(false);
+            setMessages(prev => [...prev, { id: botId, text: sections.join("\n"), isBot: true, timestamp: new Date() }]);
+          } else {
+            updateBotMessage(botId, sections.join("\n"));
+          }
+        }
+      }
+    }
+
+    if (!started) {
+      addBotMessage("Sorry, I couldn't process your query.");
+    }
+  } catch (streamError) {
+    if (started) {
+      console.warn("Streaming failed after the first section:", streamError);
+      sections.push("⚠️ The rest of this reply could not be loaded. Please try again.");
+      updateBotMessage(botId, sections.join("\n"));
+      setIsTyping(false);
+      return;
+    }
+    console.warn("Streaming failed, falling back to /chat:", streamError);
+    try {
+      const response = await fetch("http://localhost:8000/chat", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message: userMessage, lang: "en" }),
+      });
+
+      const data = await response.json();
+      const botReply = data.reply || "Sorry, I couldn't process your query.";
+      addBotMessage(botReply);
+
+    } catch (error) {
+      console.error("API error:", error);
+      addBotMessage("⚠️ Backend is not reachable. Please try again later.");
+    }
   }
 
   setIsTyping(false);
@@ -3,12 +3,13 @@
 import csv
 import random
 import os
-from google.cloud import translate_v2 as translate
-from templates import get_prescriptive_advice
+import localization
+from translation_cache import Translator
 # ------------------ CONFIG ------------------
 INPUT_FILE = "combined.csv"              # dataset
 OUTPUT_FILE = "generated_templates.csv"  # generated file
 NUM_VARIATIONS = 10                      # variations per row per intent
+TRANSLATE_LANGS = ["hi", "mr"]           # backend: TRANSLATION_BACKEND (see translation_cache.py)
 
 
 
@@ -77,51 +78,85 @@ SKELETONS = {
 
 
 
+def translate_skeletons(translator, langs=TRANSLATE_LANGS):
+    """
+    {lang: {english skeleton: translated skeleton}}.
+    Skeletons are translated (not the filled rows), so every distinct sentence goes to
+    the backend once per language however many rows use it; the cache makes reruns
+    only translate skeletons that are new.
+    """
+    sources = list(dict.fromkeys(s for skeletons in SKELETONS.values() for s in skeletons))
+    sources.append("farm ponds")  # {storage} value
+    out = {}
+    for lang in langs:
+        out[lang] = {src: text for src, text in zip(sources, translator.translate_all(sources, lang)) if text}
+    return out
+
+
+def _localize_values(values, lang, translated):
+    """Fill values for a translated skeleton: names from localization.py, storage from the cache."""
+    local = localization.localize_row(values, lang)
+    for key in ("crop_a", "crop_b", "crop_c"):
+        local[key] = localization.localize_value("crop", values[key], lang)
+    local["alt_crops"] = ", ".join(
+        localization.localize_value("crop", c.strip(), lang) for c in str(values["alt_crops"]).split(","))
+    local["storage"] = translated.get(values["storage"], values["storage"])
+    return local
+
+
 def generate_templates():
     templates = []
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    import shared_dataset
+    rows = shared_dataset.rows_for(INPUT_FILE)
+    if rows is None:
+        with open(INPUT_FILE, "r", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+
+    translator = Translator()
+    translated = translate_skeletons(translator)
+    missing = {lang: sum(1 for ss in SKELETONS.values() for s in ss if s not in t) for lang, t in translated.items()}
+    print(f"[translate] {translator.backend.name}: {translator.stats} | untranslated skeletons: {missing}")
 
     for row in rows:
+        values = {
+            "district": row.get("District_Name", "Unknown"),
+            "crop": row.get("Crop", "Unknown"),
+            "soil": row.get("Soil_color", row.get("Soil_Color", "N/A")),
+            "fertilizer": row.get("Fertilizer", "N/A"),
+            "rainfall": row.get("Rainfall", "N/A"),
+            "season": row.get("Season", "Unknown"),
+            "yield": row.get("Yield", "N/A"),
+            "confidence": row.get("Confidence", "75%"),
+            "temperature": row.get("Temperature", "25"),
+            "nitrogen": row.get("Nitrogen", "N"),
+            "phosphorus": row.get("Phosphorus", "P"),
+            "potassium": row.get("Potassium", "K"),
+            "ph": row.get("pH", "7"),
+            "month": row.get("Month", "Unknown"),
+            "Month": row.get("Month", "Unknown"),
+            "alt_crops": row.get("Alternative_Crops", "Pulses, Vegetables"),
+            "water_units": 100,
+            "crop_a": "Wheat", "a_units": 60,
+            "crop_b": "Pulses", "b_units": 30,
+            "crop_c": "Vegetables", "c_units": 10,
+            "storage": "farm ponds",
+        }
+        local_values = {lang: _localize_values(values, lang, translated[lang]) for lang in TRANSLATE_LANGS}
+
         for intent, skeletons in SKELETONS.items():
             for _ in range(NUM_VARIATIONS):
                 skeleton = random.choice(skeletons)
                 try:
-                    text_en = skeleton.format(
-                        district=row.get("District_Name", "Unknown"),
-                        crop=row.get("Crop", "Unknown"),
-                        soil=row.get("Soil_Color", "N/A"),
-                        fertilizer=row.get("Fertilizer", "N/A"),
-                        rainfall=row.get("Rainfall", "N/A"),
-                        season=row.get("Season", "Unknown"),
-                        Yield=row.get("Yield", "N/A"),
-                        confidence=row.get("Confidence", "75%"),
-                        temperature=row.get("Temperature", "25"),
-                        nitrogen=row.get("Nitrogen", "N"),
-                        phosphorus=row.get("Phosphorus", "P"),
-                        potassium=row.get("Potassium", "K"),
-                        ph=row.get("pH", "7"),
-                        month=row.get("Month", "Unknown"),
-                        alt_crops=row.get("Alternative_Crops", "Pulses, Vegetables"),
-                        water_units=100,
-                        crop_a="Wheat", a_units=60,
-                        crop_b="Pulses", b_units=30,
-                        crop_c="Vegetables", c_units=10,
-                        storage="farm ponds"
-                        
-                    )
-
                     # Save English
-                    templates.append({"intent": intent, "lang": "en", "template": text_en})
-
-                    # # Translate to Hindi
-                    # text_hi = translate_text(text_en, "hi")
-                    # templates.append({"intent": intent, "lang": "hi", "template": text_hi})
-
-                    # # Translate to Marathi
-                    # text_mr = translate_text(text_en, "mr")
-                    # templates.append({"intent": intent, "lang": "mr", "template": text_mr})
+                    templates.append({"intent": intent, "lang": "en", "template": skeleton.format(**values)})
+
+                    # Hindi / Marathi from the translated skeleton (skipped if it has no translation)
+                    for lang in TRANSLATE_LANGS:
+                        skeleton_local = translated[lang].get(skeleton)
+                        if skeleton_local:
+                            templates.append({"intent": intent, "lang": lang,
+                                              "template": skeleton_local.format(**local_values[lang])})
 
                 except Exception as e:
                     print("[ERROR]", e)
@@ -2,12 +2,37 @@ import csv
 import random
 import os
 import datetime # <- FIX: datetime is now imported here
-from ml_connector import predict_yield
+import localization
 GENERATED_TEMPLATES_FILE = "generated_templates.csv"
 _templates_cache = None
 # templates.py - Add this function after the imports
 
-def get_prescriptive_advice(row, intent, lang):
+# Intent-specific strategy advice (get_intent_advice). hi / mr live in localization.INTENT_PHRASES.
+INTENT_PHRASES = {
+    "water_high_rain": (
+        "For {district}, where rainfall ({rainfall} mm) is high, "
+        "**rainwater preservation is critical**. We strongly recommend **investing in check dams or farm ponds** "
+        "and using **drip irrigation** to save water for the dry season. For water division, "
+        "schedule your highest-water-use crop first, then allocate the remaining 50% to your less thirsty crops."
+    ),
+    "water_low_rain": (
+        "In {district}, with low rainfall ({rainfall} mm), securing water supply is paramount. "
+        "**Immediate investment in borewells or community wells is advised**. "
+        "Focus on **micro-irrigation techniques (drip/sprinkler)** to ensure every drop counts for {crop}."
+    ),
+    "water_default": "In {district}, maintain soil moisture. Consider mulching and bunding for water retention, especially during {month}.",
+    "short_cycle": (
+        "**ATTENTION, {district} Farmers:** Heavy rainfall ({rainfall} mm) in {month} risks crop loss for {crop} (long cycle). "
+        "**A strategic shift is recommended.** Instead, grow a **short-cycle crop** like **{alternate_crop}** (70-90 days) to harvest before the heaviest monsoon peak or a dry spell."
+    ),
+    "rabi_drought": (
+        "In {district}, the Rabi season (starting {month}) shows low rainfall ({rainfall} mm). "
+        "We advise cultivating **drought-resistant crops** such as **Mustard or Chickpeas** instead of water-intensive alternatives to maximize returns."
+    ),
+}
+
+
+def get_intent_advice(row, intent, lang):
     """
     Returns advanced, conditional advice based on district, rainfall, and month.
     If no specific advice, returns None.
@@ -16,28 +41,20 @@ def get_prescriptive_advice(row, intent, lang):
     rainfall_mm = float(row.get("rainfall", 0))
     month = row.get("month", "Unknown")
     current_crop = row.get("crop", "Unknown")
-    
-    advice = None
-    
+
+    key = None
+    alternate_crop = None
+
     # --- 1. Water Management / Conservation Advice ---
     if intent == "water_mgmnt":
         if district.lower() in ["kolhapur", "satara"] and rainfall_mm > 500:
             # High Rainfall Area (Preservation and Wise Use)
-            advice = (
-                f"For {district}, where rainfall ({rainfall_mm} mm) is high, "
-                f"**rainwater preservation is critical**. We strongly recommend **investing in check dams or farm ponds** "
-                f"and using **drip irrigation** to save water for the dry season. For water division, "
-                f"schedule your highest-water-use crop first, then allocate the remaining 50% to your less thirsty crops."
-            )
+            key = "water_high_rain"
         elif district.lower() in ["jodhpur"]:
             # Low Rainfall Area (Infrastructure Investment)
-            advice = (
-                f"In {district}, with low rainfall ({rainfall_mm} mm), securing water supply is paramount. "
-                f"**Immediate investment in borewells or community wells is advised**. "
-                f"Focus on **micro-irrigation techniques (drip/sprinkler)** to ensure every drop counts for {current_crop}."
-            )
+            key = "water_low_rain"
         else:
-            advice = f"In {district}, maintain soil moisture. Consider mulching and bunding for water retention, especially during {month}."
+            key = "water_default"
 
     # --- 2. Crop Suitability / Short-Cycle Advice ---
     elif intent == "suitability" or (intent == "sowing" and rainfall_mm > 400 and month.lower() == "july"):
@@ -45,24 +62,23 @@ def get_prescriptive_advice(row, intent, lang):
         alternate_crop = "Pulses" if current_crop in ["Bajra", "Jowar"] else "Short-cycle Vegetables"
 
         if rainfall_mm > 400 and month.lower() in ["july", "june"]:
-            advice = (
-                f"**ATTENTION, {district} Farmers:** Heavy rainfall ({rainfall_mm} mm) in {month} risks crop loss for {current_crop} (long cycle). "
-                f"**A strategic shift is recommended.** Instead, grow a **short-cycle crop** like **{alternate_crop}** (70-90 days) to harvest before the heaviest monsoon peak or a dry spell."
-            )
+            key = "short_cycle"
         elif rainfall_mm < 150 and month.lower() in ["october", "november"]:
             # Strategic advice for Rabi (low water)
-            advice = (
-                f"In {district}, the Rabi season (starting {month}) shows low rainfall ({rainfall_mm} mm). "
-                f"We advise cultivating **drought-resistant crops** such as **Mustard or Chickpeas** instead of water-intensive alternatives to maximize returns."
-            )
-    
-    # Translate if necessary
-    if advice and lang != "en":
-        # Note: You would call your Google Translate API here (translate_text function)
-        # For simplicity, we return English text in the code structure
-        return f"[{lang.upper()} TRANSLATION PENDING] {advice}"
-    
-    return advice
+            key = "rabi_drought"
+
+    if key is None:
+        return None
+
+    # Offline phrase tables; names are localized from the same table as the rest of the reply.
+    phrases = localization.INTENT_PHRASES.get(lang, INTENT_PHRASES)
+    return phrases[key].format(
+        district=localization.localize_value("district", district, lang),
+        crop=localization.localize_value("crop", current_crop, lang),
+        month=localization.localize_value("month", month, lang),
+        rainfall=rainfall_mm,
+        alternate_crop=localization.localize_value("crop", alternate_crop, lang),
+    )
 TEMPLATES = {
     "irrigation": {
         "en": [
@@ -441,110 +457,270 @@ SKELETONS = {
 }
 
 
-def get_prescriptive_advice(district, crop, month, season, rainfall, temperature, soil,
-                            fertilizer, nitrogen, phosphorus, potassium, ph, predicted_yield):
-    """
-    Dynamically generate prescriptive advice.
-    Fully conditional: rainfall, month, nutrients, district.
-    """
-
-    advice_parts = []
+# Order the advisory sections are emitted in. "yield" is the only one that needs
+# the ML model, so streaming callers send it last (see iter_advice_sections).
+ADVICE_SECTIONS = ["rainfall", "month", "water_allocation", "fertilizer", "pest", "yield", "storage"]
 
+# Advisory rules as data: each section picks a "band" from the inputs, then formats
+# the band's phrase. iter_advice_sections (one query) and advice_sections_batch
+# (bulk reports) share these tables so both produce identical text.
+ADVICE_PHRASES = {
     # 🌧 Rainfall Logic
+    "rainfall": {
+        "very_high": "In {district}, very high rainfall ({rainfall} mm). Prefer water-loving crops (Rice, Sugarcane). "
+                     "Store excess water in ponds/check-dams.",
+        "high": "In {district}, rainfall is high ({rainfall} mm). Ensure drainage for {crop} and grow Soybean or Rice.",
+        "low": "In {district}, rainfall is very low ({rainfall} mm). Grow drought crops like Bajra, Jowar, Pulses. "
+               "Avoid water-intensive crops.",
+        "moderate": "In {district}, rainfall is moderate ({rainfall} mm). Balanced crops like Wheat, Maize, Soybean are ideal.",
+    },
+    # 📅 Month Logic
+    "month": {
+        "pre_monsoon": "Since it is {month} (pre-monsoon), avoid long-duration crops. "
+                       "Use short-term crops like Okra, Spinach, Green Gram until monsoon arrives.",
+        "monsoon": "As it is {month} (monsoon), sow Kharif crops like {crop}, Soybean, Maize now.",
+        "rabi": "In {month}, start Rabi crops like Wheat, Gram, Mustard.",
+        "other": "In {month}, consult local agri-office for crop guidance.",
+    },
+    # 💧 Water Allocation (dynamic)
+    "water_allocation": "Efficient irrigation: Divide {total_water} units water as → {allocation}. "
+                        "This ensures multiple crops without wastage.",
+    # 🌱 Fertilizer (nutrient-driven)
+    "fertilizer": "Soil={soil}, pH={ph}. Fertilizer advice: {fert_advice}.",
+    "fertilizer_items": {
+        "n": "Add Urea (N source)",
+        "p": "Apply SSP (P source)",
+        "k": "Apply MOP (K source)",
+        "balanced": "Maintain balanced dose of {fertilizer}",
+    },
+    # 🐛 Pest (climate-driven)
+    "pest": {
+        "fungal": "High humidity + heat → fungal risk. Use Trichoderma seed treatment in {district}.",
+        "stem_borer": "In {district}, hot weather → risk of stem borer in {crop}. Spray neem-based extract.",
+        "monitor": "Monitor {crop} in {district} weekly for pest signs; use pheromone traps.",
+    },
+    # 📊 Yield
+    "yield": "With given inputs, predicted yield for {crop} in {district} is {predicted_yield} quintals/acre.",
+    # Main driver of the prediction (see explanations.reason_text)
+    "yield_reason": {
+        "down": "{factor} reduced the predicted yield by {amount} quintals/acre.",
+        "up": "{factor} raised the predicted yield by {amount} quintals/acre.",
+        "low": "Low {feature} ({value})",
+        "high": "High {feature} ({value})",
+        "value": "{feature} = {value}",
+        "features": {},
+    },
+    # 🛑 Storage
+    "storage": {
+        "harvesting": "Extra: Invest in rainwater harvesting (farm ponds, check-dams).",
+        "borewell": "Extra: Use borewells & drip irrigation to conserve water.",
+        "wells": "Extra: Maintain wells & tanks to ensure year-round water.",
+    },
+}
+
+TOTAL_WATER_UNITS = 100
+# {crop} is the farmer's own crop; the rest are fixed companions per rainfall band.
+WATER_ALLOCATIONS = {
+    "high": [(None, 70), ("Pulses", 20), ("Vegetables", 10)],
+    "low": [(None, 40), ("Bajra", 40), ("Pulses", 20)],
+    "moderate": [(None, 50), ("Maize", 30), ("Vegetables", 20)],
+}
+PRE_MONSOON_MONTHS = ("april", "may", "june")
+MONSOON_MONTHS = ("july", "august", "september")
+RABI_MONTHS = ("october", "november", "december")
+HARVESTING_DISTRICTS = ("kolhapur", "satara")
+BOREWELL_DISTRICTS = ("jodhpur",)
+
+
+def rainfall_band(rainfall):
     if rainfall > 1000:
-        advice_parts.append(
-            f"In {district}, very high rainfall ({rainfall} mm). Prefer water-loving crops (Rice, Sugarcane). "
-            "Store excess water in ponds/check-dams."
-        )
-    elif rainfall > 800:
-        advice_parts.append(
-            f"In {district}, rainfall is high ({rainfall} mm). Ensure drainage for {crop} and grow Soybean or Rice."
-        )
-    elif rainfall < 300:
-        advice_parts.append(
-            f"In {district}, rainfall is very low ({rainfall} mm). Grow drought crops like Bajra, Jowar, Pulses. "
-            "Avoid water-intensive crops."
-        )
-    else:
-        advice_parts.append(
-            f"In {district}, rainfall is moderate ({rainfall} mm). Balanced crops like Wheat, Maize, Soybean are ideal."
-        )
+        return "very_high"
+    if rainfall > 800:
+        return "high"
+    if rainfall < 300:
+        return "low"
+    return "moderate"
 
-    # 📅 Month Logic
-    if month.lower() in ["april", "may", "june"]:
-        advice_parts.append(
-            f"Since it is {month} (pre-monsoon), avoid long-duration crops. "
-            "Use short-term crops like Okra, Spinach, Green Gram until monsoon arrives."
-        )
-    elif month.lower() in ["july", "august", "september"]:
-        advice_parts.append(
-            f"As it is {month} (monsoon), sow Kharif crops like {crop}, Soybean, Maize now."
-        )
-    elif month.lower() in ["october", "november", "december"]:
-        advice_parts.append(
-            f"In {month}, start Rabi crops like Wheat, Gram, Mustard."
-        )
-    else:
-        advice_parts.append(f"In {month}, consult local agri-office for crop guidance.")
 
-    # 💧 Water Allocation (dynamic)
-    total_water = 100
+def water_band(rainfall):
     if rainfall > 800:
-        allocation = {crop: 70, "Pulses": 20, "Vegetables": 10}
-    elif rainfall < 300:
-        allocation = {crop: 40, "Bajra": 40, "Pulses": 20}
-    else:
-        allocation = {crop: 50, "Maize": 30, "Vegetables": 20}
-
-    alloc_str = ", ".join([f"{k}={v}" for k, v in allocation.items()])
-    advice_parts.append(
-        f"Efficient irrigation: Divide {total_water} units water as → {alloc_str}. "
-        "This ensures multiple crops without wastage."
-    )
+        return "high"
+    if rainfall < 300:
+        return "low"
+    return "moderate"
 
-    # 🌱 Fertilizer (nutrient-driven)
-    fert_advice = []
-    if int(nitrogen) < 40:
-        fert_advice.append("Add Urea (N source)")
-    if int(phosphorus) < 20:
-        fert_advice.append("Apply SSP (P source)")
-    if int(potassium) < 20:
-        fert_advice.append("Apply MOP (K source)")
-    if not fert_advice:
-        fert_advice.append(f"Maintain balanced dose of {fertilizer}")
-
-    advice_parts.append(
-        f"Soil={soil}, pH={ph}. Fertilizer advice: {', '.join(fert_advice)}."
-    )
 
-    # 🐛 Pest (climate-driven)
+def month_band(month):
+    m = month.lower()
+    if m in PRE_MONSOON_MONTHS:
+        return "pre_monsoon"
+    if m in MONSOON_MONTHS:
+        return "monsoon"
+    if m in RABI_MONTHS:
+        return "rabi"
+    return "other"
+
+
+def pest_band(temperature, rainfall):
     if temperature > 32 and rainfall > 800:
-        advice_parts.append(
-            f"High humidity + heat → fungal risk. Use Trichoderma seed treatment in {district}."
-        )
-    elif temperature > 35:
-        advice_parts.append(
-            f"In {district}, hot weather → risk of stem borer in {crop}. Spray neem-based extract."
-        )
-    else:
-        advice_parts.append(
-            f"Monitor {crop} in {district} weekly for pest signs; use pheromone traps."
-        )
+        return "fungal"
+    if temperature > 35:
+        return "stem_borer"
+    return "monitor"
 
-    # 📊 Yield
-    advice_parts.append(
-        f"With given inputs, predicted yield for {crop} in {district} is {predicted_yield} quintals/acre."
+
+def storage_band(district):
+    d = district.lower()
+    if d in HARVESTING_DISTRICTS:
+        return "harvesting"
+    if d in BOREWELL_DISTRICTS:
+        return "borewell"
+    return "wells"
+
+
+def fertilizer_flags(nitrogen, phosphorus, potassium):
+    """Which nutrient top-ups apply: subset of ("n", "p", "k"), or ("balanced",)."""
+    flags = tuple(flag for flag, value, limit in (("n", nitrogen, 40), ("p", phosphorus, 20), ("k", potassium, 20))
+                  if int(value) < limit)
+    return flags or ("balanced",)
+
+
+def advice_phrases(lang="en"):
+    """ADVICE_PHRASES in lang (offline hi / mr tables from localization.py), English otherwise."""
+    return localization.ADVICE_PHRASES.get(lang, ADVICE_PHRASES)
+
+
+def _allocation_text(band, crop, lang="en"):
+    # dict so a crop that is also a companion (e.g. Bajra) is listed once
+    allocation = {}
+    for name, units in WATER_ALLOCATIONS[band]:
+        allocation[name or crop] = units
+    return ", ".join(f"{localization.localize_value('crop', k, lang)}={v}" for k, v in allocation.items())
+
+
+def _fertilizer_text(flags, fertilizer, lang="en"):
+    items = advice_phrases(lang)["fertilizer_items"]
+    return ", ".join(items[f].format(fertilizer=fertilizer) for f in flags)
+
+
+def _render_sections(district, crop, month, rainfall, soil, fertilizer, ph,
+                     rain_band, month_b, water_b, fert_flags, pest_b, storage_b, lang="en", names=None):
+    """names: already-localized {district, crop, month, soil, fertilizer} (batch callers)."""
+    p = advice_phrases(lang)
+    if names is None:
+        names = {
+            "district": localization.localize_value("district", district, lang),
+            "crop": localization.localize_value("crop", crop, lang),
+            "month": localization.localize_value("month", month, lang),
+            "soil": localization.localize_value("soil", soil, lang),
+            "fertilizer": localization.localize_value("fertilizer", fertilizer, lang),
+        }
+    fill = {"district": names["district"], "crop": names["crop"], "month": names["month"], "rainfall": rainfall}
+    yield "rainfall", p["rainfall"][rain_band].format(**fill)
+    yield "month", p["month"][month_b].format(**fill)
+    yield "water_allocation", p["water_allocation"].format(
+        total_water=TOTAL_WATER_UNITS, allocation=_allocation_text(water_b, crop, lang))
+    yield "fertilizer", p["fertilizer"].format(
+        soil=names["soil"], ph=ph, fert_advice=_fertilizer_text(fert_flags, names["fertilizer"], lang))
+    yield "pest", p["pest"][pest_b].format(**fill)
+    yield "storage", p["storage"][storage_b]
+
+
+def iter_advice_sections(district, crop, month, rainfall, temperature, soil,
+                         fertilizer, nitrogen, phosphorus, potassium, ph, lang="en"):
+    """
+    Yield (section, text) for every rule-based advisory section, one at a time.
+    Does not need the predicted yield, so it can run while the model is still busy.
+    """
+    return _render_sections(
+        district, crop, month, rainfall, soil, fertilizer, ph,
+        rain_band=rainfall_band(rainfall),
+        month_b=month_band(month),
+        water_b=water_band(rainfall),
+        fert_flags=fertilizer_flags(nitrogen, phosphorus, potassium),
+        pest_b=pest_band(temperature, rainfall),
+        storage_b=storage_band(district),
+        lang=lang,
     )
 
-    # 🛑 Storage
-    if district.lower() in ["kolhapur", "satara"]:
-        advice_parts.append("Extra: Invest in rainwater harvesting (farm ponds, check-dams).")
-    elif district.lower() == "jodhpur":
-        advice_parts.append("Extra: Use borewells & drip irrigation to conserve water.")
-    else:
-        advice_parts.append("Extra: Maintain wells & tanks to ensure year-round water.")
 
-    return "\n".join(advice_parts)
+def yield_advice(district, crop, predicted_yield, lang="en", reason=""):
+    """📊 Yield section (the one that depends on the ML prediction), plus an optional reason sentence."""
+    text = advice_phrases(lang)["yield"].format(
+        district=localization.localize_value("district", district, lang),
+        crop=localization.localize_value("crop", crop, lang),
+        predicted_yield=predicted_yield,
+    )
+    return f"{text} {reason}" if reason else text
+
+
+def advice_sections_batch(records, lang="en"):
+    """
+    Vectorized rule engine for bulk runs.
+    records: list of dicts with the get_prescriptive_advice keyword arguments
+    (district, crop, month, rainfall, temperature, soil, fertilizer, nitrogen,
+    phosphorus, potassium, ph, predicted_yield).
+    All band decisions are made with numpy over whole columns; only the final
+    str.format per row is a Python loop. Returns one {section: text} dict per record.
+    """
+    import numpy as np
+
+    if not records:
+        return []
+
+    rain = np.array([float(r["rainfall"]) for r in records])
+    temp = np.array([float(r["temperature"]) for r in records])
+    nutrients = np.array([[int(r["nitrogen"]), int(r["phosphorus"]), int(r["potassium"])] for r in records])
+    months = np.array([str(r["month"]).lower() for r in records])
+    districts = np.array([str(r["district"]).lower() for r in records])
+
+    rain_bands = np.select([rain > 1000, rain > 800, rain < 300], ["very_high", "high", "low"], "moderate")
+    water_bands = np.select([rain > 800, rain < 300], ["high", "low"], "moderate")
+    month_bands = np.select(
+        [np.isin(months, PRE_MONSOON_MONTHS), np.isin(months, MONSOON_MONTHS), np.isin(months, RABI_MONTHS)],
+        ["pre_monsoon", "monsoon", "rabi"], "other")
+    pest_bands = np.select([(temp > 32) & (rain > 800), temp > 35], ["fungal", "stem_borer"], "monitor")
+    storage_bands = np.select(
+        [np.isin(districts, HARVESTING_DISTRICTS), np.isin(districts, BOREWELL_DISTRICTS)],
+        ["harvesting", "borewell"], "wells")
+    low = nutrients < np.array([40, 20, 20])
+
+    # Localize whole columns once instead of per row.
+    names = {
+        field: localization.localize_column(field, (r[field] for r in records), lang)
+        for field in ("district", "crop", "month", "soil", "fertilizer")
+    }
+    yield_phrase = advice_phrases(lang)["yield"]
+
+    out = []
+    for i, r in enumerate(records):
+        flags = tuple(f for f, is_low in zip(("n", "p", "k"), low[i]) if is_low) or ("balanced",)
+        row_names = {field: column[i] for field, column in names.items()}
+        sections = dict(_render_sections(
+            r["district"], r["crop"], r["month"], r["rainfall"], r["soil"], r["fertilizer"], r["ph"],
+            rain_band=str(rain_bands[i]), month_b=str(month_bands[i]), water_b=str(water_bands[i]),
+            fert_flags=flags, pest_b=str(pest_bands[i]), storage_b=str(storage_bands[i]),
+            lang=lang, names=row_names,
+        ))
+        sections["yield"] = yield_phrase.format(
+            district=row_names["district"], crop=row_names["crop"],
+            predicted_yield=r.get("predicted_yield", "N/A"))
+        out.append(sections)
+    return out
+
+
+def get_prescriptive_advice(district, crop, month, season, rainfall, temperature, soil,
+                            fertilizer, nitrogen, phosphorus, potassium, ph, predicted_yield, lang="en",
+                            reason=""):
+    """
+    Dynamically generate prescriptive advice.
+    Fully conditional: rainfall, month, nutrients, district.
+    reason: optional sentence explaining the prediction (explanations.reason_text).
+    """
+    sections = dict(iter_advice_sections(district, crop, month, rainfall, temperature, soil,
+                                         fertilizer, nitrogen, phosphorus, potassium, ph, lang))
+    sections["yield"] = yield_advice(district, crop, predicted_yield, lang, reason)
+    return "\n".join(sections[name] for name in ADVICE_SECTIONS)
 
 
 # ---------------- PRESCRIPTIVE ADVICE ----------------
@@ -605,8 +781,16 @@ def load_dataset(path=DEFAULT_DATA_PATH, normalize_cols=True):
     Load CSV into a list of dicts.
     Normalizes column names (lowercase, no spaces) and keys.
     """
+    import shared_dataset
+    import sqlite_backend
+    stored = sqlite_backend.rows_for(path, normalize_keys=True)
+    if stored is not None:
+        return stored
     if not os.path.exists(path):
         raise FileNotFoundError(f"Dataset not found at: {path}")
+    shared = shared_dataset.rows_for(path, normalize_keys=True)
+    if shared is not None:
+        return shared
     rows = []
     with open(path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -633,6 +817,10 @@ def find_best_row(data, district=None, crop=None):
     """
     if not data:
         return None
+    if hasattr(data, "indices"):  # SQLite / shared-memory rows: indexed filter, no scan
+        equals = {k: v for k, v in (("district_name", district), ("crop", crop)) if v}
+        idx = data.indices(**equals) if equals else range(len(data))
+        return data[int(random.choice(idx))] if len(idx) else None
     candidates = data
     if district:
         district_norm = district.strip().lower()
@@ -739,33 +927,36 @@ def build_fill_values(row, district, crop, lang="en"):
     vals["potassium"] = safe_get(row, ["potassium"])
     vals["ph"] = safe_get(row, ["p_h", "ph"])
 
-    # 2. Corrected logic for Yield Prediction
+    # 2. Yield prediction with an interval (its width gives the confidence)
+    features = {
+        "District_Name": vals["district"],
+        "Crop": vals["crop"],
+        "Season": vals["season"],
+        "Month": safe_get(row, ["month"], default=datetime.date.today().strftime('%B')),
+        "Rainfall": vals["rainfall"],
+        "Temperature": vals["temperature"],
+        "Nitrogen": vals["nitrogen"],
+        "Phosphorus": vals["phosphorus"],
+        "Potassium": vals["potassium"],
+        "pH": vals["ph"],
+        "Fertilizer": vals["fertilizer"],
+        "Soil_color": vals["soil"]
+    }
+    try:
+        from ml_connector import predict_yield_with_interval  # lazy: keeps numpy/sklearn off the import path
+        prediction = predict_yield_with_interval([features])[0]
+    except Exception as e:
+        print(f"❌ Prediction failed in templates.py: {e}")
+        prediction = None
+
     yield_val = safe_get(row, ["yield"])
     if yield_val == "N/A" or yield_val.strip() == "":
-        try:
-            # Prepare the features dictionary for the ML model (using current month if needed)
-            features = {
-                "District_Name": vals["district"],
-                "Crop": vals["crop"],
-                "Season": vals["season"],
-                "Month": safe_get(row, ["month"], default=datetime.date.today().strftime('%B')),
-                "Rainfall": vals["rainfall"],
-                "Temperature": vals["temperature"],
-                "Nitrogen": vals["nitrogen"],
-                "Phosphorus": vals["phosphorus"],
-                "Potassium": vals["potassium"],
-                "pH": vals["ph"],
-                "Fertilizer": vals["fertilizer"],
-                "Soil_color": vals["soil"]
-            }
-            yield_val = str(predict_yield(features))
-        except Exception as e:
-            # Fallback to the heuristic
-            print(f"❌ Prediction failed in templates.py (using heuristic): {e}")
-            yield_val = str(estimate_yield(row))
+        # Fallback to the heuristic when the model can't predict
+        yield_val = str(prediction["yield"]) if prediction else str(estimate_yield(row))
 
     vals["yield"] = yield_val
-    vals["confidence"] = safe_get(row, ["confidence"], default="75")
+    has_interval = prediction and prediction["confidence"] is not None
+    vals["confidence"] = safe_get(row, ["confidence"], default=str(prediction["confidence"]) if has_interval else "75")
 
     return vals
 
@@ -860,7 +1051,7 @@ def clean_reply(text):
 
 def get_final_response(row, intent, lang):
     # 1. CHECK FOR PRESCRIPTIVE ADVICE FIRST (The Hackathon Logic)
-    prescriptive_message = get_prescriptive_advice(row, intent, lang)
+    prescriptive_message = get_intent_advice(row, intent, lang)
     if prescriptive_message:
         return prescriptive_message # Return the strategic advice immediately
 
@@ -0,0 +1,154 @@
+# tracing.py
+"""
+Lightweight per-stage latency metrics.
+
+    from tracing import span
+    with span("generate_reply.weather"):
+        ...
+
+Each span is two time.perf_counter() calls plus one bucket increment under a lock,
+cheap enough to leave on in production (set AGRO_TRACING=0 to turn it off).
+Durations go into fixed-bucket histograms per stage name and can be read as:
+
+- render_prometheus(): Prometheus text exposition (served on /metrics by app.py)
+- summary(): JSON-friendly dict with count / mean / approx p50, p95 / max per stage
+
+Other components can add their own lines to /metrics with register_collector(fn),
+where fn() returns an iterable of (metric_name, labels_dict, value) samples.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("AGRO_TRACING", "1") != "0"
+METRIC_PREFIX = "agro"
+
+# Seconds. Spans range from microsecond dict lookups to multi-second CSV loads.
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot = +Inf
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bucket bound containing quantile q (the usual histogram approximation)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+
+_lock = threading.Lock()
+_histograms = {}
+_collectors = []
+
+
+def observe(stage, seconds):
+    """Record one duration for stage (seconds)."""
+    if not ENABLED:
+        return
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = Histogram()
+        hist.observe(seconds)
+
+
+@contextmanager
+def span(stage):
+    """Time the with-block and record it under stage. Exceptions are recorded too."""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+def register_collector(fn):
+    """fn() -> iterable of (name, labels, value) samples appended to /metrics."""
+    _collectors.append(fn)
+    return fn
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def _snapshot():
+    with _lock:
+        return {
+            stage: (list(h.counts), h.total, h.count, h.max, h.quantile(0.5), h.quantile(0.95))
+            for stage, h in _histograms.items()
+        }
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def render_prometheus():
+    """Prometheus text format for all stage histograms and registered collectors."""
+    name = f"{METRIC_PREFIX}_stage_duration_seconds"
+    lines = [
+        f"# HELP {name} Wall time per pipeline stage.",
+        f"# TYPE {name} histogram",
+    ]
+    for stage, (counts, total, count, _, _, _) in sorted(_snapshot().items()):
+        cumulative = 0
+        for bound, c in zip(BUCKETS + ("+Inf",), counts):
+            cumulative += c
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+    for collector in _collectors:
+        try:
+            samples = list(collector())
+        except Exception as e:
+            lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {e}")
+            continue
+        for metric, labels, value in samples:
+            lines.append(f"{METRIC_PREFIX}_{metric}{_fmt_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def summary():
+    """{stage: {count, total_ms, mean_ms, p50_ms, p95_ms, max_ms}} (p50/p95 are bucket bounds)."""
+    out = {}
+    for stage, (_, total, count, mx, p50, p95) in sorted(_snapshot().items()):
+        out[stage] = {
+            "count": count,
+            "total_ms": round(total * 1000, 3),
+            "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(p50 * 1000, 3),
+            "p95_ms": round(p95 * 1000, 3),
+            "max_ms": round(mx * 1000, 3),
+        }
+    return out
@@ -0,0 +1,182 @@
+# translation_cache.py
+"""
+Batch translation with a content-addressed on-disk cache.
+
+    translator = Translator()                     # backend from TRANSLATION_BACKEND
+    hindi = translator.translate_all(texts, "hi")  # same order as texts, None = untranslated
+
+- Identical source strings are translated once, however many rows they appear in.
+- Every translation is stored under sha1(backend, lang, text) in an append-only
+  JSONL file (TRANSLATION_CACHE_DIR/translations.jsonl), so a rerun only sends
+  strings it has never seen. The backend name is part of the key: switching from
+  the stub to a real backend doesn't reuse stub output.
+- Misses are sent to the backend in batches of TRANSLATION_BATCH_SIZE.
+
+Backends (TRANSLATION_BACKEND):
+- "dictionary" (default): offline phrase dictionary (TRANSLATION_DICT_PATH, JSON
+  {lang: {english: translated}}) plus the names in localization.NAMES. Strings it
+  doesn't know stay untranslated (None) instead of going to the network.
+- "google": Google Cloud Translate v2, imported only when selected.
+- "stub": returns "[hi] <text>", for offline tests of the pipeline itself.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+
+import localization
+
+CACHE_DIR = os.environ.get("TRANSLATION_CACHE_DIR", ".translation_cache")
+BACKEND = os.environ.get("TRANSLATION_BACKEND", "dictionary")
+DICT_PATH = os.environ.get(
+    "TRANSLATION_DICT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_dict.json")
+)
+BATCH_SIZE = int(os.environ.get("TRANSLATION_BATCH_SIZE", "100"))
+
+
+def cache_key(backend, lang, text):
+    return hashlib.sha1(f"{backend}\0{lang}\0{text}".encode("utf-8")).hexdigest()
+
+
+class DictionaryBackend:
+    name = "dictionary"
+
+    def __init__(self, path=DICT_PATH):
+        self.phrases = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.phrases = json.load(f)
+
+    def translate_batch(self, texts, lang):
+        table = self.phrases.get(lang, {})
+        out = []
+        for text in texts:
+            hit = table.get(text)
+            if hit is None:
+                for field in localization.NAMES:
+                    localized = localization.localize_value(field, text, lang)
+                    if localized != text:
+                        hit = localized
+                        break
+            out.append(hit)
+        return out
+
+
+class StubBackend:
+    name = "stub"
+
+    def translate_batch(self, texts, lang):
+        return [f"[{lang}] {text}" for text in texts]
+
+
+class GoogleBackend:
+    name = "google"
+    # Placeholders like {district} must survive translation untouched.
+    _PLACEHOLDER = re.compile(r"\{[^{}]*\}")
+
+    def __init__(self):
+        from google.cloud import translate_v2 as translate
+        self.client = translate.Client()
+
+    def translate_batch(self, texts, lang):
+        masked, slots = [], []
+        for text in texts:
+            found = self._PLACEHOLDER.findall(text)
+            for i, ph in enumerate(found):
+                text = text.replace(ph, f"<x{i}>", 1)
+            masked.append(text)
+            slots.append(found)
+        results = self.client.translate(masked, target_language=lang, format_="text")
+        out = []
+        for res, found in zip(results, slots):
+            text = res["translatedText"]
+            for i, ph in enumerate(found):
+                text = text.replace(f"<x{i}>", ph)
+            out.append(text)
+        return out
+
+
+BACKENDS = {"dictionary": DictionaryBackend, "stub": StubBackend, "google": GoogleBackend}
+
+
+def get_backend(name=None):
+    name = name or BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown translation backend {name!r} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+class TranslationCache:
+    """{key: translated} loaded from / appended to <cache_dir>/translations.jsonl."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.path = os.path.join(cache_dir, "translations.jsonl")
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from an interrupted run
+                    self._entries[rec["key"]] = rec["text"]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def add_many(self, records):
+        """records: [(key, lang, source, translated)]; appended in one write."""
+        if not records:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for key, lang, source, text in records:
+                    f.write(json.dumps({"key": key, "lang": lang, "src": source, "text": text},
+                                       ensure_ascii=False) + "\n")
+                    self._entries[key] = text
+
+
+class Translator:
+    def __init__(self, backend=None, cache=None, batch_size=BATCH_SIZE):
+        self.backend = backend if backend is not None and not isinstance(backend, str) else get_backend(backend)
+        self.cache = cache or TranslationCache()
+        self.batch_size = batch_size
+        self.stats = {"requested": 0, "unique": 0, "cache_hits": 0, "translated": 0, "missing": 0}
+
+    def translate_all(self, texts, lang):
+        """Translate texts to lang. Returns a list aligned with texts (None where no translation)."""
+        texts = list(texts)
+        unique = list(dict.fromkeys(texts))
+        self.stats["requested"] += len(texts)
+        self.stats["unique"] += len(unique)
+
+        done = {}
+        misses = []
+        for text in unique:
+            hit = self.cache.get(cache_key(self.backend.name, lang, text))
+            if hit is not None:
+                done[text] = hit
+            else:
+                misses.append(text)
+        self.stats["cache_hits"] += len(unique) - len(misses)
+
+        for start in range(0, len(misses), self.batch_size):
+            batch = misses[start:start + self.batch_size]
+            results = self.backend.translate_batch(batch, lang)
+            new = []
+            for source, text in zip(batch, results):
+                if text is None:
+                    self.stats["missing"] += 1
+                    continue
+                done[source] = text
+                new.append((cache_key(self.backend.name, lang, source), lang, source, text))
+            self.cache.add_many(new)
+            self.stats["translated"] += len(new)
+
+        return [done.get(text) for text in texts]
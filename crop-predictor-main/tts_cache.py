@@ -0,0 +1,225 @@
+# tts_cache.py
+"""
+Offline spoken replies with per-sentence audio caching.
+
+    tts = get_tts()
+    wav_bytes = tts.synthesize(reply_text, lang="hi")
+
+Most of a reply is fixed template text, so the same sentences come back again and
+again. A reply is split into sentences and each one is looked up in an on-disk cache
+keyed by sha1(lang, voice, sentence) (TTS_CACHE_DIR/<2 hex>/<sha1>.wav). Misses are
+synthesised in parallel by a small process pool (TTS_WORKERS), each worker holding its
+own pyttsx3 engine (engines are not thread-safe). The segments are then joined into
+one WAV with the wave module, with a short pause between sentences.
+
+The cache is bounded (TTS_CACHE_MAX_MB): hits refresh a file's mtime and the oldest
+files are evicted once the total goes over budget. Everything runs offline; pyttsx3
+drives the platform's local speech engine (eSpeak / SAPI5 / NSSpeechSynthesizer).
+"""
+import hashlib
+import io
+import os
+import re
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+CACHE_DIR = os.environ.get("TTS_CACHE_DIR", ".tts_cache")
+MAX_CACHE_BYTES = int(float(os.environ.get("TTS_CACHE_MAX_MB", "200")) * 1024 * 1024)
+WORKERS = int(os.environ.get("TTS_WORKERS", "2"))
+PAUSE_MS = 150
+
+# Sentence ends: . ! ? and the Devanagari danda, or a newline (one advisory section per line).
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+|\n+")
+
+
+def split_sentences(text):
+    """Reply text -> list of speakable sentences (markdown emphasis stripped)."""
+    text = (text or "").replace("**", "")
+    return [s for s in (" ".join(part.split()) for part in _SENTENCE_END.split(text)) if s]
+
+
+def cache_key(sentence, lang, voice):
+    return hashlib.sha1(f"{lang}\0{voice}\0{sentence}".encode("utf-8")).hexdigest()
+
+
+# ---------------- worker side (runs in the pool processes) ----------------
+
+_engine = None
+_voices = {}
+
+
+def _pick_voice(engine, lang):
+    """First installed voice whose id / languages mention lang, else the default voice."""
+    if lang in _voices:
+        return _voices[lang]
+    chosen = None
+    for v in engine.getProperty("voices") or []:
+        langs = [l.decode("utf-8", "ignore") if isinstance(l, bytes) else str(l) for l in (v.languages or [])]
+        if lang in (v.id or "").lower() or any(lang in l.lower() for l in langs):
+            chosen = v.id
+            break
+    _voices[lang] = chosen
+    return chosen
+
+
+def pyttsx3_synthesize(sentence, lang, voice, path):
+    """Render one sentence to a WAV file at path with a process-local pyttsx3 engine."""
+    global _engine
+    if _engine is None:
+        import pyttsx3
+        _engine = pyttsx3.init()
+    voice_id = voice if voice and voice != "default" else _pick_voice(_engine, lang)
+    if voice_id:
+        _engine.setProperty("voice", voice_id)
+    tmp = path + f".{os.getpid()}.tmp.wav"
+    _engine.save_to_file(sentence, tmp)
+    _engine.runAndWait()
+    os.replace(tmp, path)
+    return path
+
+
+# ---------------- WAV joining ----------------
+
+def _read_wav(path):
+    with wave.open(path, "rb") as w:
+        return w.getparams(), w.readframes(w.getnframes())
+
+
+def _convert(frames, params, target):
+    """Bring 16-bit PCM frames to the target rate / channel count (engines rarely differ)."""
+    import numpy as np
+    if params.sampwidth != 2:
+        raise ValueError(f"unsupported sample width {params.sampwidth}")
+    audio = np.frombuffer(frames, dtype=np.int16).reshape(-1, params.nchannels).astype(np.float32)
+    audio = audio.mean(axis=1, keepdims=True) if target.nchannels == 1 else np.repeat(audio[:, :1], target.nchannels, 1)
+    if params.framerate != target.framerate and len(audio):
+        n_out = int(round(len(audio) * target.framerate / params.framerate))
+        x_old = np.arange(len(audio))
+        x_new = np.linspace(0, len(audio) - 1, n_out)
+        audio = np.stack([np.interp(x_new, x_old, audio[:, c]) for c in range(audio.shape[1])], axis=1)
+    return np.clip(audio, -32768, 32767).astype(np.int16).tobytes()
+
+
+def concat_wavs(paths, pause_ms=PAUSE_MS):
+    """Join WAV files into one WAV (bytes), using the first file's format."""
+    if not paths:
+        return b""
+    target, _ = _read_wav(paths[0])
+    silence = b"\x00" * (int(target.framerate * pause_ms / 1000) * target.nchannels * target.sampwidth)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as out:
+        out.setnchannels(target.nchannels)
+        out.setsampwidth(target.sampwidth)
+        out.setframerate(target.framerate)
+        for i, path in enumerate(paths):
+            params, frames = _read_wav(path)
+            if (params.nchannels, params.sampwidth, params.framerate) != \
+                    (target.nchannels, target.sampwidth, target.framerate):
+                frames = _convert(frames, params, target)
+            if i:
+                out.writeframes(silence)
+            out.writeframes(frames)
+    return buf.getvalue()
+
+
+# ---------------- cache ----------------
+
+class TTSCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, workers=WORKERS, synth_fn=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.synth_fn = synth_fn or pyttsx3_synthesize
+        self._pool = None
+        self._lock = threading.Lock()
+        self.stats = {"sentences": 0, "hits": 0, "synthesized": 0, "evicted": 0}
+        self._size = 0
+        for root, _, files in os.walk(cache_dir):
+            self._size += sum(os.path.getsize(os.path.join(root, f)) for f in files if f.endswith(".wav"))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".wav")
+
+    def _get_pool(self):
+        # Lazy: forked servers shouldn't inherit speech engines, and cache-only runs never need one.
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def segment_paths(self, text, lang="en", voice="default"):
+        """Cached WAV path per sentence, synthesising the misses in the pool."""
+        sentences = split_sentences(text)
+        paths = []
+        misses = {}
+        for sentence in sentences:
+            path = self._path(cache_key(sentence, lang, voice))
+            paths.append(path)
+            if os.path.exists(path):
+                os.utime(path)  # LRU: a hit is a fresh use
+                self.stats["hits"] += 1
+            else:
+                misses.setdefault(path, sentence)
+        self.stats["sentences"] += len(sentences)
+
+        if misses:
+            for path in misses:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.synth_fn is pyttsx3_synthesize:
+                pool = self._get_pool()
+                futures = [pool.submit(self.synth_fn, s, lang, voice, p) for p, s in misses.items()]
+                for f in futures:
+                    f.result()
+            else:
+                for path, sentence in misses.items():
+                    self.synth_fn(sentence, lang, voice, path)
+            with self._lock:
+                self._size += sum(os.path.getsize(p) for p in misses)
+                self.stats["synthesized"] += len(misses)
+            self._evict(keep=set(paths))
+        return paths
+
+    def synthesize(self, text, lang="en", voice="default"):
+        """Whole reply as WAV bytes (b"" for empty text)."""
+        return concat_wavs(self.segment_paths(text, lang, voice))
+
+    def _evict(self, keep=()):
+        if self._size <= self.max_bytes:
+            return
+        with self._lock:
+            files = []
+            for root, _, names in os.walk(self.cache_dir):
+                for name in names:
+                    if name.endswith(".wav"):
+                        path = os.path.join(root, name)
+                        st = os.stat(path)
+                        files.append((st.st_mtime, st.st_size, path))
+            files.sort()
+            for _, size, path in files:
+                if self._size <= self.max_bytes:
+                    break
+                if path in keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._size -= size
+                self.stats["evicted"] += 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+_tts = None
+
+
+def get_tts():
+    global _tts
+    if _tts is None:
+        _tts = TTSCache()
+    return _tts
@@ -20,8 +20,9 @@ import shutil
 import subprocess
 import time
 import re
-from templates import generate_filled_template,get_final_response
-from dataset_connector import load_dataset, lookup_dataset,localize_row
+# templates / dataset_connector / ml_connector (numpy, joblib, sklearn) are imported
+# inside the functions that use them, so `--text` startup and --help stay fast.
+from entity_vocab import DISTRICT_LOCALIZATION, CROP_LOCALIZATION, SEASON_LOCALIZATION, get_vocabulary
 
 
 DEFAULT_WAV = "input.wav"
@@ -36,29 +37,6 @@ KEYWORDS = {
     "yield": ["उत्पन्न", "उत्पन्न किती", "yield", "उपज"],
 }
 
-DISTRICT_LOCALIZATION = {
-    "Jodhpur": ["jodhpur", "जोधपुर", "जोधपूर"],
-    "Kolhapur": ["kolhapur", "कोल्हापुर", "कोल्हापूर"],
-    "Satara":   ["satara", "सातारा", "सातरा"],
-    "North Delhi": ["north delhi", "उत्तर दिल्ली", "नॉर्थ दिल्ली"],
-
-}
-
-CROP_LOCALIZATION = {
-    "Bajra": ["bajra", "बाजरा", "बाजरी"],
-    "Maize": ["maize", "मक्का", "मका"],
-    "Jowar": ["jowar", "ज्वार", "ज्वारी"],
-    "Soybean": ["Soybean", "सोयाबीन", "सोयाबिन"],
-    "Wheat": ["Wheat", "गहू", "गेहूं"],
-    "Rice": ["rice", "चावल", "भात"],
-    
-}
-SEASON_LOCALIZATION = {
-    "Kharif": ["kharif", "खरीफ", "खरीफ हंगाम"],
-    "Rabi": ["rabi", "रबी", "रब्बी हंगाम"],
-    "Zaid": ["zaid", "जायद", "जायड"]
-}
-
 # ---------- HELPERS ----------
 def abort(msg):
     print("\nERROR:", msg)
@@ -87,25 +65,70 @@ def check_ffmpeg():
     print("  -> Please install ffmpeg and add it to your PATH.")
     return False
 
-def ensure_python_packages():
+DEPS_CACHE_PATH = os.environ.get("AGRO_DEPS_CACHE", ".deps_probe.json")
+REQUIRED_PACKAGES = {
+    "whisper": "openai-whisper",
+    "sounddevice": "sounddevice",
+    "soundfile": "soundfile",
+    "pyttsx3": "pyttsx3",
+    "langdetect": "langdetect",
+    "torch": "torch",
+}
+
+
+def _deps_fingerprint():
+    """Changes when the interpreter or any installed-package directory changes."""
+    # The script dir / cwd hold the cache file itself; their mtime changes on every write.
+    skip = {os.path.realpath(d) for d in (os.getcwd(), os.path.dirname(os.path.abspath(DEPS_CACHE_PATH)))}
+    if sys.path and sys.path[0]:
+        skip.add(os.path.realpath(sys.path[0]))
+    parts = [sys.executable, sys.version]
+    for p in sys.path:
+        if not p or os.path.realpath(p) in skip:
+            continue
+        try:
+            parts.append(f"{p}:{os.stat(p).st_mtime_ns}")
+        except OSError:
+            continue
+    return "|".join(parts)
+
+
+def probe_python_packages():
+    """
+    [(module, pip_name)] of missing packages. Uses importlib.util.find_spec, so nothing
+    (torch, whisper, ...) is actually imported; a clean result is cached in
+    DEPS_CACHE_PATH until the interpreter or site-packages change.
+    """
+    import importlib.util
+    import json
+
+    fingerprint = _deps_fingerprint()
+    try:
+        with open(DEPS_CACHE_PATH, encoding="utf-8") as f:
+            if json.load(f).get("fingerprint") == fingerprint:
+                return []
+    except (OSError, ValueError):
+        pass
+
     missing = []
-    modules = {
-        "whisper": "openai-whisper",
-        "sounddevice": "sounddevice",
-        "soundfile": "soundfile",
-        "pyttsx3": "pyttsx3",
-        "langdetect": "langdetect",
-    }
-    for mod, pkg in modules.items():
+    for mod, pkg in REQUIRED_PACKAGES.items():
         try:
-            __import__(mod)
-        except Exception:
+            found = importlib.util.find_spec(mod) is not None
+        except (ImportError, ValueError):
+            found = False
+        if not found:
             missing.append((mod, pkg))
-    try:
-        import torch 
-    except Exception:
-        missing.append(("torch", "torch"))
+    if not missing:
+        try:
+            with open(DEPS_CACHE_PATH, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint}, f)
+        except OSError:
+            pass
+    return missing
+
 
+def ensure_python_packages():
+    missing = probe_python_packages()
     if missing:
         print("[check] Missing Python packages:")
         for mod, pkg in missing:
@@ -117,6 +140,22 @@ def ensure_python_packages():
     return True
 
 
+def record_audio_array(duration=6, fs=16000):
+    """Record from the mic and return float32 16 kHz mono audio (no file written)."""
+    try:
+        import sounddevice as sd
+    except Exception as e:
+        abort("sounddevice not available. Error: " + str(e))
+    from audio_frontend import from_pcm
+
+    print(f"[record] Recording for {duration}s ... speak now.")
+    try:
+        rec = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype='int16')
+        sd.wait()
+        return from_pcm(rec, fs)
+    except Exception as e:
+        abort("Recording failed: " + str(e))
+
 def record_audio(filename=DEFAULT_WAV, duration=6, fs=16000):
     try:
         import sounddevice as sd
@@ -157,26 +196,61 @@ def transcribe_with_google(lang="hi-IN", timeout=6):
     except Exception as e:
         print("[asr] Google ASR error:", e)
         return "", None
+_whisper_models = {}
+
 def transcribe_with_whisper(audio_path, model_size="small"):
+    """audio_path: file path or float32 16 kHz array (decoded in-process, see audio_frontend)."""
     try:
         import whisper
     except Exception:
         abort("Whisper not installed. Install with: pip install openai-whisper")
+    from audio_frontend import load_audio
 
-    print("[asr] Loading Whisper model:", model_size)
     try:
-        model = whisper.load_model(model_size)
+        audio = audio_path if not isinstance(audio_path, (str, os.PathLike)) else load_audio(audio_path)
     except Exception as e:
-        abort("Failed to load Whisper model: " + str(e))
+        abort("Could not decode audio: " + str(e))
+
+    model = _whisper_models.get(model_size)
+    if model is None:
+        print("[asr] Loading Whisper model:", model_size)
+        try:
+            model = _whisper_models[model_size] = whisper.load_model(model_size)
+        except Exception as e:
+            abort("Failed to load Whisper model: " + str(e))
 
     print("[asr] Transcribing ...")
     try:
-        result = model.transcribe(audio_path, fp16=False)
+        result = model.transcribe(audio, fp16=False)
         text = result.get("text", "").strip()
         lang = result.get("language", None)
         return text, lang or None
     except Exception as e:
         abort("Whisper transcription failed: " + str(e))
+def speak_offline(text, lang="en", out_path="reply.wav"):
+    """
+    Speak text with offline TTS (pyttsx3), reusing cached audio for sentences spoken before.
+    Writes the joined WAV to out_path and plays it if sounddevice is available.
+    """
+    from tts_cache import get_tts
+    try:
+        audio = get_tts().synthesize(text, lang=resolve_lang(lang))
+    except Exception as e:
+        print("[tts] Offline TTS failed:", e)
+        return None
+    if not audio:
+        return None
+    with open(out_path, "wb") as f:
+        f.write(audio)
+    try:
+        import sounddevice as sd
+        import soundfile as sf
+        data, fs = sf.read(out_path, dtype="int16")
+        sd.play(data, fs)
+        sd.wait()
+    except Exception as e:
+        print(f"[tts] Reply audio saved to {out_path} (playback unavailable: {e})")
+    return out_path
 INTENT_KEYWORDS = {
     "irrigation": ["irrigation", "पानी", "सिंचाई", "पाणी"],
     "fertilizer": ["fertilizer", "खत", "खाद", "खते"],
@@ -234,49 +308,35 @@ def detect_intent(text):
 
 
 def detect_district(text):
-    t = text.lower()
-    for eng, aliases in DISTRICT_LOCALIZATION.items():
-        for a in aliases:
-            if a.lower() in t:
-                return eng.capitalize()
-    return None
+    return get_vocabulary().match(text)["district"]
 
 
 def detect_crop(text):
-    t = text.lower()
-    for eng, aliases in CROP_LOCALIZATION.items():
-        for a in aliases:
-            if a.lower() in t:
-                return eng
-    return None
+    return get_vocabulary().match(text)["crop"]
 
 def detect_season(text):
-    t = text.lower()
-    for eng, aliases in SEASON_LOCALIZATION.items():
-        for a in aliases:
-            if a.lower() in t:
-                return eng
-    return "Unknown"
-_known_lists_cache = None
+    return get_vocabulary().match(text)["season"] or "Unknown"
 
 def _build_known_lists():
-    global _known_lists_cache
-    if _known_lists_cache is not None:
-        return _known_lists_cache
-
-    rows = load_dataset()
-    districts, crops = [], []
-    for r in rows:
-        dn = r.get("District_Name") or r.get("district_name") or r.get("district")
-        cp = r.get("Crop") or r.get("crop")
-        if dn and dn.strip().lower() not in (d.lower() for d in districts):
-            districts.append(dn.strip())
-        if cp and cp.strip().lower() not in (c.lower() for c in crops):
-            crops.append(cp.strip())
-    districts.sort(key=lambda s: -len(s))
-    crops.sort(key=lambda s: -len(s))
-    _known_lists_cache = {"districts": districts, "crops": crops}
-    return _known_lists_cache
+    """Canonical district / crop names, longest first (from the entity vocabulary)."""
+    vocab = get_vocabulary()
+    return {
+        "districts": sorted(vocab.names["district"], key=lambda s: -len(s)),
+        "crops": sorted(vocab.names["crop"], key=lambda s: -len(s)),
+    }
+
+def detect_entities(user_text):
+    """
+    One vocabulary pass for district, crop and season.
+    Returns ({"district", "crop", "season"} -> name or None, {kind: confidence}).
+    """
+    names, confidence = {}, {}
+    for kind, hit in get_vocabulary().match_scored(user_text).items():
+        names[kind] = hit[0] if hit else None
+        if hit and hit[1] < 1.0:
+            confidence[kind] = hit[1]
+            print(f"[entity] Fuzzy {kind} match: {hit[0]} (confidence {hit[1]:.2f})")
+    return names, confidence
 
 def extract_district_and_crop_from_text(user_text):
     """
@@ -285,64 +345,16 @@ def extract_district_and_crop_from_text(user_text):
     """
     if not user_text:
         return None, None
-    t = user_text.lower()
-    try:
-        rows = load_dataset()
-    except Exception:
-        rows = []
-    ds_districts = set()
-    ds_crops = set()
-    for r in rows:
-        dn = (r.get("District_Name") or r.get("district_name") or r.get("district") or "").strip()
-        cp = (r.get("Crop") or r.get("crop") or "").strip()
-        if dn:
-            ds_districts.add(dn.lower())
-        if cp:
-            ds_crops.add(cp.lower())
-
-
-    for dn in ds_districts:
-        if dn in t:
-
-            found_crop = None
-            for cp in ds_crops:
-                if cp in t:
-                    found_crop = cp.capitalize()
-                    break
-            return dn.capitalize(), found_crop
-    for eng, aliases in DISTRICT_LOCALIZATION.items():
-        for a in aliases:
-            if a.lower() in t:
-                found_crop = None
-                for ceng, caliases in CROP_LOCALIZATION.items():
-                    for ca in caliases:
-                        if ca.lower() in t:
-                            found_crop = ceng
-                            break
-                    if found_crop:
-                        break
-                return eng, found_crop
-    for eng, aliases in CROP_LOCALIZATION.items():
-        for a in aliases:
-            if a.lower() in t:
-                return None, eng
-
-    return None, None
+    found = get_vocabulary().match(user_text)
+    return found["district"], found["crop"]
 
 
 # voice_assistant_fixed.py - NEW generate_reply function
 
-from templates import get_prescriptive_advice
-from dataset_connector import load_dataset
-import ml_connector
-
-def generate_reply(intent, lang_code=None, user_text=None):
-    """
-    Generates a merged prescriptive advisory reply (rainfall + irrigation + sowing + yield + fertilizer + pest + storage).
-    Uses dataset + ML + rule-based advice from templates.py.
-    """
+from tracing import span
 
-    # Detect language
+def resolve_lang(lang_code):
+    """Normalise a language hint (code or name) to en / hi / mr."""
     lang = "en"
     if lang_code:
         l = str(lang_code).lower()
@@ -352,88 +364,233 @@ def generate_reply(intent, lang_code=None, user_text=None):
             lang = "hi"
         elif l.startswith("en") or "english" in l:
             lang = "en"
+    return lang
+
+
+def build_reply_features(user_text=None):
+    """
+    Steps 1-5 of generate_reply: dataset, entities, fallback row, weather, features.
+    Returns the features dict the model and the advisory both use (no "Yield" yet).
+    """
+
+    from dataset_connector import load_dataset
 
     # --- STEP 1: Load dataset ---
-    try:
-        rows = load_dataset()
-    except Exception as e:
-        print(f"[data-error] Failed to load dataset: {e}")
-        rows = []
+    with span("generate_reply.dataset_load"):
+        try:
+            rows = load_dataset()
+        except Exception as e:
+            print(f"[data-error] Failed to load dataset: {e}")
+            rows = []
 
     # --- STEP 2: Detect entities (district, crop, season, month) ---
-    district, crop = None, None
-    if user_text:
-        district = detect_district(user_text)
-        crop = detect_crop(user_text)
-        season = detect_season(user_text)
-    else:
-        season = "Unknown"
+    with span("generate_reply.entity_detection"):
+        district, crop = None, None
+        if user_text:
+            entities, _ = detect_entities(user_text)
+            district, crop = entities["district"], entities["crop"]
+            season = entities["season"] or "Unknown"
+        else:
+            season = "Unknown"
+
+    return features_for_entities(district, crop, season, rows)
+
+
+def features_for_entities(district, crop, season, rows):
+    """Steps 3-5 of generate_reply for already-detected entities (also used by advisory_table)."""
+    import ml_connector
+    from dataset_connector import first_match
 
     # --- STEP 3: Fallback row from dataset ---
-    fallback_row = {}
-    if rows:
-        for r in rows:
-            if district and r.get("District_Name", "").lower() == district.lower():
-                if crop and r.get("Crop", "").lower() == crop.lower():
-                    fallback_row = r
-                    break
-        if not fallback_row:
-            fallback_row = rows[0]
+    with span("generate_reply.fallback_row"):
+        fallback_row = {}
+        if rows:
+            if district and crop:
+                fallback_row = first_match(rows, District_Name=district, Crop=crop) or {}
+            if not fallback_row:
+                print(f"[entity] No row for district={district!r} crop={crop!r}; falling back to the first dataset row")
+                fallback_row = rows[0]
 
     # --- STEP 4: Dynamic weather (Rainfall + Temperature) ---
-    dynamic_weather = ml_connector.get_dynamic_rainfall_and_temp(
-        district or fallback_row.get("District_Name", "Kolhapur"),
-        "current_month"
-    )
+    with span("generate_reply.weather"):
+        dynamic_weather = ml_connector.get_dynamic_rainfall_and_temp(
+            district or fallback_row.get("District_Name", "Kolhapur"),
+            "current_month"
+        )
 
     # --- STEP 5: Build features dict ---
-    features = {
-        "District_Name": district or fallback_row.get("District_Name", "Kolhapur"),
-        "Crop": crop or fallback_row.get("Crop", "Wheat"),
-        "Season": season or fallback_row.get("Season", "Rabi"),
-        "Month": fallback_row.get("Month", "July"),
-        "Rainfall": dynamic_weather.get("Rainfall", fallback_row.get("Rainfall", "200")),
-        "Temperature": dynamic_weather.get("Temperature", fallback_row.get("Temperature", "28")),
-        "Nitrogen": fallback_row.get("Nitrogen", "50"),
-        "Phosphorus": fallback_row.get("Phosphorus", "30"),
-        "Potassium": fallback_row.get("Potassium", "20"),
-        "pH": fallback_row.get("pH", "7"),
-        "Fertilizer": fallback_row.get("Fertilizer", "Urea"),
-        "Soil_color": fallback_row.get("Soil_color", "Black"),
-    }
+    with span("generate_reply.feature_build"):
+        features = {
+            "District_Name": district or fallback_row.get("District_Name", "Kolhapur"),
+            "Crop": crop or fallback_row.get("Crop", "Wheat"),
+            "Season": season or fallback_row.get("Season", "Rabi"),
+            "Month": fallback_row.get("Month", "July"),
+            "Rainfall": dynamic_weather.get("Rainfall", fallback_row.get("Rainfall", "200")),
+            "Temperature": dynamic_weather.get("Temperature", fallback_row.get("Temperature", "28")),
+            "Nitrogen": fallback_row.get("Nitrogen", "50"),
+            "Phosphorus": fallback_row.get("Phosphorus", "30"),
+            "Potassium": fallback_row.get("Potassium", "20"),
+            "pH": fallback_row.get("pH", "7"),
+            "Fertilizer": fallback_row.get("Fertilizer", "Urea"),
+            "Soil_color": fallback_row.get("Soil_color", "Black"),
+        }
+    return features
+
+
+def predict_reply_yield(features):
+    """STEP 6: ML yield for a features dict ("N/A" if the model fails)."""
+    with span("generate_reply.ml_predict"):
+        try:
+            import ml_connector
+            return ml_connector.get_yield_prediction(features)
+        except Exception as e:
+            print(f"[ML-ERROR] Yield prediction failed: {e}")
+            return "N/A"
 
-    # --- STEP 6: Predict yield ---
-    try:
-        predicted_yield = ml_connector.get_yield_prediction(features)
-    except Exception as e:
-        print(f"[ML-ERROR] Yield prediction failed: {e}")
-        predicted_yield = "N/A"
 
-    features["Yield"] = predicted_yield
+def explain_reply_yield(features, lang="en"):
+    """Sentence naming the main driver of the predicted yield ("" if unavailable)."""
+    with span("generate_reply.explain"):
+        try:
+            from explanations import reason_text
+            return reason_text(features, lang)
+        except Exception as e:
+            print(f"[explain] Could not explain prediction: {e}")
+            return ""
+
+
+def iter_rule_sections(features, lang="en"):
+    """STEP 7 without the ML part: (section, text) pairs in streaming order."""
+    from templates import iter_advice_sections
+    return iter_advice_sections(
+        district=features["District_Name"],
+        crop=features["Crop"],
+        month=features["Month"],
+        rainfall=float(features["Rainfall"]),
+        temperature=float(features["Temperature"]),
+        soil=features["Soil_color"],
+        fertilizer=features["Fertilizer"],
+        nitrogen=features["Nitrogen"],
+        phosphorus=features["Phosphorus"],
+        potassium=features["Potassium"],
+        ph=features["pH"],
+        lang=lang,
+    )
 
-    # --- STEP 7: Generate advisory ---
-    try:
-        reply = get_prescriptive_advice(
-            district=features["District_Name"],
-            crop=features["Crop"],
-            month=features["Month"],
-            season=features["Season"],
-            rainfall=float(features["Rainfall"]),
-            temperature=float(features["Temperature"]),
-            soil=features["Soil_color"],
-            fertilizer=features["Fertilizer"],
-            nitrogen=features["Nitrogen"],
-            phosphorus=features["Phosphorus"],
-            potassium=features["Potassium"],
-            ph=features["pH"],
-            predicted_yield=features["Yield"]
-        )
-    except Exception as e:
-        reply = f"Sorry, I could not generate advisory: {e}"
+
+def generate_reply(intent, lang_code=None, user_text=None, features=None):
+    """
+    Generates a merged prescriptive advisory reply (rainfall + irrigation + sowing + yield + fertilizer + pest + storage).
+    Uses dataset + ML + rule-based advice from templates.py.
+    features: output of build_reply_features(user_text) if the caller already has it.
+    """
+
+    with span("generate_reply.total"):
+        # Detect language
+        lang = resolve_lang(lang_code)
+
+        # --- STEPS 1-5: dataset, entities, weather, features ---
+        if features is None:
+            features = build_reply_features(user_text)
+        else:
+            features = dict(features)
+
+        # Common (district, crop, season, month, lang) keys are precomputed offline.
+        with span("generate_reply.advisory_table"):
+            try:
+                import advisory_table
+                reply = advisory_table.lookup(features, lang)
+            except Exception as e:
+                print(f"[advisory-table] Lookup failed: {e}")
+                reply = None
+        if reply is not None:
+            return reply
+
+        # --- STEP 6: Predict yield (and why) ---
+        features["Yield"] = predict_reply_yield(features)
+        reason = explain_reply_yield(features, lang) if features["Yield"] != "N/A" else ""
+
+        # --- STEP 7: Generate advisory ---
+        reply = render_reply(features, lang, reason)
 
     return reply
 
 
+def render_reply(features, lang, reason=""):
+    """STEP 7: the advisory text for features that already carry "Yield"."""
+    with span("generate_reply.advice_render"):
+        try:
+            from templates import get_prescriptive_advice
+            return get_prescriptive_advice(
+                district=features["District_Name"],
+                crop=features["Crop"],
+                month=features["Month"],
+                season=features["Season"],
+                rainfall=float(features["Rainfall"]),
+                temperature=float(features["Temperature"]),
+                soil=features["Soil_color"],
+                fertilizer=features["Fertilizer"],
+                nitrogen=features["Nitrogen"],
+                phosphorus=features["Phosphorus"],
+                potassium=features["Potassium"],
+                ph=features["pH"],
+                predicted_yield=features["Yield"],
+                lang=lang,
+                reason=reason,
+            )
+        except Exception as e:
+            return f"Sorry, I could not generate advisory: {e}"
+
+
+def _entity_key(text):
+    entities, _ = detect_entities(text)
+    return entities["district"], entities["crop"], entities["season"]
+
+
+def run_streaming(frames, model_size="tiny", speak=True):
+    """
+    Streaming mode: VAD-segmented utterances from `frames` (mic or WAV), each transcribed
+    in memory by a warm Whisper model. As soon as a partial transcript names a district
+    or crop, the dataset / weather / feature lookups start in the background; the final
+    transcript reuses them only if detect_entities() finds the same district, crop and
+    season in it (season is a model feature and part of the advisory table key).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from audio_stream import StreamingTranscriber, stream_transcribe
+
+    # Load Whisper before the first frame, not inside the first utterance's latency.
+    transcriber = StreamingTranscriber(model_size).warm_up()
+    prefetch = None  # ((district, crop, season), future of build_reply_features)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") as pool:
+        for event in stream_transcribe(frames, transcriber):
+            if event["type"] == "partial":
+                print("[partial]", event["text"])
+            elif event["type"] == "entities":
+                print(f"[early] district={event['district']} crop={event['crop']} -> prefetching")
+                # Keyed with the matcher build_reply_features uses (fuzzy, plus season).
+                prefetch = (_entity_key(event["text"]), pool.submit(build_reply_features, event["text"]))
+            elif event["type"] == "final":
+                text, lang = event["text"], event["lang"] or "en"
+                print("\n--- TRANSCRIPTION ---")
+                print(text)
+                print("--- /TRANSCRIPTION ---\n")
+                if not text.strip():
+                    prefetch = None
+                    continue
+                intent = detect_intent(text)
+                print("[info] Detected intent:", intent)
+
+                features = None
+                if prefetch is not None:
+                    if prefetch[0] == _entity_key(text):
+                        features = prefetch[1].result()
+                    prefetch = None
+                reply = generate_reply(intent, lang_code=lang, user_text=text, features=features)
+                print("[reply]", reply)
+                if speak:
+                    speak_offline(reply, lang)
+
+
 def main():
     
     
@@ -443,21 +600,34 @@ def main():
     parser.add_argument("--file", type=str)
     parser.add_argument("--model", type=str, default="tiny")
     parser.add_argument("--use_google", action="store_true")
+    parser.add_argument("--no_speak", action="store_true", help="Print the reply without speaking it")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream from the mic (or --file) with VAD segmentation and incremental transcription")
     args = parser.parse_args()
 
     check_for_stdlib_conflicts()
-    if not check_ffmpeg():
-        abort("ffmpeg required.")
+    # Mic input and WAV files are decoded in-process; only other formats need ffmpeg.
+    from audio_frontend import needs_ffmpeg
+    if args.file and needs_ffmpeg(args.file) and not check_ffmpeg():
+        abort("ffmpeg required to decode " + args.file)
+    if args.stream:
+        from audio_stream import mic_frames, wav_frames
+        frames = wav_frames(args.file) if args.file else mic_frames()
+        try:
+            run_streaming(frames, model_size=args.model, speak=not args.no_speak)
+        except KeyboardInterrupt:
+            pass
+        print("[done]")
+        return
     ensure_python_packages()
 
-    if args.record:
-        audio_path = record_audio(filename=DEFAULT_WAV, duration=args.duration)
-    elif args.file:
+    if args.file and not args.record:
         if not os.path.exists(args.file):
             abort(f"File not found: {args.file}")
         audio_path = args.file
     else:
-        audio_path = record_audio(filename=DEFAULT_WAV, duration=args.duration)
+        # Recorded audio stays in memory: no temp WAV, no ffmpeg decode.
+        audio_path = record_audio_array(duration=args.duration)
 
     text, lang = "", None
     if args.use_google:
@@ -492,7 +662,8 @@ def main():
     print("[info] Detected intent:", intent)
     reply = generate_reply(intent, lang_code=lang, user_text=text)
     print("[reply]", reply)
-    # speak_offline(reply)
+    if not args.no_speak:
+        speak_offline(reply, lang)
    
 
     print("[done]")
@@ -504,7 +675,16 @@ if __name__ == "__main__":
         user_query = sys.argv[idx + 1] if idx + 1 < len(sys.argv) else ""
         lang = "en"
         intent = detect_intent(user_query)
-        reply = generate_reply(intent, lang_code=lang, user_text=user_query)
+        import profiling
+        with profiling.profiled("cli", requested="--profile" in sys.argv) as prof:
+            reply = generate_reply(intent, lang_code=lang, user_text=user_query)
         print(reply)
+        if prof["path"]:
+            print(f"[profile] {prof['mode']} output written to {prof['path']}", file=sys.stderr)
+        if "--metrics-json" in sys.argv or os.environ.get("AGRO_METRICS_JSON") == "1":
+            # stderr, so server.js (which reads stdout as the reply) is unaffected
+            import json
+            import tracing
+            print(json.dumps(tracing.summary(), indent=2), file=sys.stderr)
     else:
         main()
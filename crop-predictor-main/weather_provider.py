@@ -0,0 +1,236 @@
+# weather_provider.py
+"""
+Pluggable weather source for ml_connector.get_dynamic_rainfall_and_temp.
+
+WeatherProvider is the interface: get_daily(district, date) and get_monthly(district, month).
+LocalWeatherStore answers both from a local CSV of daily observations:
+
+    District_Name,Date,Rainfall,Temperature
+    Kolhapur,2024-07-01,12.4,24.1
+
+On open the file is scanned once to record the byte span of every district (no values
+are parsed). A district is parsed the first time it is asked for: daily values go into a
+{date: (rain, temp)} dict and monthly aggregates (average monthly rainfall total, mean
+temperature) are precomputed, so every lookup after that is a dict hit. Parsed districts
+are kept in a small LRU so a big national file doesn't have to sit in memory.
+
+weather_sample.csv (bundled) has two years of synthetic daily data for the demo
+districts so everything works offline. To plug in a real service later, subclass
+WeatherProvider and call set_provider(...) at startup.
+"""
+import datetime
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+WEATHER_DATA_PATH = os.environ.get(
+    "WEATHER_DATA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_sample.csv")
+)
+# "local" (default) or "mock" (old constant behaviour)
+WEATHER_PROVIDER = os.environ.get("WEATHER_PROVIDER", "local")
+HOT_DISTRICTS = int(os.environ.get("WEATHER_HOT_DISTRICTS", "64"))
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
+
+
+def resolve_month(month):
+    """Month name / number / 'current_month' -> 1..12 (None if it can't be parsed)."""
+    if month is None:
+        return None
+    if isinstance(month, (datetime.date, datetime.datetime)):
+        return month.month
+    m = str(month).strip().lower()
+    if m in ("current_month", "current", "now", ""):
+        return datetime.date.today().month
+    try:
+        mnum = int(float(m))
+        return mnum if 1 <= mnum <= 12 else None
+    except ValueError:
+        pass
+    for k, v in MONTHS.items():
+        if m.startswith(k):
+            return v
+    return None
+
+
+def _resolve_date(date):
+    if isinstance(date, datetime.datetime):
+        return date.date()
+    if isinstance(date, datetime.date):
+        return date
+    return datetime.date.fromisoformat(str(date).strip())
+
+
+class WeatherProvider(ABC):
+    """Interface. Both methods return {"Rainfall": mm, "Temperature": C} or None if unknown."""
+
+    name = "base"
+
+    @abstractmethod
+    def get_daily(self, district, date):
+        ...
+
+    @abstractmethod
+    def get_monthly(self, district, month):
+        ...
+
+
+class MockWeatherProvider(WeatherProvider):
+    """The original constant weather (Rain=200.0, Temp=28.0)."""
+
+    name = "mock"
+
+    def __init__(self, rainfall=200.0, temperature=28.0):
+        self.values = {"Rainfall": rainfall, "Temperature": temperature}
+
+    def get_daily(self, district, date):
+        return dict(self.values)
+
+    def get_monthly(self, district, month):
+        return dict(self.values)
+
+
+class _DistrictSeries:
+    __slots__ = ("daily", "monthly")
+
+    def __init__(self, daily, monthly):
+        self.daily = daily      # {date: (rainfall, temperature)}
+        self.monthly = monthly  # {month: {"Rainfall": ..., "Temperature": ...}}
+
+
+class LocalWeatherStore(WeatherProvider):
+    """File-backed daily store indexed by (district, date) with precomputed monthly aggregates."""
+
+    name = "local"
+
+    def __init__(self, path=WEATHER_DATA_PATH, hot_districts=HOT_DISTRICTS):
+        self.path = path
+        self.hot_districts = hot_districts
+        self._spans = self._index_file(path)
+        self._hot = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index_file(path):
+        """One pass over the file recording byte spans per district (lowercase key)."""
+        spans = {}
+        with open(path, "rb") as f:
+            header = f.readline().decode("utf-8").strip().split(",")
+            if header[:4] != ["District_Name", "Date", "Rainfall", "Temperature"]:
+                raise ValueError(f"Unexpected weather file header: {header}")
+            offset = f.tell()
+            current, start = None, offset
+            for line in f:
+                district = line.split(b",", 1)[0].decode("utf-8").strip().lower()
+                if district != current:
+                    if current is not None:
+                        spans.setdefault(current, []).append((start, offset))
+                    current, start = district, offset
+                offset += len(line)
+            if current is not None:
+                spans.setdefault(current, []).append((start, offset))
+        return spans
+
+    def districts(self):
+        return sorted(self._spans)
+
+    def _parse_district(self, key):
+        daily = {}
+        totals = {}  # (year, month) -> [rain_sum, temp_sum, days]
+        with open(self.path, "rb") as f:
+            for start, end in self._spans[key]:
+                f.seek(start)
+                for line in f.read(end - start).decode("utf-8").splitlines():
+                    parts = line.split(",")
+                    if len(parts) < 4:
+                        continue
+                    try:
+                        day = datetime.date.fromisoformat(parts[1].strip())
+                        rain = float(parts[2])
+                        temp = float(parts[3])
+                    except ValueError:
+                        continue
+                    daily[day] = (rain, temp)
+                    acc = totals.setdefault((day.year, day.month), [0.0, 0.0, 0])
+                    acc[0] += rain
+                    acc[1] += temp
+                    acc[2] += 1
+
+        # Average the per-year monthly totals so a month with two years of data
+        # still reads as "typical rainfall for that month".
+        by_month = {}
+        for (year, month), (rain_sum, temp_sum, days) in totals.items():
+            by_month.setdefault(month, []).append((rain_sum, temp_sum / days))
+        monthly = {
+            month: {
+                "Rainfall": round(sum(r for r, _ in vals) / len(vals), 1),
+                "Temperature": round(sum(t for _, t in vals) / len(vals), 1),
+            }
+            for month, vals in by_month.items()
+        }
+        return _DistrictSeries(daily, monthly)
+
+    def _series(self, district):
+        key = (district or "").strip().lower()
+        if key not in self._spans:
+            return None
+        with self._lock:
+            series = self._hot.get(key)
+            if series is not None:
+                self._hot.move_to_end(key)
+                return series
+        series = self._parse_district(key)
+        with self._lock:
+            self._hot[key] = series
+            self._hot.move_to_end(key)
+            while len(self._hot) > self.hot_districts:
+                self._hot.popitem(last=False)
+        return series
+
+    def get_daily(self, district, date):
+        series = self._series(district)
+        if series is None:
+            return None
+        values = series.daily.get(_resolve_date(date))
+        if values is None:
+            return None
+        return {"Rainfall": values[0], "Temperature": values[1]}
+
+    def get_monthly(self, district, month):
+        series = self._series(district)
+        month = resolve_month(month)
+        if series is None or month is None:
+            return None
+        values = series.monthly.get(month)
+        return dict(values) if values else None
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def set_provider(provider):
+    """Swap the process-wide provider (e.g. a real weather API client)."""
+    global _provider
+    _provider = provider
+
+
+def get_provider():
+    """Process-wide provider, created on first use from WEATHER_PROVIDER / WEATHER_DATA_PATH."""
+    global _provider
+    if _provider is not None:
+        return _provider
+    with _provider_lock:
+        if _provider is None:
+            provider = MockWeatherProvider()
+            if WEATHER_PROVIDER == "local":
+                try:
+                    provider = LocalWeatherStore(WEATHER_DATA_PATH)
+                except Exception as e:
+                    print(f"[weather] Local store unavailable ({e}); using mock weather.")
+            _provider = provider
+    return _provider